@@ -0,0 +1,44 @@
+"""
+    Runs all micro-benchmarks (`python -m benchmarks --json results.json`).
+    Every module `bench_*` has a list `BENCHMARKS` and the largest problem size `MAX_SIZE`
+    (and optionally the smallest one `MIN_SIZE`).
+"""
+
+import argparse
+import importlib
+import os
+import pkgutil
+
+from .harness import report, scaling, sizes_up_to
+
+
+def bench_modules() -> list[str]:
+    return sorted(m.name for m in pkgutil.iter_modules([os.path.dirname(__file__)])
+                  if m.name.startswith('bench_'))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--max-size', type=int, help='limits the problem sizes of all benchmarks')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', action='append', default=[],
+                        help='only run the benchmarks whose name contains this string (repeatable)')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for module_name in bench_modules():
+        module = importlib.import_module(f'{__package__}.{module_name}')
+        max_size = module.MAX_SIZE if args.max_size is None else min(module.MAX_SIZE, args.max_size)
+        sizes = sizes_up_to(max_size, getattr(module, 'MIN_SIZE', 1000))
+        for name, benchmark in module.BENCHMARKS:
+            if args.only and not any(s in name for s in args.only):
+                continue
+            result = scaling(name, benchmark, sizes, args.repeat)
+            result['module'] = module_name
+            results.append(result)
+    report(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+    Scaling of the conversion of items to ELPI input (`python -m benchmarks.bench_elpi`).
+"""
+
+from glif.commands.items import Item, Items, Repr
+from glif.elpi import items_to_stdin
+
+from .harness import Benchmark, main
+
+
+def items_with_logic(n: int) -> Items:
+    items = Items([])
+    for i in range(n):
+        item = Item(i).with_repr(Repr.SENTENCE, 'someone loves someone')
+        item.with_repr(Repr.AST, '(s someone (love someone))')
+        items.append(item.with_repr(Repr.LOGIC_ELPI, '(exists x\\ exists y\\ love x y)'))
+    return items
+
+
+def bench_items_to_stdin(with_ast: bool):
+    def bench(n: int):
+        items = items_with_logic(n)
+        return lambda: items_to_stdin(items, with_ast)
+    return bench
+
+
+BENCHMARKS: list[tuple[str, Benchmark]] = [
+    ('items_to_stdin', bench_items_to_stdin(False)),
+    ('items_to_stdin (with ASTs)', bench_items_to_stdin(True)),
+]
+MAX_SIZE = 10**6
+
+if __name__ == '__main__':
+    main(BENCHMARKS, MAX_SIZE)
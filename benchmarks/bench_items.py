@@ -0,0 +1,64 @@
+"""
+    Scaling of `Items` operations (`python -m benchmarks.bench_items`).
+    The time per item should stay roughly constant for growing n.
+"""
+
+from glif.commands.items import Items, Repr
+
+from .harness import Benchmark, main
+
+
+def bench_flatmap(n: int):
+    items = Items.from_vals(Repr.AST, ['s someone (love someone)'] * n)
+    return lambda: items.flatmap(lambda item: Items([item.get_clone().with_repr(Repr.SENTENCE, 'someone')]))
+
+
+def bench_get_clone(n: int):
+    items = Items.from_vals(Repr.SENTENCE, ['someone loves someone'] * n)
+    return lambda: [item.get_clone() for item in items.items]
+
+
+def bench_merge(n: int):
+    chunks = [Items.from_vals(Repr.AST, ['x'] * 10).with_errors(['error']) for _ in range(n // 10)]
+
+    def run():
+        items = Items([])
+        for chunk in chunks:
+            items.merge(chunk)
+    return run
+
+
+def bench_with_errors(n: int):
+    return lambda: [Items([]).with_errors(['error']) for _ in range(n)]
+
+
+def html_items(n: int) -> Items:
+    items = Items.from_vals(Repr.DEFAULT, ['(s <someone>\n  (love someone))'] * n)
+    for item in items.items[::10]:
+        item.errors = ['error:\nsomething went wrong']
+    return items
+
+
+def bench_html(n: int):
+    items = html_items(n)
+    return lambda: items.html()
+
+
+def bench_html_page(n: int):
+    """ should take roughly constant time (only the summary depends on n) """
+    items = html_items(n)
+    return lambda: items.html_page(0)
+
+
+BENCHMARKS: list[tuple[str, Benchmark]] = [
+    ('Items.flatmap', bench_flatmap),
+    ('Item.get_clone', bench_get_clone),
+    ('Items.merge', bench_merge),
+    ('Items.with_errors', bench_with_errors),
+    ('Items.html', bench_html),
+    ('Items.html_page', bench_html_page),
+]
+MAX_SIZE = 10**6
+
+if __name__ == '__main__':
+    main(BENCHMARKS, MAX_SIZE)
@@ -0,0 +1,75 @@
+"""
+    Scaling of the lexicon parser on synthetic lexica (`python -m benchmarks.bench_lex`).
+    The size is the number of entries.
+"""
+
+import os
+import tempfile
+
+from glif.lex import LexiconParser
+
+from .harness import Benchmark, main
+
+_TMPDIR = tempfile.TemporaryDirectory()
+
+
+LANGUAGES = ['Ger', 'Fre', 'Spa', 'Ita', 'Por', 'Dut', 'Swe', 'Nor', 'Dan', 'Fin',
+             'Pol', 'Cze', 'Rus', 'Bul', 'Gre', 'Tur', 'Hun', 'Rom', 'Cat', 'Est']
+
+
+def lexicon(n: int, languages: int = 1) -> str:
+    types = ('PN : ι : -l Eng mkPN -l Ger mkPN\n'
+             'N : ι ⟶ o : -l Eng mkN -l Ger mkN\n'
+             'V2 : ι ⟶ ι ⟶ o : -l Eng mkV2 -l Ger mkV2\n')
+    entries = []
+    for i in range(n):
+        if languages > 1:
+            entries.append(f'word{i} : N' + ''.join(f' -l {lang} {lang}{i}' for lang in LANGUAGES[:languages]) + '\n')
+        elif i % 3 == 0:
+            entries.append(f'person{i} : PN -l Ger Person{i}  # a comment\n')
+        elif i % 3 == 1:
+            entries.append(f'thing{i} : N -l Ger Ding{i} -add "thing {i}"\n')
+        else:
+            entries.append(f'relate{i} : PN -> PN -> V2 -l Ger verbinden{i}\n')
+    return 'Lexicon Bench\n# generated\n' + types + 'def\n' + ''.join(entries)
+
+
+def lexicon_file(n: int, languages: int = 1) -> str:
+    path = os.path.join(_TMPDIR.name, f'bench{n}_{languages}.lex')
+    if not os.path.isfile(path):
+        with open(path, 'w', encoding='UTF-8') as fp:
+            fp.write(lexicon(n, languages))
+    return path
+
+
+def bench_parse(n: int):
+    path = lexicon_file(n)
+    return lambda: LexiconParser(path, cwd=_TMPDIR.name)
+
+
+def bench_create_gf(n: int):
+    parser = LexiconParser(lexicon_file(n), cwd=_TMPDIR.name)
+    return lambda: parser.create_gf()
+
+
+def bench_create_gf_languages(n: int):
+    parser = LexiconParser(lexicon_file(n, len(LANGUAGES)), cwd=_TMPDIR.name)
+    return lambda: parser.create_gf()
+
+
+def bench_create_mmt(n: int):
+    parser = LexiconParser(lexicon_file(n), cwd=_TMPDIR.name)
+    return lambda: parser.create_mmt()
+
+
+BENCHMARKS: list[tuple[str, Benchmark]] = [
+    ('LexiconParser (entries)', bench_parse),
+    ('LexiconParser.create_gf (entries)', bench_create_gf),
+    ('LexiconParser.create_gf, 21 languages (entries)', bench_create_gf_languages),
+    ('LexiconParser.create_mmt (entries)', bench_create_mmt),
+]
+MIN_SIZE = 100
+MAX_SIZE = 10**5
+
+if __name__ == '__main__':
+    main(BENCHMARKS, MAX_SIZE, MIN_SIZE)
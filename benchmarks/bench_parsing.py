@@ -0,0 +1,55 @@
+"""
+    Scaling of command parsing and file identification (`python -m benchmarks.bench_parsing`).
+"""
+
+from glif import parsing
+
+from .harness import Benchmark, main
+
+
+def gf_file(n: int) -> str:
+    header = ''.join(f'-- comment line {i}\n' for i in range(n // 2))
+    body = ''.join(f'    f{i} : A -> A ;\n' for i in range(n // 2))
+    return header + '{- block\ncomment -}\nabstract Grammar = {\n  cat A ;\n  fun\n' + body + '}\n'
+
+
+def mmt_file(n: int) -> str:
+    header = ''.join(f'// comment {i} ❚\n' for i in range(n // 2))
+    body = ''.join(f'    c{i} : ι ⟶ o ❙\n' for i in range(n // 2))
+    return header + 'namespace http://mathhub.info/tmpGLIF/default ❚\ntheory Theory : ur:?LF =\n' + body + '❚\n'
+
+
+def elpi_file(n: int) -> str:
+    header = ''.join(f'% comment {i}\n' for i in range(n // 2))
+    body = ''.join(f'type c{i} ind -> prop.\n' for i in range(n // 2))
+    return '/* generated\n' + header + '*/\nelpi: signature\n' + body
+
+
+def bench_identify(generator):
+    def bench(n: int):
+        content = generator(n)
+        return lambda: parsing.identify_file(content)
+    return bench
+
+
+def bench_parse_quoted(n: int):
+    command = 'parse -lang=Eng -cat=S "' + 'someone loves \\"someone\\" ' * (n // 3) + '" | l -lang=Ger'
+    return lambda: parsing.parse_basic_command(command)
+
+
+def bench_parse_ast(n: int):
+    command = 'linearize -lang=Eng ' + '(and (s someone (love someone)) ' * (n // 5) + ')' * (n // 5)
+    return lambda: parsing.parse_basic_command(command)
+
+
+BENCHMARKS: list[tuple[str, Benchmark]] = [
+    ('identify_file (GF, lines)', bench_identify(gf_file)),
+    ('identify_file (MMT, lines)', bench_identify(mmt_file)),
+    ('identify_file (ELPI, lines)', bench_identify(elpi_file)),
+    ('parse_basic_command (quoted sentence, words)', bench_parse_quoted),
+    ('parse_basic_command (AST, words)', bench_parse_ast),
+]
+MAX_SIZE = 10**5
+
+if __name__ == '__main__':
+    main(BENCHMARKS, MAX_SIZE)
@@ -0,0 +1,34 @@
+"""
+    Scaling of the stub generator's abstract syntax parser (`python -m benchmarks.bench_stub_gen`).
+    The size is the number of function declarations.
+"""
+
+from glif import stub_gen
+
+from .harness import Benchmark, main
+
+
+def abstract_syntax(n: int) -> str:
+    cats = ''.join(f'    C{i} ;\n' for i in range(10))
+    funs = ''.join(f'    f{i}, g{i} : C{i % 10} -> C{(i + 1) % 10} -> C0 ; -- comment\n' for i in range(n // 2))
+    return 'abstract Grammar = Base, Lexicon ** {\n  flags startcat = C0 ;\n  cat\n' + cats + '  fun\n' + funs + '}\n'
+
+
+def bench_tokenizer(n: int):
+    content = abstract_syntax(n)
+    return lambda: stub_gen.tokenizer(content)
+
+
+def bench_process_tokens(n: int):
+    tokens = stub_gen.tokenizer(abstract_syntax(n))
+    return lambda: stub_gen.process_tokens(tokens)
+
+
+BENCHMARKS: list[tuple[str, Benchmark]] = [
+    ('stub_gen.tokenizer', bench_tokenizer),
+    ('stub_gen.process_tokens', bench_process_tokens),
+]
+MAX_SIZE = 10**5
+
+if __name__ == '__main__':
+    main(BENCHMARKS, MAX_SIZE)
@@ -0,0 +1,188 @@
+"""
+    Stand-ins for GF, MMT and ELPI that speak the same protocols as the real backends,
+    so that complete GLIF pipelines can be benchmarked without installing them:
+        * `gf --run`: answers `ps "..."` with the separator, returns parse trees for `parse`,
+          sentences for `linearize` and nothing for `import`,
+        * `java -jar mmt.jar ... server on <port>`: an HTTP server for `glf-build`, `glf-construct`,
+          `glif-elpigen` and `glf-accumulate`,
+        * `elpi`: keeps all items for `glif.filter ...`, prints a line per item for `glif.apply_to_item(s) ...`.
+    The latencies and output sizes are configurable (`FakeConfig`), so the time spent in GLIF itself
+    can be measured independently of the speed of the real backends.
+
+    Usage:
+        with FakeBackends(FakeConfig(gf_latency=0.001)):
+            glif = Glif()   # finds the fake executables, mmt.jar and MathHub folder
+            ...
+"""
+
+import dataclasses
+import json
+import os
+import stat
+import sys
+import tempfile
+from typing import Optional
+
+FAKE_GF = '''
+import re, sys, time
+CONFIG = {config}
+time.sleep(CONFIG['gf_startup'])
+
+
+def words(s):
+    return re.findall(r'\\w+', s.split('"')[1] if '"' in s else s)
+
+
+def run(cmd):
+    stages = [stage.strip() for stage in cmd.split(' | ')]
+    name = stages[0].split(' ')[0]
+    if name in ('import', 'i'):
+        return []
+    if name in ('help', 'h'):
+        return ['fake GF command']
+    if name in ('parse', 'p'):
+        ws = words(stages[0]) or ['x']
+        out = [f'(Pred{{k}} ' + ' '.join(ws) + ')' for k in range(CONFIG['gf_trees'])]
+    elif name in ('linearize', 'l'):
+        out = [' '.join(words(stages[0].split(' ', 1)[-1]))]
+    else:
+        out = []
+    if len(stages) > 1 and stages[-1].split(' ')[0] in ('linearize', 'l'):
+        out = [' '.join(words(tree)[1:]) for tree in out]
+    return out
+
+
+for line in sys.stdin:
+    line = line.strip()
+    if line == 'q':
+        break
+    if line.startswith('ps "'):
+        print(line[4:-1])
+    elif line:
+        time.sleep(CONFIG['gf_latency'])
+        for output in run(line):
+            print(output)
+    sys.stdout.flush()
+'''
+
+FAKE_MMT = '''
+import json, re, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+CONFIG = {config}
+
+
+def respond(extension, request):
+    response = {{'isSuccessful': True, 'errors': []}}
+    if extension == 'glf-construct':
+        asts = request['ASTs']
+        response['result'] = {{
+            'mmt': [' ∧ '.join([f'⟦{{ast}}⟧'] * CONFIG['term_size']) for ast in asts],
+            'elpi': ['(and ' * (CONFIG['term_size'] - 1) + f'(sem {{i}})' + ' (sem 0))' * (CONFIG['term_size'] - 1)
+                     for i in range(len(asts))],
+        }}
+    elif extension == 'glif-elpigen':
+        response['result'] = 'type sem int -> prop.\\n'
+    elif extension == 'glf-accumulate':
+        response['theorypresentation'] = '\\n'.join(request['terms'])
+    return response
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(CONFIG['mmt_latency'])
+        body = json.dumps(respond(self.path.lstrip('/:'), request)).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+port = int(re.search(r'server on (\\d+)', sys.argv[sys.argv.index('--shell') + 1]).group(1))
+time.sleep(CONFIG['mmt_startup'])
+server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+print(f'Server started at http://127.0.0.1:{{port}}', flush=True)
+for line in sys.stdin:
+    if line.strip() == 'exit':
+        break
+server.shutdown()
+'''
+
+FAKE_ELPI = '''
+import re, sys, time
+CONFIG = {config}
+command = sys.argv[sys.argv.index('-exec') + 1]
+time.sleep(CONFIG['elpi_latency'] + (0 if '-no-tc' in sys.argv else CONFIG['elpi_typecheck']))
+ids = re.findall(r'^glif\\.mkItem (\\d+)', sys.stdin.read(), re.MULTILINE)
+if command.startswith('glif.filter'):
+    print('\\n'.join(f'filter-output: {{i}}' for i in ids))
+elif command.startswith('glif.apply_to_item'):
+    print('\\n'.join(f'applied to {{i}}' for i in ids))
+print('Success:', file=sys.stderr)
+'''
+
+
+@dataclasses.dataclass
+class FakeConfig:
+    gf_startup: float = 0.0  # seconds until a new GF shell responds
+    gf_latency: float = 0.0  # per GF command
+    gf_trees: int = 1  # parse trees per sentence
+    mmt_startup: float = 0.0
+    mmt_latency: float = 0.0  # per request
+    term_size: int = 1  # number of conjuncts in constructed terms
+    elpi_latency: float = 0.0  # per ELPI process
+    elpi_typecheck: float = 0.0  # additional time if the program is type checked
+
+
+class FakeBackends(object):
+    """ Puts the fake executables on the PATH and points MMT_JAR, MATHHUB and GLIF_CACHE_DIR to a temporary directory
+    """
+
+    ENVIRONMENT = ['PATH', 'MMT_JAR', 'MATHHUB', 'GLIF_CACHE_DIR']
+
+    def __init__(self, config: Optional[FakeConfig] = None):
+        self.config = config if config else FakeConfig()
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+        self._environ: dict[str, Optional[str]] = {}
+
+    def _write_script(self, directory: str, name: str, template: str):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf8') as fp:
+            fp.write(f'#!{sys.executable}\n' + template.format(config=json.dumps(dataclasses.asdict(self.config))))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+    def __enter__(self) -> 'FakeBackends':
+        self._tmpdir = tempfile.TemporaryDirectory()
+        root = self._tmpdir.name
+        bindir = os.path.join(root, 'bin')
+        os.mkdir(bindir)
+        self._write_script(bindir, 'gf', FAKE_GF)
+        self._write_script(bindir, 'java', FAKE_MMT)
+        self._write_script(bindir, 'elpi', FAKE_ELPI)
+        mmtjar = os.path.join(root, 'mmt.jar')
+        open(mmtjar, 'w').close()
+        mathhub = os.path.join(root, 'MathHub')
+        os.mkdir(mathhub)
+
+        self._environ = {key: os.environ.get(key) for key in self.ENVIRONMENT}
+        os.environ['PATH'] = bindir + os.pathsep + os.environ.get('PATH', '')
+        os.environ['MMT_JAR'] = mmtjar
+        os.environ['MATHHUB'] = mathhub
+        os.environ['GLIF_CACHE_DIR'] = os.path.join(root, 'cache')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for key, value in self._environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
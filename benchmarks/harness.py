@@ -0,0 +1,86 @@
+"""
+    Minimal helpers for benchmarks.
+    A benchmark is a function that takes a problem size n and returns a function that does the actual work.
+    The work is timed for increasing sizes to obtain a scaling curve.
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from typing import Any, Callable, Optional
+
+Benchmark = Callable[[int], Callable[[], Any]]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> float:
+    """ returns the best time (in seconds) of `repeat` runs """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def sizes_up_to(max_size: int, min_size: int = 1000) -> list[int]:
+    sizes = []
+    n = min_size
+    while n <= max_size:
+        sizes.append(n)
+        n *= 10
+    return sizes
+
+
+def exponent(sizes: list[int], seconds: list[float]) -> Optional[float]:
+    """ the slope of the log-log curve (least squares), i.e. about 1 for linear scaling, 2 for quadratic scaling """
+    points = [(math.log(n), math.log(s)) for n, s in zip(sizes, seconds) if s > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def scaling(name: str, benchmark: Benchmark, sizes: list[int], repeat: int = 3) -> dict[str, Any]:
+    seconds = [measure(benchmark(n), repeat) for n in sizes]
+    return {
+        'name': name,
+        'sizes': sizes,
+        'seconds': seconds,
+        'ns_per_item': [s / n * 1e9 for s, n in zip(seconds, sizes)],
+        'exponent': exponent(sizes, seconds),
+    }
+
+
+def report(results: list[dict[str, Any]], json_path: Optional[str] = None, **metadata):
+    """ prints the results and writes them (together with information about the environment) to `json_path` """
+    for result in results:
+        print(result['name'])
+        for n, s, per_item in zip(result['sizes'], result['seconds'], result['ns_per_item']):
+            print(f'    n={n:>9}  {s:10.4f} s  {per_item:10.1f} ns/item')
+        if result['exponent'] is not None:
+            print(f'    scaling exponent: {result["exponent"]:.2f}')
+    if json_path:
+        with open(json_path, 'w') as fp:
+            json.dump({
+                'python': sys.version,
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                **metadata,
+                'results': results,
+            }, fp, indent=2)
+
+
+def main(benchmarks: list[tuple[str, Benchmark]], default_max_size: int = 10**6, default_min_size: int = 1000):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-size', type=int, default=default_min_size)
+    parser.add_argument('--max-size', type=int, default=default_max_size)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+    sizes = sizes_up_to(args.max_size, args.min_size)
+    report([scaling(name, benchmark, sizes, args.repeat) for name, benchmark in benchmarks], args.json)
@@ -0,0 +1,115 @@
+"""
+    End-to-end benchmarks of `Glif.execute_command` pipelines with the fake backends from `benchmarks.fakes`
+    (`python -m benchmarks.macro --json macro.json`).
+
+    With the default configuration, the backends answer immediately, so the results show the overhead of GLIF
+    (command parsing, item handling, process communication). The latencies can be changed to see how well GLIF
+    hides them, e.g. with `--gf-startup 0.5` the session benchmarks show the gains of pre-started GF shells.
+"""
+
+import argparse
+import dataclasses
+import time
+from typing import Any, Callable
+
+from glif import elpi
+from glif.backends import Backends, GFShellPool
+from glif.glif import Glif
+
+from .fakes import FakeBackends, FakeConfig
+from .harness import Benchmark, report, scaling, sizes_up_to
+
+CELLS = [
+    'abstract Grammar = { cat S ; fun s : S ; }',
+    'concrete GrammarEng of Grammar = { lincat S = Str ; lin s = "s" ; }',
+    'theory Logic : ur:?LF = ❚',
+    'view Semantics : ?Grammar -> ?Logic = ❚',
+    'elpi: bench\nfilter _.',
+]
+
+
+def execute(glif: Glif, command: str):
+    r = glif.execute_command(command)
+    if not r.success:
+        raise RuntimeError(f'{command[:100]} failed:\n{r.logs}')
+
+
+def sentences(n: int) -> str:
+    return ' '.join(f'"someone {i} loves someone"' for i in range(n))
+
+
+def bench_pipeline(glif: Glif, pipeline: str, before: Callable[[], Any] = lambda: None) -> Benchmark:
+    def bench(n: int):
+        command = f'parse {sentences(n)}' + (f' | {pipeline}' if pipeline else '')
+
+        def run():
+            before()
+            execute(glif, command)
+        return run
+    return bench
+
+
+def bench_sessions(backends: Backends, prestart: int) -> Benchmark:
+    """ n sessions one after the other, each running a single command """
+    def bench(n: int):
+        pool = GFShellPool(prestart)
+        backends.gf_pool.do_shutdown()
+        backends.gf_pool = pool
+        pool.warm_up()
+        while pool.idle_count() < prestart:  # start with a warm pool
+            time.sleep(0.01)
+
+        def run():
+            for _ in range(n):
+                session = Glif(backends)
+                execute(session, 'parse "someone loves someone"')
+                session.do_shutdown()
+        return run
+    return bench
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.macro')
+    parser.add_argument('--max-size', type=int, default=1000, help='maximal number of sentences')
+    parser.add_argument('--max-sessions', type=int, default=10)
+    parser.add_argument('--gf-prestart', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    for field in dataclasses.fields(FakeConfig):
+        parser.add_argument('--' + field.name.replace('_', '-'), type=field.type, default=field.default,  # type: ignore
+                            help=f'fake backend configuration (default: {field.default})')
+    args = parser.parse_args()
+    config = FakeConfig(**{field.name: getattr(args, field.name) for field in dataclasses.fields(FakeConfig)})
+
+    with FakeBackends(config):
+        backends = Backends()
+        glif = Glif(backends)
+        try:
+            for cell in CELLS:
+                for r in glif.execute_cell(cell):
+                    if not r.success:
+                        raise RuntimeError(f'Setup failed:\n{r.logs}')
+            pipelines: list[tuple[str, Benchmark]] = [
+                ('parse (sentences)', bench_pipeline(glif, '')),
+                ('parse | linearize (sentences)', bench_pipeline(glif, 'linearize')),
+                ('parse | construct (sentences)', bench_pipeline(glif, 'construct')),
+                ('parse | construct | filter (sentences)', bench_pipeline(glif, 'construct | filter')),
+                ('parse | construct | filter, no type check cache (sentences)',
+                 bench_pipeline(glif, 'construct | filter', elpi.TYPECHECK_CACHE.clear)),
+            ]
+            sessions: list[tuple[str, Benchmark]] = [
+                ('sessions without pre-started GF shells', bench_sessions(backends, 0)),
+                (f'sessions with {args.gf_prestart} pre-started GF shells', bench_sessions(backends, args.gf_prestart)),
+            ]
+            results = [scaling(name, benchmark, sizes_up_to(args.max_size, 10), args.repeat)
+                       for name, benchmark in pipelines]
+            results += [scaling(name, benchmark, sizes_up_to(args.max_sessions, 1), args.repeat)
+                        for name, benchmark in sessions]
+        finally:
+            glif.do_shutdown()
+            backends.do_shutdown()
+    report(results, args.json, fake_backends=dataclasses.asdict(config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+    Backends that can be shared between several GLIF sessions (i.e. `Glif` objects):
+    a single MMT server and a pool of GF shells.
+
+    Every session needs its own GF shell as the shell keeps track of the imported grammars.
+    To avoid the startup time, the pool can start GF shells in advance.
+"""
+
+import threading
+from distutils.spawn import find_executable
+from typing import Optional
+
+from . import gf, metrics, mmt, utils
+from .utils import Result
+
+
+class GFShellPool(object):
+    """ Hands out GF shells. If `prestart > 0`, up to `prestart` idle shells are kept ready (see also `warm_up`).
+
+        The shells don't depend on the working directory of a session (`Glif` imports grammars
+        with absolute paths), so the same idle shells can be handed out to all sessions.
+    """
+
+    def __init__(self, prestart: int = 0, gf_path: Optional[str] = None):
+        self.prestart = prestart
+        self._idle: list[gf.GFShellRaw] = []
+        self._starting = 0  # number of shells that are being started
+        self._lock = threading.Lock()
+        self._gf_path: Optional[str] = gf_path if gf_path else find_executable('gf')
+        self._shutdown = False
+
+    def acquire(self) -> Result[gf.GFShellRaw]:
+        """ returns a GF shell (the caller is responsible for releasing it) """
+        if not self._gf_path:
+            return Result(False, logs='Failed to locate executable "gf"')
+        with self._lock:
+            shell = self._idle.pop() if self._idle else None
+        self.warm_up()
+        if shell is None:
+            shell = gf.GFShellRaw(self._gf_path)
+        return Result(True, shell)
+
+    def release(self, shell: gf.GFShellRaw):
+        """ shells have state (the imported grammars), so they are not re-used """
+        if self.prestart > 0:
+            threading.Thread(target=shell.do_shutdown, daemon=True).start()
+        else:
+            shell.do_shutdown()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def warm_up(self):
+        """ starts shells in the background until there are `prestart` idle shells """
+        if not self._gf_path:
+            return
+        with self._lock:
+            missing = self.prestart - len(self._idle) - self._starting
+            if missing <= 0 or self._shutdown:
+                return
+            self._starting += missing
+        for _ in range(missing):
+            threading.Thread(target=self._start_shell, daemon=True).start()
+
+    def _start_shell(self):
+        assert self._gf_path
+        shell = gf.GFShellRaw(self._gf_path)
+        with self._lock:
+            self._starting -= 1
+            if not self._shutdown:
+                self._idle.append(shell)
+                return
+        shell.do_shutdown()
+
+    def do_shutdown(self):
+        with self._lock:
+            self._shutdown = True
+            shells = self._idle
+            self._idle = []
+        for shell in shells:
+            shell.do_shutdown()
+
+
+class Backends(object):
+    """ MMT (incl. the MathHub folder) and a pool of GF shells """
+
+    def __init__(self, gf_prestart: int = 0):
+        self.mmtjar: Optional[str] = None
+        self.mh: Optional[mmt.MathHub] = None
+        self._mmt: Optional[mmt.MMTInterface] = None
+        self._mmt_lock = threading.Lock()
+        self.findMMTlogs: list[str] = []
+        self.mmtFailedStartupLogs: list[str] = []
+        self.mmtFailedStartupMessage: Optional[str] = None
+        self._init_mmt_location()
+        self.gf_pool = GFShellPool(gf_prestart)
+
+    def _init_mmt_location(self):
+        # JAR
+        mmtjar = utils.find_mmt_jar()
+        self.findMMTlogs.append('Finding mmt.jar: "' + mmtjar.logs + '"')
+        if not mmtjar.success:
+            return
+        assert mmtjar.value
+        self.findMMTlogs.append('Location: ' + mmtjar.value)
+        self.mmtjar = mmtjar.value
+
+        # MH
+        mhdir = utils.find_mathhub_dir(self.mmtjar)
+        self.findMMTlogs.append('Finding MathHub: "' + mhdir.logs + '"')
+        if not mhdir.success:
+            return
+        assert mhdir.value
+        self.findMMTlogs.append('Location: ' + mhdir.value)
+        self.mh = mmt.MathHub(mhdir.value)
+
+    def get_running_mmt(self) -> Optional[mmt.MMTInterface]:
+        """ returns MMT without starting it """
+        return self._mmt
+
+    def get_mmt(self) -> Result[mmt.MMTInterface]:
+        with self._mmt_lock:
+            if self._mmt:
+                return Result(True, self._mmt)
+            if not (self.mmtjar and self.mh):
+                return Result(False, logs='\n'.join(self.findMMTlogs))
+            try:
+                self._mmt = mmt.MMTInterface(self.mmtjar, self.mh)
+            except mmt.MMTStartupException as ex:
+                self.mmtFailedStartupLogs = ex.logs
+                self.mmtFailedStartupMessage = ex.message
+                return Result(False, logs=ex.message)
+            return Result(True, self._mmt)
+
+    def reload_mmt(self) -> bool:
+        """ shuts MMT down (e.g. to make it aware of new archives), it is restarted on the next use.
+            Returns whether MMT was running.
+        """
+        with self._mmt_lock:
+            mmt_ = self._mmt
+            self._mmt = None
+            self.mmtFailedStartupLogs = []
+            self.mmtFailedStartupMessage = None
+        if mmt_:
+            metrics.BACKEND_RESTARTS.inc(backend='mmt')
+            mmt_.do_shutdown()
+        return mmt_ is not None
+
+    def do_shutdown(self):
+        self.gf_pool.do_shutdown()
+        self.reload_mmt()
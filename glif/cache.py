@@ -0,0 +1,239 @@
+"""
+    A content-addressed cache on disk for artefacts that are expensive to compute
+    (e.g. SVGs rendered by dot, ELPI signatures generated by MMT, successful ELPI type checks).
+    The cache directory can be shared by several processes: entries are written atomically
+    and the eviction of the least recently used entries (when the cache gets too large) is protected by a file lock.
+
+    Entries are grouped into namespaces and identified by a key, which should be computed from
+    everything the entry depends on (see `key`):
+        svg = cache.get_or_compute('svg', cache.key(dot), lambda: render(dot))
+
+    The cache directory is `$GLIF_CACHE_DIR` or `$XDG_CACHE_HOME/glif` (default: `~/.cache/glif`),
+    the size limit `$GLIF_CACHE_SIZE` (in MiB, default: 512). `GLIF_CACHE_SIZE=0` disables the cache.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Callable, Optional, Union
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows (the eviction is then not synchronized between processes)
+    fcntl = None  # type: ignore
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+_EVICTION_TARGET = 0.9  # the eviction stops at this fraction of the size limit
+
+
+def key(*parts: Union[str, bytes]) -> str:
+    """ the key for an entry that depends on the parts """
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        h.update(str(len(data)).encode() + b':' + data)
+    return h.hexdigest()
+
+
+def check_namespace(namespace: str):
+    """ raises a ValueError if `namespace` could refer to something outside of the cache directory """
+    if (not namespace or namespace in ('.', '..') or os.path.isabs(namespace) or os.sep in namespace
+            or (os.altsep and os.altsep in namespace) or '..' in namespace):
+        raise ValueError(f'Invalid cache namespace "{namespace}"')
+
+
+class _FileLock(object):
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        assert self._fd is not None
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class DiskCache(object):
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._written = max_size  # bytes written since the last eviction (so that the first write checks the size)
+
+    def _path(self, namespace: str, key_: str) -> str:
+        check_namespace(namespace)
+        return os.path.join(self.directory, namespace, key_[:2], key_)
+
+    def get(self, namespace: str, key_: str) -> Optional[bytes]:
+        path = self._path(namespace, key_)
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            os.utime(path)  # for the LRU eviction
+        except OSError:  # not cached (or evicted in the meantime)
+            metrics.CACHE_REQUESTS.inc(cache=f'disk-{namespace}', result='miss')
+            return None
+        metrics.CACHE_REQUESTS.inc(cache=f'disk-{namespace}', result='hit')
+        return data
+
+    def put(self, namespace: str, key_: str, data: bytes):
+        path = self._path(namespace, key_)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as fp:
+                    fp.write(data)
+                os.replace(tmppath, path)  # atomic, so readers never see partial entries
+            except BaseException:
+                os.unlink(tmppath)
+                raise
+        except OSError:
+            return  # the cache is only an optimization
+        with self._lock:
+            self._written += len(data)
+            evict = self._written > self.max_size * (1 - _EVICTION_TARGET)
+            if evict:
+                self._written = 0
+        if evict:
+            self.evict()
+
+    def delete(self, namespace: str, key_: str):
+        try:
+            os.unlink(self._path(namespace, key_))
+        except OSError:
+            pass
+
+    def get_or_compute(self, namespace: str, key_: str, compute: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """ `compute` can return None if it fails (the result isn't cached then) """
+        data = self.get(namespace, key_)
+        if data is None:
+            data = compute()
+            if data is not None:
+                self.put(namespace, key_, data)
+        return data
+
+    def _entries(self, namespace: Optional[str] = None) -> list[tuple[str, str, int, float]]:
+        """ (namespace, path, size, last use) of all entries """
+        entries = []
+        namespaces = self.namespaces()
+        if namespace:
+            check_namespace(namespace)
+            namespaces = [namespace] if namespace in namespaces else []
+        for ns in namespaces:
+            for root, _, files in os.walk(os.path.join(self.directory, ns)):
+                for name in files:
+                    if name.startswith('.'):  # e.g. files that are being written
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((ns, path, st.st_size, st.st_mtime))
+        return entries
+
+    def namespaces(self) -> list[str]:
+        try:
+            return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+        except OSError:
+            return []
+
+    def evict(self) -> int:
+        """ removes the least recently used entries if the cache is too large, returns the number of removed entries """
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        with _FileLock(os.path.join(self.directory, '.lock')):
+            entries = self._entries()
+            size = sum(entry[2] for entry in entries)
+            if size <= self.max_size:
+                return 0
+            for _, path, entry_size, _ in sorted(entries, key=lambda entry: entry[3]):
+                if size <= self.max_size * _EVICTION_TARGET:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                removed += 1
+        return removed
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """ namespace -> (number of entries, size in bytes) """
+        stats: dict[str, tuple[int, int]] = {}
+        for ns, _, size, _ in self._entries():
+            count, total = stats.get(ns, (0, 0))
+            stats[ns] = (count + 1, total + size)
+        return stats
+
+    def purge(self, namespace: Optional[str] = None) -> int:
+        """ removes all entries (of the namespace), returns their number.
+            Raises a ValueError for invalid namespaces (e.g. "..").
+        """
+        if namespace:
+            check_namespace(namespace)
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        with _FileLock(os.path.join(self.directory, '.lock')):
+            for _, path, _, _ in self._entries(namespace):
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def default_directory() -> str:
+    if os.getenv('GLIF_CACHE_DIR'):
+        return os.environ['GLIF_CACHE_DIR']
+    return os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'glif')
+
+
+_cache: Optional[DiskCache] = None
+_cache_initialized = False
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[DiskCache]:
+    """ the shared cache (None if it is disabled) """
+    global _cache, _cache_initialized
+    with _cache_lock:
+        if not _cache_initialized:
+            try:
+                max_size = int(float(os.getenv('GLIF_CACHE_SIZE', DEFAULT_MAX_SIZE / 1024 / 1024)) * 1024 * 1024)
+            except ValueError:
+                max_size = DEFAULT_MAX_SIZE
+            _cache = DiskCache(default_directory(), max_size) if max_size > 0 else None
+            _cache_initialized = True
+        return _cache
+
+
+def set_cache(cache: Optional[DiskCache]):
+    """ replaces the shared cache (e.g. to use another directory or to disable it with None) """
+    global _cache, _cache_initialized
+    with _cache_lock:
+        _cache = cache
+        _cache_initialized = True
+
+
+def get_or_compute(namespace: str, key_: str, compute: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+    """ uses the shared cache (if it is enabled) """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(namespace, key_, compute)
@@ -0,0 +1,314 @@
+"""
+    Command line interface.
+
+    Headless batch processing, e.g.
+        glif run --cell grammar.gf --input corpus.txt 'parse -cat=S | construct' > corpus.jsonl
+    Every (non-empty) line of the input is an item (a sentence by default).
+    The pipeline is applied to chunks of items and the resulting items are written
+    as JSON Lines with all of their representations (including intermediate ones, unless `--prune` is given).
+    Consecutive GF commands are sent to GF as a single command, so their intermediate results
+    are only part of the output if they are requested with `-keep=...` (e.g. `parse -keep=ast | linearize`).
+    Chunks can be processed by multiple worker processes, each with its own GLIF instance.
+
+    A JSON-RPC server for other programs (see `glif.server`), e.g.
+        glif serve --port 8080
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from . import metrics, server
+from .commands import pipeline
+from .commands.command import Command
+from .commands.items import Items, ItemStream, REPR_NAMES
+from .glif_abc import GlifABC
+from .parsing import strformat
+from .utils import Result
+
+DEFAULT_BATCH_CHUNK_SIZE = 100
+
+# representations that the input can be in
+INPUT_REPRS = ['sentence', 'ast', 'logic', 'logic-plain', 'elpi', 'default']
+
+
+def default_glif() -> GlifABC:
+    from .glif import Glif
+    return Glif()
+
+
+def setup_glif(glif: GlifABC, cells: list[str], commands: list[str]) -> Result[None]:
+    """ executes the cells (e.g. the content of grammar files) and then the commands """
+    for code in cells + commands:
+        for r in glif.execute_cell(code):
+            if not r.success:
+                return Result(False, logs=r.logs)
+    return Result(True)
+
+
+def read_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[tuple[int, list[str]]]:
+    """ groups the non-empty lines into chunks, returns them together with the index of their first line """
+    chunk: list[str] = []
+    start = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield start, chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def _input_items(input_repr: str, start: int, lines: list[str]) -> Items:
+    items = Items.from_vals(REPR_NAMES[input_repr], lines)
+    for item in items.items:
+        item.original_id += start
+    return items
+
+
+def _run_pipeline(glif: GlifABC, stages: list[Command], input_repr: str, start: int, lines: list[str],
+                  prune: bool) -> Items:
+    stream = ItemStream.from_items(_input_items(input_repr, start, lines), len(lines))
+    return pipeline.run_pipeline(glif, stages, len(lines), stream=stream, prune=prune).materialize()
+
+
+def process_chunk(glif: GlifABC, stages: list[Command], input_repr: str, start: int, lines: list[str],
+                  prune: bool = False) -> Items:
+    """ applies the pipeline to the lines.
+        The ids of the items are their indices among the non-empty input lines, starting with `start`.
+        If `prune` is set, representations that are not needed by later commands are dropped
+        (otherwise, the items keep all representations).
+        Errors are reported per item: if the pipeline fails, the lines are processed one by one,
+        so that a failure (e.g. a sentence that can't be parsed) doesn't affect the other items of the chunk.
+        The items for which the pipeline failed get the errors (if there is no output for them,
+        the input item is returned).
+    """
+    items = _run_pipeline(glif, stages, input_repr, start, lines, prune)
+    if not items.errors:
+        return items
+    results = Items([])
+    for i, line in enumerate(lines):
+        result = items if len(lines) == 1 else _run_pipeline(glif, stages, input_repr, start + i, [line], prune)
+        if result.errors:
+            failed = result.items if result.items else _input_items(input_repr, start + i, [line]).items
+            for item in failed:
+                item.errors.extend(result.errors)
+            results.extend(failed)
+        else:
+            results.extend(result.items)
+    return results
+
+
+def to_json_lines(start: int, items: Items) -> list[str]:
+    lines = [json.dumps(item.as_dict(), ensure_ascii=False) for item in items.items]
+    if items.errors:
+        lines.append(json.dumps({'chunk': start, 'errors': items.errors}, ensure_ascii=False))
+    return lines
+
+
+class BatchProcessor(object):
+    """ A GLIF instance with a parsed pipeline """
+    def __init__(self, make_glif: Callable[[], GlifABC], cells: list[str], commands: list[str],
+                 pipeline_command: str, input_repr: str, prune: bool = False):
+        self.glif = make_glif()
+        self.input_repr = input_repr
+        self.prune = prune
+        r = setup_glif(self.glif, cells, commands)
+        if not r.success:
+            raise BatchSetupException(f'Setup failed:\n{r.logs}')
+        stages = pipeline.parse_pipeline(self.glif.get_commands(), pipeline_command)
+        if not stages.success:
+            raise BatchSetupException(stages.logs)
+        assert stages.value
+        self.stages: list[Command] = stages.value
+
+    def process(self, chunk: tuple[int, list[str]]) -> tuple[int, list[str], bool]:
+        """ returns the number of input items, the JSON lines and whether there were errors """
+        start, lines = chunk
+        items = process_chunk(self.glif, self.stages, self.input_repr, start, lines, self.prune)
+        return len(lines), to_json_lines(start, items), bool(items.errors) or any(i.errors for i in items.items)
+
+
+class BatchSetupException(Exception):
+    pass
+
+
+# the `BatchProcessor` of a worker process (or the reason why it couldn't be created)
+_worker: Optional[BatchProcessor] = None
+_worker_setup_error: Optional[BatchSetupException] = None
+
+
+def _init_worker(*args):
+    # exceptions in pool initializers make the pool restart the worker forever,
+    # so the error is raised when the first chunk is processed
+    global _worker, _worker_setup_error
+    try:
+        _worker = BatchProcessor(*args)
+    except BatchSetupException as ex:
+        _worker_setup_error = ex
+
+
+def _process_in_worker(chunk: tuple[int, list[str]]) -> tuple[int, list[str], bool]:
+    if _worker_setup_error:
+        raise _worker_setup_error
+    assert _worker is not None
+    return _worker.process(chunk)
+
+
+def run_batch(lines: Iterable[str], out: TextIO, pipeline_command: str, input_repr: str = 'sentence',
+              cells: Optional[list[str]] = None, commands: Optional[list[str]] = None,
+              chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE, workers: int = 1,
+              make_glif: Callable[[], GlifABC] = default_glif,
+              progress: Optional[TextIO] = None, prune: bool = False) -> Result[int]:
+    """ processes the lines and writes the results to `out` (in the order of the input).
+        The items are written with all representations, unless `prune` is set.
+        Returns the number of processed input items (failing if any chunk had errors).
+        Note that with `workers > 1`, `make_glif` has to be picklable.
+    """
+    args = (make_glif, cells or [], commands or [], pipeline_command, input_repr, prune)
+    chunks = read_chunks(lines, chunk_size)
+    start_time = time.perf_counter()
+    processed = 0
+    failed_chunks = 0
+
+    def consume(results: Iterable[tuple[int, list[str], bool]]):
+        nonlocal processed, failed_chunks
+        for count, json_lines, failed in results:
+            for line in json_lines:
+                out.write(line + '\n')
+            processed += count
+            failed_chunks += failed
+            if progress:
+                elapsed = time.perf_counter() - start_time
+                progress.write(f'{processed} items ({processed / elapsed:.1f} items/s)\n')
+
+    try:
+        if workers <= 1:
+            processor = BatchProcessor(*args)
+            try:
+                consume(processor.process(chunk) for chunk in chunks)
+            finally:
+                processor.glif.do_shutdown()
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=args) as pool:
+                consume(pool.imap(_process_in_worker, chunks))
+    except BatchSetupException as ex:
+        return Result(False, logs=str(ex))
+
+    elapsed = time.perf_counter() - start_time
+    logs = f'Processed {processed} items in {elapsed:.2f} s ({processed / max(elapsed, 1e-9):.1f} items/s)'
+    if failed_chunks:
+        logs += f'\n{failed_chunks} chunk(s) had errors'
+    return Result(not failed_chunks, processed, logs)
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    cells = []
+    for path in args.cell:
+        with open(path, encoding='utf8') as fp:
+            cells.append(fp.read())
+    infile = open(args.input, encoding='utf8') if args.input != '-' else sys.stdin
+    outfile = open(args.output, 'w', encoding='utf8') if args.output != '-' else sys.stdout
+    try:
+        setup = args.setup
+        if args.store:
+            setup = [f'store -open {strformat(os.path.abspath(args.store))}'] + setup
+        r = run_batch(infile, outfile, args.pipeline, args.input_repr, cells, setup, args.chunk_size,
+                      args.workers, progress=sys.stderr if args.progress else None, prune=args.prune)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print(r.logs, file=sys.stderr)
+    return 0 if r.success else 1
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .backends import Backends
+    from .glif import Glif
+
+    backends = Backends(gf_prestart=args.gf_prestart)
+    if not args.no_warm_up:
+        threading.Thread(target=backends.get_mmt, daemon=True).start()
+        backends.gf_pool.warm_up()
+    if args.metrics_port is not None:
+        metrics_server = metrics.start_http_server(args.metrics_port, args.host)
+        print(f'Metrics at http://{args.host}:{metrics_server.server_port}/metrics', file=sys.stderr)
+    sessions = server.SessionManager(lambda: Glif(backends))
+    httpd = server.make_server(server.GlifRPC(sessions), args.host, args.port, args.unix_socket, args.verbose)
+    if args.unix_socket:
+        print(f'Listening on {args.unix_socket}', file=sys.stderr)
+    else:
+        print(f'Listening on http://{args.host}:{getattr(httpd, "server_port")}', file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        sessions.close_all()
+        backends.do_shutdown()
+    return 0
+
+
+def make_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='glif', description='Grammatical Logical Inference Framework')
+    subparsers = parser.add_subparsers(dest='subcommand', required=True)
+
+    run = subparsers.add_parser('run', help='apply a pipeline to every line of the input',
+                                description='Applies a GLIF pipeline to every line of the input '
+                                            'and writes the results as JSON Lines.')
+    run.add_argument('pipeline', help='the pipeline, e.g. "parse -cat=S | construct"')
+    run.add_argument('-i', '--input', default='-', help='input file with one item per line (default: stdin)')
+    run.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    run.add_argument('-r', '--input-repr', default='sentence', choices=INPUT_REPRS,
+                     help='representation of the input items (default: sentence)')
+    run.add_argument('-c', '--cell', action='append', default=[],
+                     help='file whose content is executed like a notebook cell before processing (repeatable)')
+    run.add_argument('-s', '--setup', action='append', default=[],
+                     help='command that is executed before processing, e.g. "import grammar.gf" (repeatable)')
+    run.add_argument('--chunk-size', type=int, default=DEFAULT_BATCH_CHUNK_SIZE,
+                     help=f'number of items processed at a time (default: {DEFAULT_BATCH_CHUNK_SIZE})')
+    run.add_argument('-j', '--workers', type=int, default=1,
+                     help='number of worker processes, each with its own GLIF instance (default: 1)')
+    run.add_argument('--progress', action='store_true', help='report the progress after every chunk')
+    run.add_argument('--prune', action='store_true',
+                     help='drop representations that are not needed by later commands '
+                          '(by default, the output contains all representations)')
+    run.add_argument('--store', help='SQLite database for the results of parse, linearize and construct, '
+                                     'which are re-used in later runs (see the "store" command)')
+    run.set_defaults(func=_cmd_run)
+
+    serve = subparsers.add_parser('serve', help='run a JSON-RPC server',
+                                  description='Offers GLIF sessions over JSON-RPC 2.0 (HTTP POST). '
+                                              'All sessions share MMT and a pool of pre-started GF shells.')
+    serve.add_argument('--host', default='127.0.0.1', help='(default: 127.0.0.1)')
+    serve.add_argument('-p', '--port', type=int, default=0, help='(default: a free port)')
+    serve.add_argument('--unix-socket', help='listen on this Unix socket instead of a TCP port')
+    serve.add_argument('--gf-prestart', type=int, default=2,
+                       help='number of idle GF shells that are kept ready for new sessions (default: 2)')
+    serve.add_argument('--no-warm-up', action='store_true', help='start the backends only when they are needed')
+    serve.add_argument('--metrics-port', type=int,
+                       help='serve metrics in the Prometheus text format on this port (0: a free port)')
+    serve.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    serve.set_defaults(func=_cmd_serve)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = make_argument_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
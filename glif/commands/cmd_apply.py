@@ -17,23 +17,26 @@ def apply_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: l
             ['No ELPI file was specified for the "{cmd.name}" command and no default file is available.'])
     if not file.endswith('.elpi'):
         file += '.elpi'
+    sigresult = glif.update_elpi_signatures()
+    # signatures that couldn't be generated are reported if ELPI fails (they might be the reason)
+    sigerrors = [sigresult.logs] if sigresult.logs else []
     predicate = keyval['predicate']
     new_items = Items([])
     if 'all' in keys:
         stdin = items_to_stdin(items, with_ast)
         r = runelpi(glif.get_cwd(), file, f'glif.apply_to_items {predicate}', typecheck, stdin)
         if not r.success:
-            return Items([]).with_errors(items.errors + [r.logs])
+            return Items([]).with_errors(items.errors + sigerrors + [r.logs])
         assert r.value
         new_item = Item(0).with_repr(Repr.DEFAULT, r.value[0])
         new_items.items.append(new_item)
     else:
-        new_items.errors = items.errors
+        new_items.with_errors(items.errors)
         for item in items.items:
             stdin = items_to_stdin(Items([item]), with_ast)
             r = runelpi(glif.get_cwd(), file, f'glif.apply_to_item {predicate}', typecheck, stdin)
             if not r.success:
-                return items.with_errors(items.errors + [r.logs])
+                return items.with_errors(sigerrors + [r.logs])
             # if not r.success:
             #     new_items.errors.append(r.logs)
             #     continue
@@ -57,4 +60,6 @@ APPLY_COMMAND_TYPE = GlifCommandType(
     apply_fn=apply_helper,
     inrepr=Repr.LOGIC_ELPI,
     main_args_as_items=True,
+    needs_all_items=lambda keyval, keys: 'all' in keys,
+    required_reprs={Repr.SENTENCE, Repr.AST, Repr.LOGIC_ELPI},
 )
@@ -0,0 +1,40 @@
+from .. import cache
+from ..glif_abc import GlifABC as Glif
+from glif.commands.items import Items, Repr
+from .glif_command import GlifCommandType, GlifArg
+
+
+def cache_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: list[str]) -> Items:
+    disk_cache = cache.get_cache()
+    if disk_cache is None:
+        return Items([]).with_errors(['The disk cache is disabled (GLIF_CACHE_SIZE=0)'])
+    if 'purge' in keys:
+        namespace = mainargs[0] if mainargs else None
+        try:
+            count = disk_cache.purge(namespace)
+        except ValueError as ex:
+            return Items([]).with_errors([str(ex)])
+        return Items.from_vals(Repr.DEFAULT, [f'Removed {count} entries' + (f' from {namespace}' if namespace else '')])
+    stats = disk_cache.stats()
+    total = sum(size for _, size in stats.values())
+    lines = [f'Disk cache: {disk_cache.directory} '
+             f'({total / 1024 / 1024:.1f} of {disk_cache.max_size / 1024 / 1024:.0f} MiB)']
+    lines += [f'    {namespace}: {count} entries ({size / 1024:.0f} KiB)'
+              for namespace, (count, size) in sorted(stats.items()) if not mainargs or namespace in mainargs]
+    if len(lines) == 1:
+        lines.append('    No entries')
+    return Items.from_vals(Repr.DEFAULT, ['\n'.join(lines)])
+
+
+CACHE_COMMAND_TYPE = GlifCommandType(
+    names=['cache'],
+    arguments=[
+        GlifArg(['purge'], 'Remove all entries (of the namespace given as argument, e.g. "svg")'),
+    ],
+    description='Shows the size of the disk cache (for SVGs, ELPI signatures and type checks) or purges it. '
+                'The cache is shared by all GLIF processes of the user and the least recently used entries are '
+                'removed when it gets larger than GLIF_CACHE_SIZE (in MiB, default: 512).',
+    max_main_args=1,
+    execute_fn=cache_helper,
+    example_calls=['cache', 'cache -purge', 'cache -purge svg'],
+)
@@ -31,21 +31,37 @@ def construct_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainarg
         return s
 
     asts = list({helperunwrap(item.try_get_repr(Repr.AST).value) for item in items.items})
-    r = mmt.construct(asts, archsub.value[0], archsub.value[1], view, delta_expand=delta_expand, simplify=simplify)
 
-    if not r.success:
-        return Items([]).with_errors(['"construct" failed.', r.logs])
-    assert r.value
+    # AST -> (MMT term, ELPI term)
+    results: dict[str, tuple[str, Optional[str]]] = {}
+    store = glif.get_store()
+    fingerprint = glif.get_fingerprint('mmt') if store else None
+    archive, subdir = archsub.value
+    options = f'{archive}{"/" + subdir if subdir else ""}/{view} delta-expand={delta_expand} simplify={simplify}'
+    if store and fingerprint:
+        known = store.get_many('construct', fingerprint, options, asts)
+        results.update((ast, (terms[0], terms[1])) for ast, terms in known.items())
+    missing = [ast for ast in asts if ast not in results]
+    if missing:
+        r = mmt.construct(missing, archsub.value[0], archsub.value[1], view, delta_expand=delta_expand,
+                          simplify=simplify)
+        if not r.success:
+            return Items([]).with_errors(['"construct" failed.', r.logs])
+        assert r.value
+        new = {ast: (r.value['mmt'][i], r.value['elpi'][i] if 'elpi' in r.value else None)
+               for i, ast in enumerate(missing)}
+        results.update(new)
+        if store and fingerprint:
+            store.put_many('construct', fingerprint, options, new)
 
-    d = {asts[i]: i for i in range(len(asts))}
-    new_items = Items([])
-    new_items.errors = items.errors
+    new_items = Items([]).with_errors(items.errors)
     for item in items.items:
         astrepr = item.try_get_repr(Repr.AST)
         assert astrepr.value
-        i = item.get_clone().with_repr(Repr.LOGIC_STANDARD, r.value['mmt'][d[astrepr.value]])
-        if 'elpi' in r.value:
-            i = i.with_repr(Repr.LOGIC_ELPI, r.value['elpi'][d[astrepr.value]], False)
+        mmt_term, elpi_term = results[astrepr.value]
+        i = item.get_clone().with_repr(Repr.LOGIC_STANDARD, mmt_term)
+        if elpi_term is not None:
+            i = i.with_repr(Repr.LOGIC_ELPI, elpi_term, False)
         if not astrepr.success:
             i.errors.append(astrepr.logs)
         new_items.items.append(i)
@@ -62,5 +78,7 @@ CONSTRUCT_COMMAND_TYPE = GlifCommandType(
     description='Applies the semantics construction',
     main_args_as_items=True,
     apply_fn=construct_helper,
+    needs_all_items=True,  # every AST is sent to MMT only once, even if it occurs in different chunks
     inrepr=Repr.AST,
+    required_reprs={Repr.AST},
 )
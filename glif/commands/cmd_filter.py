@@ -17,11 +17,14 @@ def filter_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs:
             ['No ELPI file was specified for the "{cmd.name}" command and no default file is available.'])
     if not file.endswith('.elpi'):
         file += '.elpi'
+    sigresult = glif.update_elpi_signatures()
+    # signatures that couldn't be generated are reported if ELPI fails (they might be the reason)
+    sigerrors = [sigresult.logs] if sigresult.logs else []
     predicate = keyval['predicate']
     stdin = items_to_stdin(items, with_ast)
     r = runelpi(glif.get_cwd(), file, f'glif.filter {predicate}', typecheck, stdin)
     if not r.success:
-        return items.with_errors(items.errors + [r.logs])
+        return items.with_errors(sigerrors + [r.logs])
     tokeep = []
     output = []
     assert r.value
@@ -48,4 +51,5 @@ FILTER_COMMAND_TYPE = GlifCommandType(
     apply_fn=filter_helper,
     inrepr=Repr.LOGIC_ELPI,
     main_args_as_items=True,
+    required_reprs={Repr.SENTENCE, Repr.AST, Repr.LOGIC_ELPI},
 )
@@ -14,6 +14,8 @@ def help_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: li
         result.sort()
         result = ['Currently available commands:'] + result
         result.append('\n\nRun "help [COMMAND]" to learn more about a particular command')
+        result.append('Representations that are not needed by later commands in a pipeline are dropped. '
+                      'Use e.g. "-keep=ast,logic" (or "-keep=all") with any command to keep them.')
     else:
         for arg in mainargs:
             if arg not in commands:
@@ -47,4 +47,6 @@ POPULATE_COMMAND_TYPE = GlifCommandType(
     main_args_as_items=True,
     apply_fn=populate_helper,
     inrepr=Repr.LOGIC_STANDARD,
+    needs_all_items=True,
+    required_reprs={Repr.LOGIC_STANDARD},
 )
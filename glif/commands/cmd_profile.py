@@ -0,0 +1,111 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+
+from .. import metrics
+from ..glif_abc import GlifABC as Glif
+from glif.commands.command import Command
+from glif.commands.items import Items, Repr
+from .glif_command import GlifCommandType, GlifArg
+from ..parsing import parse_command_head
+from ..utils import Result
+
+SORT_KEYS = {'cumtime', 'tottime', 'ncalls', 'pcalls', 'name', 'filename'}
+
+
+def _backend_times() -> dict[str, tuple[int, float]]:
+    """ backend -> (number of calls, total time) of the calls made by the current thread """
+    times: dict[str, tuple[int, float]] = {}
+    for (backend, _), (count, seconds) in metrics.BACKEND_CALLS.thread_totals().items():
+        old = times.get(backend, (0, 0.0))
+        times[backend] = (old[0] + count, old[1] + seconds)
+    return times
+
+
+def profile_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: list[str]) -> Items:
+    if not keyval['top'].isdigit():
+        return Items([]).with_errors([f'Expected a number for -top (found "{keyval["top"]}")'])
+    command = mainargs[0]
+
+    backend_before = _backend_times()
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    profiler.enable()
+    try:
+        result = glif.execute_command(command)
+    finally:
+        profiler.disable()
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    backend_after = _backend_times()
+
+    lines = [f'Profile of: {command}']
+    if result.value:
+        lines.append(f'Items: {len(result.value.items)}')
+    lines.append(f'Wall time: {wall:.3f} s')
+    lines.append(f'Python CPU time: {cpu:.3f} s')
+    backend_total = 0.0
+    for backend, (count, seconds) in sorted(backend_after.items()):
+        old_count, old_seconds = backend_before.get(backend, (0, 0.0))
+        if count > old_count:
+            lines.append(f'Waiting for {backend}: {seconds - old_seconds:.3f} s ({count - old_count} calls)')
+            backend_total += seconds - old_seconds
+    lines.append(f'Other waiting: {max(wall - cpu - backend_total, 0.0):.3f} s')
+
+    if 'dump' in keys:
+        path = os.path.join(glif.get_cwd(), keyval['file'])
+        profiler.dump_stats(path)
+        lines.append(f'Profile written to {path}')
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(keyval['sort']).print_stats(int(keyval['top']))
+    lines.append('')
+    lines.append(stream.getvalue().strip())
+
+    errors = []
+    if not result.success:
+        errors.append('The profiled command failed:\n' + result.logs)
+    return Items.from_vals(Repr.DEFAULT, ['\n'.join(lines)]).with_errors(errors)
+
+
+class ProfileCommandType(GlifCommandType):
+    """ the rest of the pipeline (including pipes) is the main argument """
+
+    def from_string(self, string: str) -> Result[tuple[Command, str]]:
+        head = parse_command_head(string)
+        if not head.success:
+            return Result(False, logs=head.logs)
+        assert head.value
+        cmd, rest = head.value
+        assert cmd.name in self.names
+        if rest.strip():
+            cmd.mainargs.append(rest.strip())
+        command = self._basiccommand_to_command(cmd)
+        if not command.success:
+            return Result(False, logs=command.logs)
+        assert command.value
+        command.value.basic_command = cmd
+        return Result(True, (command.value, ''))
+
+
+PROFILE_COMMAND_TYPE = ProfileCommandType(
+    names=['profile'],
+    arguments=[
+        GlifArg(['sort'], 'Sort order of the functions', default_value='cumtime', value_set=SORT_KEYS),
+        GlifArg(['top'], 'Number of functions that are shown', default_value='30'),
+        GlifArg(['dump'], 'Write the profile to a file (see -file) that can be analyzed with pstats'),
+        GlifArg(['file', 'f'], 'File for -dump', default_value='profile.pstats'),
+    ],
+    description='Runs the rest of the pipeline with cProfile and shows the functions that took the most time. '
+                'The time spent waiting for GF, MMT, ELPI and dot is shown separately. '
+                'Only the current thread is measured: '
+                'commands that run in other threads (see Glif.pipeline_queue_size) are not profiled.',
+    min_main_args=1,
+    max_main_args=1,
+    execute_fn=profile_helper,
+    example_calls=['profile parse "someone loves someone" | construct',
+                   'profile -sort=tottime -top=10 -dump p "someone loves someone"'],
+)
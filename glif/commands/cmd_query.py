@@ -16,9 +16,11 @@ def query_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: l
             ['No ELPI file was specified for the "{cmd.name}" command and no default file is available.'])
     if not file.endswith('.elpi'):
         file += '.elpi'
+    sigresult = glif.update_elpi_signatures()
+    # signatures that couldn't be generated are reported if ELPI fails (they might be the reason)
+    sigerrors = [sigresult.logs] if sigresult.logs else []
 
-    new_items = Items([])
-    new_items.errors = items.errors
+    new_items = Items([]).with_errors(items.errors)
     for item in items.items:
         query = item.try_get_repr(Repr.DEFAULT)
         assert query.value
@@ -27,7 +29,8 @@ def query_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: l
         r = runelpi(glif.get_cwd(), file, f'glif.query {keyval["number"]} ({query.value})', typecheck,
                     filterstderr=infofilter)
         if not r.success:
-            new_items.errors.append(r.logs)
+            new_items.errors.extend(sigerrors + [r.logs])
+            sigerrors = []  # only reported once
             continue
         assert r.value
         new_item = item.get_clone().with_repr(Repr.DEFAULT, r.value[0] + r.value[1].strip())
@@ -48,4 +51,5 @@ QUERY_COMMAND_TYPE = GlifCommandType(
     apply_fn=query_helper,
     inrepr=Repr.DEFAULT,
     main_args_as_items=True,
+    required_reprs={Repr.DEFAULT},
 )
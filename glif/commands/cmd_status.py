@@ -1,7 +1,9 @@
+import os
 import subprocess
 from distutils.spawn import find_executable
 from typing import Any
 
+from .. import tracing
 from glif.commands.items import Items, Repr
 from .glif_command import GlifCommandType, GlifArg
 
@@ -31,22 +33,26 @@ def status_helper(glif: Any, keyval: dict[str, str], keys: set[str], mainargs: l
         glif.get_mmt()
     result.append('')
     result.append('MMT STATUS')
-    if glif._mmt:
-        result.append(f'MMT is running on port {glif._mmt.server.port}')
+    backends = glif.backends
+    mmt = backends.get_running_mmt()
+    if mmt:
+        result.append(f'MMT is running on port {mmt.server.port}')
     else:
         result.append('MMT is not running')
+    if not glif._ownsbackends:
+        result.append('MMT is shared with other sessions')
     result.append('Logs from initialization')
-    result += glif._findMMTlogs
-    if glif._mmtFailedStartupMessage:
-        result.append(glif._mmtFailedStartupMessage)
+    result += backends.findMMTlogs
+    if backends.mmtFailedStartupMessage:
+        result.append(backends.mmtFailedStartupMessage)
     if 'mmt-logs' in keys:
         result.append('MMT STARTUP LOGS')
-        if glif._mmt:
-            result += glif._mmt.server.mmtlogstart
+        if mmt:
+            result += mmt.server.mmtlogstart
             result.append('MMT MOST RECENT LOGS')
-            result += glif._mmt.server.mmtlogtail
+            result += mmt.server.mmtlogtail
         else:
-            result += glif._mmtFailedStartupLogs
+            result += backends.mmtFailedStartupLogs
 
     # ELPI
     result.append('')
@@ -62,6 +68,21 @@ def status_helper(glif: Any, keyval: dict[str, str], keys: set[str], mainargs: l
             result.append('"elpi -version" failed (file not found)')
         except subprocess.CalledProcessError:
             result.append('"elpi -version" failed')
+    if glif._staleelpisigs:
+        result.append('ELPI signatures that will be generated on the next use of ELPI: ' +
+                      ', '.join(os.path.basename(path) for path in glif._staleelpisigs))
+    if glif._failedelpisigs:
+        result.append('ELPI signatures that could not be generated (they are generated again when the grammars '
+                      'are re-imported):')
+        result += glif._failedelpisigs.values()
+
+    # Tracing
+    result.append('')
+    result.append('TRACING')
+    result.append(f'Tracing is {"enabled" if tracing.enabled() else "disabled"} '
+                  f'({len(tracing.TRACER.spans())} spans recorded)')
+    if 'trace' in keys:
+        result.append(tracing.TRACER.summary())
 
     return Items.from_vals(Repr.DEFAULT, result)
 
@@ -73,6 +94,7 @@ STATUS_COMMAND_TYPE = GlifCommandType(
         GlifArg(['load-mmt', 'lm'], 'Load the MMT interface if it hadn\'t been loaded before'),
         GlifArg(['gf-logs', 'gl'], 'Show the output of the GF start-up'),
         GlifArg(['mmt-logs', 'ml'], 'Show MMT logs'),
+        GlifArg(['trace', 't'], 'Show a summary of the recorded spans (see the trace command)'),
     ],
     description='Prints information about the GLIF status',
     max_main_args=0,
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+
+from ..glif_abc import GlifABC as Glif
+from ..store import ResultStore
+from glif.commands.items import Items, Repr
+from .glif_command import GlifCommandType, GlifArg
+
+DEFAULT_STORE_FILE = 'glif-store.sqlite'
+DEFAULT_EXPORT_FILE = 'glif-store.jsonl'
+
+
+def store_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: list[str]) -> Items:
+    if 'open' in keys and 'export' in keys:
+        return Items([]).with_errors(['"-open" and "-export" cannot be combined (they both take the file argument)'])
+    output = []
+    if 'open' in keys:
+        path = os.path.join(glif.get_cwd(), mainargs[0] if mainargs else DEFAULT_STORE_FILE)
+        try:
+            glif.set_store(ResultStore(path))
+        except sqlite3.Error as ex:
+            return Items([]).with_errors([f'Failed to open the result store {path}: {ex}'])
+        output.append(f'Results of parse, linearize and construct are stored in {path}')
+    elif 'close' in keys:
+        glif.set_store(None)
+        return Items.from_vals(Repr.DEFAULT, ['The result store is closed'])
+
+    store = glif.get_store()
+    if store is None:
+        return Items([]).with_errors(['No result store has been opened (use "store -open")'])
+    if 'export' in keys:
+        path = os.path.join(glif.get_cwd(), mainargs[0] if mainargs else DEFAULT_EXPORT_FILE)
+        try:
+            with open(path, 'w', encoding='utf8') as fp:
+                count = store.export(fp)
+        except OSError as ex:
+            return Items.from_vals(Repr.DEFAULT, output).with_errors([f'Failed to export the results: {ex}'])
+        output.append(f'Exported {count} results to {path}')
+    if 'prune' in keys:
+        try:
+            days = float(keyval['days'])
+        except ValueError:
+            return Items([]).with_errors([f'Expected a number of days, found "{keyval["days"]}"'])
+        count = store.prune(days * 24 * 60 * 60)
+        output.append(f'Removed {count} results')
+    if not output or 'stats' in keys:
+        stats = store.stats()
+        lines = [f'Result store: {store.path} ({os.path.getsize(store.path) / 1024:.0f} KiB)']
+        lines += [f'    {kind}: {count} results for {fingerprints} fingerprint(s)'
+                  for kind, count, fingerprints in stats]
+        if not stats:
+            lines.append('    No results')
+        output.append('\n'.join(lines))
+    return Items.from_vals(Repr.DEFAULT, output)
+
+
+STORE_COMMAND_TYPE = GlifCommandType(
+    names=['store'],
+    arguments=[
+        GlifArg(['open'], 'Open (or create) the SQLite database given as argument '
+                          f'(default: {DEFAULT_STORE_FILE}) and use it for the results of parse, linearize and '
+                          'construct. Known inputs are then answered without backend calls.'),
+        GlifArg(['close'], 'Stop using the result store'),
+        GlifArg(['stats'], 'Show the number of stored results (default if no other flag is given)'),
+        GlifArg(['prune'], 'Remove the results that have not been used for the number of days given by -days'),
+        GlifArg(['days'], 'Used by -prune', default_value='30'),
+        GlifArg(['export'], 'Export all results as JSON lines to the file given as argument '
+                            f'(default: {DEFAULT_EXPORT_FILE})'),
+    ],
+    description='Manages the persistent store for results of backend calls. '
+                'Results are stored per fingerprint of the imported grammars and theories, '
+                'so they are not used after the files have changed.',
+    max_main_args=1,
+    execute_fn=store_helper,
+    example_calls=['store -open results.sqlite', 'store', 'store -prune -days=0', 'store -export results.jsonl'],
+)
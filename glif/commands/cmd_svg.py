@@ -0,0 +1,43 @@
+from ..glif_abc import GlifABC as Glif
+from ..utils import dot2svg_many
+from glif.commands.items import Item, Items, Repr
+from .glif_command import GlifCommandType
+
+
+def graphs_to_svg(items: Items) -> Items:
+    """ adds the SVG version of the dot graphs of all items (rendered at once, see `dot2svg_many`) """
+    new_items = Items([]).with_errors(items.errors)
+    graphs: list[tuple[Item, bytes]] = []
+    for item in items.items:
+        dot = item.try_get_repr(Repr.GRAPH_DOT)
+        if not dot.success:
+            new_items.errors.append(dot.logs)
+            continue
+        assert dot.value is not None
+        graphs.append((item, dot.value.encode('utf8')))
+    for (item, _), svg in zip(graphs, dot2svg_many([dot for _, dot in graphs])):
+        if not svg.success:
+            new_items.errors.append(svg.logs)
+            continue
+        assert svg.value is not None
+        value = svg.value.decode('utf8', errors='replace')
+        new_items.append(item.get_clone().with_repr(Repr.GRAPH_SVG, value, update_default=False, html_version=value))
+    return new_items
+
+
+def svg_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: list[str], items: Items) -> Items:
+    return graphs_to_svg(items)
+
+
+SVG_COMMAND_TYPE = GlifCommandType(
+    names=['svg'],
+    arguments=[],
+    description='Renders graphs in the dot format (e.g. from visualize_tree) as SVG using graphviz. '
+                'The graphs of all items are rendered with several dot processes at the same time and the SVGs '
+                'are kept in the disk cache (see the cache command).',
+    apply_fn=svg_helper,
+    inrepr=Repr.GRAPH_DOT,
+    main_args_as_items=True,
+    required_reprs={Repr.GRAPH_DOT},
+    example_calls=['parse "someone loves someone" | visualize_tree | svg', 'svg "digraph { a -> b }"'],
+)
@@ -0,0 +1,48 @@
+import os
+
+from .. import tracing
+from ..glif_abc import GlifABC as Glif
+from glif.commands.items import Items, Repr
+from .glif_command import GlifCommandType, GlifArg
+
+DEFAULT_TRACE_FILE = 'trace.json'
+
+
+def trace_helper(glif: Glif, keyval: dict[str, str], keys: set[str], mainargs: list[str]) -> Items:
+    output = []
+    if 'start' in keys:
+        tracing.enable(clear='clear' in keys)
+        output.append('Tracing is enabled')
+    elif 'clear' in keys:
+        tracing.TRACER.clear()
+        output.append('Cleared the recorded spans')
+    if 'stop' in keys:
+        tracing.disable()
+        output.append('Tracing is disabled')
+    if 'export' in keys:
+        path = os.path.join(glif.get_cwd(), mainargs[0] if mainargs else DEFAULT_TRACE_FILE)
+        try:
+            tracing.TRACER.write_chrome_trace(path)
+        except OSError as ex:
+            return Items.from_vals(Repr.DEFAULT, output).with_errors([f'Failed to export the trace: {ex}'])
+        output.append(f'Exported {len(tracing.TRACER.spans())} spans to {path}')
+    if not output:
+        output.append(tracing.TRACER.summary())
+    return Items.from_vals(Repr.DEFAULT, output)
+
+
+TRACE_COMMAND_TYPE = GlifCommandType(
+    names=['trace'],
+    arguments=[
+        GlifArg(['start'], 'Start recording spans (for commands and backend calls)'),
+        GlifArg(['stop'], 'Stop recording spans'),
+        GlifArg(['clear'], 'Remove the recorded spans'),
+        GlifArg(['export'], 'Export the recorded spans in Chrome\'s trace event format '
+                            f'to the file given as argument (default: {DEFAULT_TRACE_FILE}), '
+                            'which can be opened in chrome://tracing or https://ui.perfetto.dev'),
+    ],
+    description='Traces where the time is spent. Without arguments, a summary of the recorded spans is shown.',
+    max_main_args=1,
+    execute_fn=trace_helper,
+    example_calls=['trace -start', 'trace', 'trace -stop -export trace.json'],
+)
@@ -1,13 +1,22 @@
-from typing import Callable, Optional
+import functools
+from typing import Callable, Optional, Iterator
 from abc import ABC, abstractmethod
 
+from .. import metrics, tracing
 from ..glif_abc import GlifABC as Glif
-from glif.commands.items import Items
+from glif.commands.items import Items, ItemStream, Repr, REPR_NAMES, DEFAULT_CHUNK_SIZE
 from ..parsing import parse_basic_command, BasicCommand
 from ..utils import Result
 
+COMMAND_CACHE_SIZE = 1024  # number of parsed command strings that are cached
+# longer command strings (e.g. with many sentences) are not cached, so that they aren't kept in memory
+COMMAND_CACHE_MAX_LENGTH = 1000
+
 
 class CommandTypeABC(ABC):
+    # representations of the input items that commands of this type use (None if unknown)
+    required_reprs: Optional[frozenset[Repr]] = None
+
     @abstractmethod
     def get_main_name(self) -> str:
         raise NotImplementedError()
@@ -26,15 +35,24 @@ class Command(object):
                  command_type: CommandTypeABC,
                  execute_fn: Optional[Callable[[Glif], Items]] = None,
                  apply_fn: Optional[Callable[[Glif, Items], Items]] = None,
-                 itemsFromArgs: Optional[Items] = None):
+                 itemsFromArgs: Optional[Items] = None,
+                 needs_all_items: bool = False):
         self.command_type = command_type
         self.execute_fn = execute_fn
         self.apply_fn = apply_fn
         self.itemsFromArgs = itemsFromArgs
+        self.needs_all_items = needs_all_items  # if False, `apply_fn` can be applied to chunks of the items
+        self.keep: frozenset[Repr] = frozenset()  # representations that must not be pruned (`-keep=...`)
+        self.basic_command: Optional[BasicCommand] = None  # the parsed command string (if available)
+
+    def _args_as_items(self) -> Items:
+        """ a copy of `self.itemsFromArgs` (commands are cached and might be executed repeatedly) """
+        assert self.itemsFromArgs is not None
+        return Items([item.get_clone() for item in self.itemsFromArgs.items]).with_errors(self.itemsFromArgs.errors)
 
     def execute(self, glif: Glif) -> Items:
         if self.itemsFromArgs:
-            return self._internal_apply(glif, self.itemsFromArgs)
+            return self._internal_apply(glif, self._args_as_items())
         elif self.execute_fn:
             return self.execute_fn(glif)
         else:
@@ -43,7 +61,7 @@ class Command(object):
     def apply(self, glif: Glif, items: Items) -> Items:
         """ If input is provided (`items`) """
         if self.itemsFromArgs and self.itemsFromArgs.items:
-            return self.itemsFromArgs.with_errors(
+            return self._args_as_items().with_errors(
                 [f'No input was expected for command {self.command_type.get_main_name()}'])
         return self._internal_apply(glif, items)
 
@@ -52,6 +70,48 @@ class Command(object):
             return items.with_errors([f'No input was expected for the command {self.command_type.get_main_name()}'])
         return self.apply_fn(glif, items)
 
+    def execute_stream(self, glif: Glif, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ItemStream:
+        """ like `execute`, but items from the arguments are processed in chunks """
+        if self.itemsFromArgs and self.apply_fn:
+            return self._map_stream(ItemStream.from_items(self._args_as_items(), chunk_size),
+                                    lambda items: self._internal_apply(glif, items))
+
+        def helper() -> Iterator[Items]:
+            yield from self._instrumented(lambda _: self.execute(glif))(Items([])).chunks(chunk_size)
+        return ItemStream(helper(), chunk_size)
+
+    def apply_stream(self, glif: Glif, stream: ItemStream) -> ItemStream:
+        """ like `apply`, but for a stream of items """
+        return self._map_stream(stream, lambda items: self.apply(glif, items))
+
+    def _instrumented(self, fn: Callable[[Items], Items]) -> Callable[[Items], Items]:
+        """ adds tracing and metrics to `fn`, which processes a chunk of items.
+            The command counts as executed once it processes its first chunk.
+        """
+        name = self.command_type.get_main_name()
+        counted = False  # the chunks of a stream are processed one after the other
+
+        def instrumented(items: Items) -> Items:
+            nonlocal counted
+            if not counted:
+                counted = True
+                metrics.COMMANDS.inc(command=name)
+            with tracing.span(name, 'command', items_in=len(items.items)) as span, \
+                    metrics.COMMAND_DURATION.time(command=name):
+                result = fn(items)
+                span.set(items_out=len(result.items))
+            if result.errors and not items.errors:
+                result.failed_command = name
+            metrics.COMMAND_ITEMS.inc(len(result.items), command=name)
+            return result
+        return instrumented
+
+    def _map_stream(self, stream: ItemStream, fn: Callable[[Items], Items]) -> ItemStream:
+        fn = self._instrumented(fn)
+        if self.needs_all_items:
+            return stream.map_all(fn)
+        return stream.map(fn)
+
 
 class CommandType(CommandTypeABC):
     """
@@ -66,21 +126,56 @@ class CommandType(CommandTypeABC):
         self.names: list[str] = names  # Command names, e.g. ['view_tree', 'vt']
 
     def from_string(self, string: str) -> Result[tuple[Command, str]]:
-        """ returns (concrete command, remaining string (in case of pipes)). """
+        """ returns (concrete command, remaining string (in case of pipes)).
+            The results are cached as the same commands are often used repeatedly (unless they are long).
+        """
         string = string.strip()
+        if len(string) > COMMAND_CACHE_MAX_LENGTH:
+            return self._from_string(string)
+        return self._from_string_cached(string)
+
+    @functools.lru_cache(maxsize=COMMAND_CACHE_SIZE)
+    def _from_string_cached(self, string: str) -> Result[tuple[Command, str]]:
+        return self._from_string(string)
+
+    def _from_string(self, string: str) -> Result[tuple[Command, str]]:
         cmdresult = parse_basic_command(string, split_mainarg_at_space=self._split_mainarg_at_space)
         if not cmdresult.success:
             return Result(False, logs=cmdresult.logs)
         assert cmdresult.value
         cmd, rest = cmdresult.value
         assert cmd.name in self.names
+        keep = self._extract_keep(cmd)
+        if not keep.success:
+            return Result(False, logs=keep.logs)
         command = self._basiccommand_to_command(cmd)
         if command.success:
-            assert command.value
+            assert command.value and keep.value is not None
+            command.value.keep = keep.value
+            command.value.basic_command = cmd
             return Result(True, value=(command.value, rest))
         else:
             return Result(False, None, command.logs)
 
+    @staticmethod
+    def _extract_keep(cmd: BasicCommand) -> Result[frozenset[Repr]]:
+        """ removes the `-keep=...` argument (which is supported by all commands) """
+        keep: set[Repr] = set()
+        for arg in cmd.args:
+            if arg.key != 'keep':
+                continue
+            for name in arg.value.split(','):
+                name = name.strip()
+                if name == 'all':
+                    keep.update(Repr)
+                elif name in REPR_NAMES:
+                    keep.add(REPR_NAMES[name])
+                else:
+                    return Result(False, logs=f'Unknown representation "{name}" in "-keep" '
+                                              f'(expected one of: all, {", ".join(REPR_NAMES)})')
+        cmd.args = [arg for arg in cmd.args if arg.key != 'keep']
+        return Result(True, frozenset(keep))
+
     def _basiccommand_to_command(self, cmd: BasicCommand) -> Result[Command]:
         raise NotImplementedError()
 
@@ -94,3 +189,13 @@ class CommandType(CommandTypeABC):
 
     def get_main_name(self) -> str:
         return self.names[0]
+
+
+def _command_cache_lookups() -> dict[tuple[str, ...], float]:
+    info = CommandType._from_string_cached.cache_info()
+    return {('hit',): info.hits, ('miss',): info.misses}
+
+
+metrics.REGISTRY.register(metrics.CallbackMetric('glif_command_cache_lookups_total',
+                                                 'Lookups of parsed commands in the command cache', 'counter',
+                                                 _command_cache_lookups, ('result',)))
@@ -1,64 +1,121 @@
 import re
-from typing import Optional
+from typing import Callable, Optional
 
 from .command import Command, CommandType
 from ..glif_abc import GlifABC as Glif
 from glif.commands.items import Repr, Items, Item
 from ..parsing import BasicCommand
+from ..store import ResultStore
 from ..utils import Result
 
 
+def run_gf_command(glif: Glif, gf_command: str, outrepr: Repr, error_regexes: list[re.Pattern],
+                   on_item: Optional[Item], original_sentences: bool = True) -> Items:
+    """ runs the command in the GF shell and turns the output into items (clones of `on_item` if provided) """
+    gfshell = glif.get_gf_shell()
+    if not gfshell.success:
+        return Items([]).with_errors((on_item.errors if on_item else []) + [gfshell.logs])
+    assert gfshell.value
+    output = gfshell.value.handle_command(gf_command)
+    return gf_output_to_items(output, outrepr, error_regexes, on_item, original_sentences)
+
+
+def gf_output_to_items(output: str, outrepr: Repr, error_regexes: list[re.Pattern], on_item: Optional[Item],
+                       original_sentences: bool = True) -> Items:
+    """ `original_sentences`: new sentences (without `on_item`) are also the original sentences """
+    errs: list[str] = []
+    vals: list[str]
+    if outrepr == Repr.GRAPH_DOT:
+        vals = [output]
+    else:
+        vals = []
+        for line in output.splitlines():
+            line = line.strip()
+            if any(error_regex.match(line) for error_regex in error_regexes):
+                errs.append(line)
+            else:
+                vals.append(line)
+    if on_item:
+        items = Items([]).with_errors(errs)
+        for val in vals:
+            items.append(on_item.get_clone().with_repr(outrepr, val))
+        return items
+    elif original_sentences:
+        return Items.from_vals(outrepr, vals).with_errors(errs)
+    else:
+        return Items([Item(i).with_repr(outrepr, val) for i, val in enumerate(vals)]).with_errors(errs)
+
+
 class GfCommandType(CommandType):
     """ for standard GF commands """
 
     def __init__(self, names: list[str], inrepr: Optional[Repr], outrepr: Repr,
-                 error_regex: Optional[re.Pattern] = None):
+                 error_regex: Optional[re.Pattern] = None, storable: bool = False):
         super().__init__(names)
         self.inrepr = inrepr
         self.outrepr = outrepr
+        # the output only depends on the input and the grammars, so it can be kept in the result store
+        self.storable = storable
+        self.required_reprs = frozenset({inrepr} if inrepr else set())
         if inrepr == Repr.AST:
             self._split_mainarg_at_space = False  # e.g. "linearize abc (def ghi)"
-        self.error_regex = error_regex
+        self.error_regexes: list[re.Pattern] = [error_regex] if error_regex else []
+        # whether the output of a call without input items are original sentences
+        # (not the case for fused commands like `gr | l`)
+        self.original_sentences = True
 
     def _basiccommand_to_command(self, cmd: BasicCommand) -> Result[Command]:
+        return Result(True, self._make_command(cmd.gf_format, cmd.mainargs))
+
+    def _make_command(self, gf_format: Callable[[Optional[str], bool], str], mainargs: list[str]) -> Command:
         def run(glif: Glif, on_item: Optional[Item]) -> Items:
-            gfshell = glif.get_gf_shell()
-            if not gfshell.success:
-                return Items([]).with_errors((on_item.errors if on_item else []) + [gfshell.logs])
-            assert gfshell.value
             if on_item:
                 assert self.inrepr
                 inp = on_item.try_get_repr(self.inrepr)
                 assert inp.value
-                output = gfshell.value.handle_command(cmd.gf_format(inp.value, self.inrepr != Repr.AST))
-            else:
-                output = gfshell.value.handle_command(cmd.gf_format(None))
-            errs: list[str] = []
-            vals: list[str]
-            if self.outrepr == Repr.GRAPH_DOT:
-                vals = [output]
-            else:
-                vals = []
-                for line in output.splitlines():
-                    line = line.strip()
-                    if self.error_regex and self.error_regex.match(line):
-                        errs.append(line)
-                    else:
-                        vals.append(line)
-            if on_item:
-                items = Items([]).with_errors(errs)
-                for val in vals:
-                    items.items.append(on_item.get_clone().with_repr(self.outrepr, val))
-                return items
+                gf_command = gf_format(inp.value, self.inrepr != Repr.AST)
             else:
-                return Items.from_vals(self.outrepr, vals).with_errors(errs)
+                gf_command = gf_format(None, False)
+            return run_gf_command(glif, gf_command, self.outrepr, self.error_regexes, on_item, self.original_sentences)
+
+        def apply(glif: Glif, items: Items) -> Items:
+            store = glif.get_store() if self.storable else None
+            fingerprint = glif.get_fingerprint('gf') if store else None
+            if not store or not fingerprint:
+                return items.flatmap(lambda item: run(glif, item))
+            return self._apply_stored(glif, store, fingerprint, gf_format, items)
 
         if self.inrepr:
-            return Result(True, Command(self, lambda glif: run(glif, None),
-                                        lambda glif, items: items.flatmap(lambda item: run(glif, item)),
-                                        Items.from_vals(self.inrepr, cmd.mainargs) if cmd.mainargs else None))
+            return Command(self, lambda glif: run(glif, None), apply,
+                           Items.from_vals(self.inrepr, mainargs) if mainargs else None)
         else:
-            return Result(True, Command(self, lambda glif: run(glif, None), None, None))
+            return Command(self, lambda glif: run(glif, None), None, None)
+
+    def _apply_stored(self, glif: Glif, store: ResultStore, fingerprint: str,
+                      gf_format: Callable[[Optional[str], bool], str], items: Items) -> Items:
+        """ like `items.flatmap(...)`, but outputs for known inputs are taken from the store """
+        assert self.inrepr
+        kind = self.get_main_name()
+        options = gf_format(None, False).strip()
+        inputs = {item: item.try_get_repr(self.inrepr).value for item in items.items}
+        known = store.get_many(kind, fingerprint, options, [i for i in inputs.values() if i is not None])
+        new: dict[str, str] = {}
+
+        def run(item: Item) -> Items:
+            inp = inputs[item]
+            assert inp is not None
+            output = known.get(inp, new.get(inp))
+            if output is None:
+                gfshell = glif.get_gf_shell()
+                if not gfshell.success:
+                    return Items([]).with_errors(item.errors + [gfshell.logs])
+                assert gfshell.value
+                output = new[inp] = gfshell.value.handle_command(gf_format(inp, self.inrepr != Repr.AST))
+            return gf_output_to_items(output, self.outrepr, self.error_regexes, item)
+
+        result = items.flatmap(run)
+        store.put_many(kind, fingerprint, options, new)
+        return result
 
     def get_long_descr(self, glif: Glif) -> str:
         if not self._long_descr:
@@ -74,13 +131,47 @@ class GfCommandType(CommandType):
             return self._long_descr
 
 
+def can_fuse(first: Command, second: Command) -> bool:
+    """ checks if `first | second` can be sent to GF as a single command (using GF's pipes) """
+    return isinstance(first.command_type, GfCommandType) and isinstance(second.command_type, GfCommandType) and \
+        first.basic_command is not None and second.basic_command is not None and \
+        not second.basic_command.mainargs and \
+        first.command_type.outrepr != Repr.GRAPH_DOT and first.command_type.outrepr == second.command_type.inrepr
+
+
+def fuse_gf_commands(commands: list[Command]) -> Command:
+    """ combines consecutive GF commands into a single one.
+        Note that the resulting items only get the representation of the last command.
+    """
+    assert len(commands) > 1 and all(can_fuse(a, b) for a, b in zip(commands, commands[1:]))
+    types = [cmd.command_type for cmd in commands]
+    basic_commands = [cmd.basic_command for cmd in commands]
+    assert all(isinstance(t, GfCommandType) for t in types) and all(basic_commands)
+    first_type: GfCommandType = types[0]  # type: ignore
+    last_type: GfCommandType = types[-1]  # type: ignore
+    first_command: BasicCommand = basic_commands[0]  # type: ignore
+    rest = ' | '.join(bc.gf_format(None).strip() for bc in basic_commands[1:])  # type: ignore
+
+    fused_type = GfCommandType([' | '.join(t.get_main_name() for t in types)], first_type.inrepr, last_type.outrepr)
+    fused_type.error_regexes = [regex for t in types for regex in t.error_regexes]  # type: ignore
+    fused_type.storable = all(t.storable for t in types)  # type: ignore
+    fused_type.original_sentences = False  # the output of the first command isn't available
+    fused_type._long_descr = 'Consecutive GF commands combined into a single GF command'
+    command = fused_type._make_command(
+        lambda mainarg, is_str: f'{first_command.gf_format(mainarg, is_str).strip()} | {rest}',
+        first_command.mainargs)
+    command.keep = frozenset().union(*(cmd.keep for cmd in commands))
+    return command
+
+
 GF_COMMAND_TYPES: list[GfCommandType] = [
     GfCommandType(['parse', 'p'], Repr.SENTENCE, Repr.AST,
-                  error_regex=re.compile(r'(The parser failed at token \d+: ".*")|(The sentence is not complete)')),
+                  error_regex=re.compile(r'(The parser failed at token \d+: ".*")|(The sentence is not complete)'),
+                  storable=True),
     GfCommandType(['put_string', 'ps'], Repr.SENTENCE, Repr.SENTENCE),
     GfCommandType(['put_tree', 'pt'], Repr.AST, Repr.AST),
     # TODO: some sorting arguments probably won't work (e.g. `pt -smallest`)
-    GfCommandType(['linearize', 'l'], Repr.AST, Repr.SENTENCE),
+    GfCommandType(['linearize', 'l'], Repr.AST, Repr.SENTENCE, storable=True),
     GfCommandType(['visualize_tree', 'vt'], Repr.AST, Repr.GRAPH_DOT),
     GfCommandType(['visualize_parse', 'vp'], Repr.AST, Repr.GRAPH_DOT),
     GfCommandType(['generate_random', 'gr'], None, Repr.AST),
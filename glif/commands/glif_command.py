@@ -4,7 +4,7 @@ from glif.commands.items import Items, Repr
 from ..glif_abc import GlifABC as Glif
 from ..utils import Result, indent
 
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 
 
 class GlifArg(object):
@@ -53,7 +53,9 @@ class GlifCommandType(CommandType):
                  inrepr: Optional[Repr] = None,
                  execute_fn: Optional[Callable[[Glif, dict[str, str], set[str], list[str]], Items]] = None,
                  apply_fn: Optional[Callable[[Glif, dict[str, str], set[str], list[str], Items], Items]] = None,
-                 example_calls: list[str] = []):
+                 example_calls: list[str] = [],
+                 needs_all_items: Union[bool, Callable[[dict[str, str], set[str]], bool]] = False,
+                 required_reprs: Optional[set[Repr]] = None):
         super().__init__(names)
         self.arguments = arguments
         self.str_to_arg: dict[str, GlifArg] = {}
@@ -66,6 +68,11 @@ class GlifCommandType(CommandType):
         self.inrepr = inrepr
         self.execute_fn = execute_fn
         self.apply_fn = apply_fn
+        self.needs_all_items = needs_all_items  # can depend on the arguments
+        if required_reprs is not None:
+            self.required_reprs = frozenset(required_reprs)
+        elif not apply_fn:
+            self.required_reprs = frozenset()  # input items are not used
         if main_args_as_items:
             assert self.inrepr
 
@@ -96,7 +103,10 @@ class GlifCommandType(CommandType):
         if self.main_args_as_items:
             assert self.inrepr
             main_arg_items = Items.from_vals(self.inrepr, cmd.mainargs)
-        command = Command(self, execute_fn, apply_fn, main_arg_items)
+        needs_all_items = self.needs_all_items
+        if callable(needs_all_items):
+            needs_all_items = needs_all_items(args.value[0], args.value[1])
+        command = Command(self, execute_fn, apply_fn, main_arg_items, needs_all_items)
         return Result(True, command)
 
     def extract_arguments(self, cmd: BasicCommand) -> Result[tuple[dict[str, str], set[str]]]:
@@ -8,6 +8,11 @@ from .cmd_filter import FILTER_COMMAND_TYPE
 from .cmd_help import HELP_COMMAND_TYPE
 from .cmd_query import QUERY_COMMAND_TYPE
 from .cmd_apply import APPLY_COMMAND_TYPE
+from .cmd_trace import TRACE_COMMAND_TYPE
+from .cmd_profile import PROFILE_COMMAND_TYPE
+from .cmd_store import STORE_COMMAND_TYPE
+from .cmd_cache import CACHE_COMMAND_TYPE
+from .cmd_svg import SVG_COMMAND_TYPE
 
 GLIF_COMMAND_TYPES = [
     IMPORT_COMMAND_TYPE,
@@ -20,4 +25,9 @@ GLIF_COMMAND_TYPES = [
     HELP_COMMAND_TYPE,
     QUERY_COMMAND_TYPE,
     APPLY_COMMAND_TYPE,
+    TRACE_COMMAND_TYPE,
+    PROFILE_COMMAND_TYPE,
+    STORE_COMMAND_TYPE,
+    CACHE_COMMAND_TYPE,
+    SVG_COMMAND_TYPE,
 ]
@@ -1,9 +1,16 @@
 import html
+import queue
+import threading
+import weakref
 from enum import Enum
-from typing import Optional, Callable
+from types import MappingProxyType
+from typing import Optional, Callable, Collection, Iterable, Iterator, Mapping, Union
 
 from glif.utils import Result
 
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100  # items per page of HTML output
+
 
 class Repr(Enum):
     """ Different representations of item content """
@@ -19,63 +26,148 @@ class Repr(Enum):
     GRAPH_SVG = 'graph-svg'  # graph in svg format
 
 
+# names for representations in arguments (e.g. `-keep=ast,logic`)
+REPR_NAMES: dict[str, Repr] = {
+    'html': Repr.HTML,
+    'default': Repr.DEFAULT,
+    'original-sentence': Repr.SENTENCE_ORIG,
+    'sentence': Repr.SENTENCE,
+    'ast': Repr.AST,
+    'logic-plain': Repr.LOGIC_PLAIN,
+    'logic': Repr.LOGIC_STANDARD,
+    'elpi': Repr.LOGIC_ELPI,
+    'dot': Repr.GRAPH_DOT,
+    'svg': Repr.GRAPH_SVG,
+}
+
+_REPR_NAME: dict[Repr, str] = {r: name for name, r in REPR_NAMES.items()}
+_REPR_INDEX: dict[Repr, int] = {r: i for i, r in enumerate(Repr)}
+_NO_VALUES: tuple[Optional[str], ...] = (None,) * len(_REPR_INDEX)
+
+
 class Item(object):
     """ Something that can be passed between commands (AST, sentence, logical expression, ...).
         Note that an item may have multiple representations simultaneously (e.g. a string and an AST).
+
+        The representations are stored in a tuple indexed by `Repr`,
+        which clones share until a representation is changed.
     """
+    __slots__ = ('original_id', 'currentRepr', '_parent', '_values', '_errors', '__weakref__')
 
-    def __init__(self, original_id):
-        self.errors: list[str] = []
+    def __init__(self, original_id, parent: Optional['Item'] = None):
         self.original_id: int = original_id
-        self.content: dict[Repr, str] = {}
         self.currentRepr: Optional[Repr] = None
+        # a weak reference, so that clones don't keep the items (and representations) of earlier commands alive
+        self._parent: Optional[weakref.ref[Item]] = weakref.ref(parent) if parent is not None else None
+        self._values: tuple[Optional[str], ...] = _NO_VALUES
+        self._errors: Union[list[str], tuple[()]] = ()  # no list is allocated for items without errors
+
+    @property
+    def errors(self) -> list[str]:
+        if not isinstance(self._errors, list):
+            self._errors = []
+        return self._errors
+
+    @errors.setter
+    def errors(self, errors: list[str]):
+        self._errors = errors
+
+    @property
+    def parent(self) -> Optional['Item']:
+        """ the item this item was cloned from (None if it doesn't exist anymore) """
+        return self._parent() if self._parent is not None else None
+
+    @property
+    def content(self) -> Mapping[Repr, str]:
+        """ read-only view of the available representations """
+        return MappingProxyType({r: v for r, v in zip(Repr, self._values) if v is not None})
+
+    def get(self, r: Repr) -> Optional[str]:
+        return self._values[_REPR_INDEX[r]]
+
+    def has_repr(self, r: Repr) -> bool:
+        return self._values[_REPR_INDEX[r]] is not None
 
     def try_get_repr(self, r: Repr) -> Result[str]:
-        if r in self.content:
-            return Result(True, self.content[r], '\n'.join(self.errors))
+        value = self.get(r)
+        if value is not None:
+            return Result(True, value, '\n'.join(self._errors))
         else:
             message = f'Expected representation [{r}], falling back to [{Repr.DEFAULT}]'
             message += '\nAvailable representations: ' + ' '.join([f'[{rr}]' for rr in self.content])
-            return Result(False, self.content[Repr.DEFAULT], '\n'.join(self.errors + [message]))
+            return Result(False, self.get(Repr.DEFAULT), '\n'.join(list(self._errors) + [message]))
+
+    def _set_reprs(self, changes: dict[Repr, Optional[str]]) -> 'Item':
+        values = list(self._values)
+        for r, val in changes.items():
+            values[_REPR_INDEX[r]] = val
+        self._values = tuple(values)
+        return self
 
     def with_repr(self, r: Repr, val: str, update_default: bool = True, html_version: Optional[str] = None) -> 'Item':
         """ doesn't clone! """
         assert r != Repr.HTML
+        values = list(self._values)
         if update_default:
-            self.content[Repr.DEFAULT] = val
-        self.content[r] = val
+            values[_REPR_INDEX[Repr.DEFAULT]] = val
+        values[_REPR_INDEX[r]] = val
+        values[_REPR_INDEX[Repr.HTML]] = html_version if html_version else None
+        self._values = tuple(values)
         self.currentRepr = r
-        if html_version:
-            self.content[Repr.HTML] = html_version
-        elif Repr.HTML in self.content:
-            del self.content[Repr.HTML]
         return self
 
     def get_clone(self) -> 'Item':  # TODO: use __deepcopy__ instead
-        i = Item(self.original_id)
-        i.errors = self.errors[:]
-        i.content = self.content.copy()
+        i = Item(self.original_id, self)
+        i._values = self._values  # immutable, i.e. changes to the clone don't affect this item
+        if self._errors:
+            i._errors = self._errors[:]
         return i
 
+    def prune(self, live: Collection[Repr]) -> 'Item':
+        """ drops all representations that are not in `live` """
+        if any(v is not None and r not in live for r, v in zip(Repr, self._values)):
+            self._values = tuple(v if r in live else None for r, v in zip(Repr, self._values))
+        return self
+
+    def as_dict(self) -> dict:
+        """ JSON-compatible version of the item (representations are identified by their names in `REPR_NAMES`) """
+        d: dict = {
+            'id': self.original_id,
+            'reprs': {_REPR_NAME[r]: v for r, v in zip(Repr, self._values) if v is not None},
+        }
+        if self._errors:
+            d['errors'] = list(self._errors)
+        return d
+
+    def lineage(self) -> Iterator['Item']:
+        """ this item, the item it was cloned from, the item that one was cloned from, ...
+            (as far as these items still exist)
+        """
+        item: Optional[Item] = self
+        while item is not None:
+            yield item
+            item = item.parent
+
     def html(self) -> str:
         s = ''
-        if Repr.HTML in self.content:
-            s += self.content[Repr.HTML]
-        elif Repr.DEFAULT in self.content:
+        html_version = self.get(Repr.HTML)
+        default = self.get(Repr.DEFAULT)
+        if html_version is not None:
+            s += html_version
+        elif default is not None:
             s += '<span class="glif-stdout">' + \
-                 html.escape(self.content[Repr.DEFAULT]).replace('\n', '<br/>').replace('  ', '&nbsp;&nbsp;') +\
+                 html.escape(default).replace('\n', '<br/>').replace('  ', '&nbsp;&nbsp;') +\
                  '</span>'
-        if self.errors:
-            s += '\n<br/><span class="glif-stderr"><b>Errors</b><br/>' +\
-                 '<br/>'.join([e.replace('\n', '<br/>') for e in self.errors]) + '</span>'
+        if self._errors:
+            s += _errors_html(self._errors)
         return s
 
     def __str__(self):
-        if Repr.DEFAULT not in self.content:
+        s = self.get(Repr.DEFAULT)
+        if s is None:
             return '[Item has no default representation]'
-        s = self.content[Repr.DEFAULT]
-        if self.errors:
-            return 'Errors:\n    ' + '\n    '.join(self.errors) + '\n' + s
+        if self._errors:
+            return 'Errors:\n    ' + '\n    '.join(self._errors) + '\n' + s
         return s
 
 
@@ -85,6 +177,7 @@ class Items(object):
     def __init__(self, items: list[Item]):
         self.items: list[Item] = items
         self.errors: list[str] = []
+        self.failed_command: Optional[str] = None  # the command that caused the errors (in a pipeline)
 
     @classmethod
     def from_vals(cls, repr_: Repr, vals: list[str]) -> 'Items':
@@ -92,25 +185,63 @@ class Items(object):
         for i, v in enumerate(vals):
             item = Item(i).with_repr(repr_, v)
             if repr_ == Repr.SENTENCE:
-                item.content[Repr.SENTENCE_ORIG] = v
-            items.items.append(item)
+                item._set_reprs({Repr.SENTENCE_ORIG: v})
+            items.append(item)
         return items
 
+    def append(self, item: Item) -> 'Items':
+        self.items.append(item)
+        return self
+
+    def extend(self, items: Iterable[Item]) -> 'Items':
+        self.items.extend(items)
+        return self
+
     def merge(self, items: 'Items'):
-        self.items = self.items + items.items
-        self.errors = self.errors + items.errors
+        """ appends the items and errors of `items` (in amortized time linear in the size of `items`) """
+        self.items.extend(items.items)
+        self.errors.extend(items.errors)
 
     def with_errors(self, errors: list[str]) -> 'Items':
-        self.errors = self.errors + errors
+        self.errors.extend(errors)
         return self
 
-    def html(self) -> str:
-        s = '<br/>'.join([i.html() for i in self.items])
+    def html(self, start: int = 0, stop: Optional[int] = None) -> str:
+        """ HTML of the items in `self.items[start:stop]` (only their HTML is computed) and of the errors """
+        s = '<br/>'.join([i.html() for i in self.items[start:stop]])
         if self.errors:
-            s += '\n<br/><span class="glif-stderr"><b>Errors</b><br/>' +\
-                 '<br/>'.join([e.replace('\n', '<br/>') for e in self.errors]) + '</span>'
+            s += _errors_html(self.errors)
         return s
 
+    def html_summary(self) -> str:
+        """ a header with the numbers of items and errors """
+        with_errors = sum(1 for item in self.items if item._errors)
+        s = f'{len(self.items)} item{"s" if len(self.items) != 1 else ""}'
+        if with_errors:
+            s += f' ({with_errors} with errors)'
+        if self.errors:
+            s += f', {len(self.errors)} error{"s" if len(self.errors) != 1 else ""}'
+        return f'<div class="glif-summary">{s}</div>'
+
+    def html_page(self, page: int, page_size: int = DEFAULT_PAGE_SIZE) -> str:
+        """ the summary and the HTML of the items on the page (starting with page 0) """
+        start = page * page_size
+        stop = min(start + page_size, len(self.items))
+        s = self.html_summary()
+        if len(self.items) > page_size:
+            if start < len(self.items):
+                s += f'<div class="glif-page">Items {start + 1}-{stop} of {len(self.items)}</div>'
+            else:
+                s += f'<div class="glif-page">No items on page {page + 1}</div>'
+        return s + self.html(start, stop)
+
+    def iter_html(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[str]:
+        """ the HTML of all items in chunks of `page_size` items (the concatenation is `self.html()`) """
+        for start in range(0, len(self.items), page_size):
+            yield ('<br/>' if start else '') + '<br/>'.join([i.html() for i in self.items[start:start + page_size]])
+        if self.errors:
+            yield _errors_html(self.errors)
+
     def __str__(self):
         items = '\n'.join([str(item) for item in self.items])
         if self.errors:
@@ -118,8 +249,124 @@ class Items(object):
         return items
 
     def flatmap(self, fn: Callable[[Item], 'Items']):
-        new_items = Items([])
-        new_items.errors = self.errors
+        new_items = Items([]).with_errors(self.errors)
         for item in self.items:
             new_items.merge(fn(item))
         return new_items
+
+    def prune(self, live: Collection[Repr]) -> 'Items':
+        for item in self.items:
+            item.prune(live)
+        return self
+
+    def chunks(self, size: int) -> Iterator['Items']:
+        """ splits the items into chunks of at most `size` items.
+            Items with errors are not split and at least one (possibly empty) chunk is returned.
+        """
+        if self.errors or len(self.items) <= size:
+            yield self
+            return
+        for i in range(0, len(self.items), size):
+            yield Items(self.items[i:i + size])
+
+
+def _errors_html(errors: list[str]) -> str:
+    return '\n<br/><span class="glif-stderr"><b>Errors</b><br/>' + \
+        '<br/>'.join([e.replace('\n', '<br/>') for e in errors]) + '</span>'
+
+
+class ItemStream(object):
+    """ A lazily computed sequence of `Items` chunks, which can only be consumed once.
+        Commands in a pipeline pass streams to each other, so that a command can start working
+        before the previous one is done and only a few chunks have to be kept in memory.
+        A chunk with errors ends the stream. Note that the earlier chunks have already been processed
+        by all commands of the pipeline at that point, while the chunk with errors contains
+        the output of the command that failed.
+    """
+
+    def __init__(self, chunks: Iterable[Items], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._chunks: Iterator[Items] = iter(chunks)
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_items(cls, items: Items, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'ItemStream':
+        return ItemStream(items.chunks(chunk_size), chunk_size)
+
+    def __iter__(self) -> Iterator[Items]:
+        for chunk in self._chunks:
+            yield chunk
+            if chunk.errors:
+                return
+
+    def map(self, fn: Callable[[Items], Items]) -> 'ItemStream':
+        """ applies `fn` to every chunk (a chunk with errors is passed on unchanged) """
+        return ItemStream((chunk if chunk.errors else fn(chunk) for chunk in self), self.chunk_size)
+
+    def map_all(self, fn: Callable[[Items], Items]) -> 'ItemStream':
+        """ applies `fn` to all items at once (for commands that can't work on chunks) """
+        def helper() -> Iterator[Items]:
+            items = self.materialize()
+            yield from (items if items.errors else fn(items)).chunks(self.chunk_size)
+        return ItemStream(helper(), self.chunk_size)
+
+    def prefetch(self, maxsize: int) -> 'ItemStream':
+        """ consumes the stream in a separate thread, buffering at most `maxsize` chunks.
+            This way, the commands of a pipeline can work concurrently on different chunks.
+        """
+        buffer: queue.Queue = queue.Queue(maxsize)
+        stop = threading.Event()
+        done = object()  # marks the end of the stream
+
+        def put(value) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def worker():
+            try:
+                for chunk in self:
+                    if not put(chunk):
+                        return
+                put(done)
+            except BaseException as ex:  # re-raised in the consuming thread
+                put(ex)
+
+        def helper() -> Iterator[Items]:
+            thread = threading.Thread(target=worker, daemon=True)
+            thread.start()
+            try:
+                while True:
+                    value = buffer.get()
+                    if value is done:
+                        return
+                    if isinstance(value, BaseException):
+                        raise value
+                    yield value
+            finally:
+                stop.set()  # in case the consumer stops early
+
+        return ItemStream(helper(), self.chunk_size)
+
+    def materialize(self) -> Items:
+        """ collects all chunks into a single `Items` object.
+            If a chunk has errors, the items of the earlier chunks are discarded
+            (as they are the output of later commands than the items of that chunk).
+        """
+        items = Items([])
+        for chunk in self:
+            if chunk.errors and items.items:
+                failed = f'"{chunk.failed_command}"' if chunk.failed_command else 'A command'
+                discarded = len(items.items)
+                items = Items(chunk.items).with_errors(chunk.errors)
+                items.errors.append(f'{failed} failed on a later chunk of items, so the results for the '
+                                    f'{discarded} items of the earlier chunks have been discarded')
+                items.failed_command = chunk.failed_command
+                continue
+            items.items.extend(chunk.items)
+            items.errors.extend(chunk.errors)
+            items.failed_command = chunk.failed_command
+        return items
@@ -0,0 +1,126 @@
+"""
+    Pipelines of commands (e.g. `parse "..." | construct | filter`).
+    The commands of a pipeline are connected by `ItemStream`s,
+    i.e. the items are passed on in chunks and a command can work on a chunk
+    before the previous command has processed all of its input.
+    Optionally, the commands can run concurrently in separate threads.
+
+    Representations that are not needed by later commands are dropped after each command
+    (unless requested otherwise with `-keep=...`).
+    Consecutive GF commands are combined into a single GF command (GF has its own pipes)
+    if their intermediate results are not needed (independent of the pruning, see `fuse_gf_stages`).
+"""
+
+from typing import Callable, Optional
+
+from .. import tracing
+from .command import Command, CommandType
+from .gf_commands import can_fuse, fuse_gf_commands
+from ..glif_abc import GlifABC as Glif
+from glif.commands.items import Items, ItemStream, Repr, DEFAULT_CHUNK_SIZE
+from ..utils import Result
+
+
+def parse_pipeline(commands: dict[str, CommandType], command: str) -> Result[list[Command]]:
+    with tracing.span('parse', 'glif', command=command):
+        return _parse_pipeline(commands, command)
+
+
+def _parse_pipeline(commands: dict[str, CommandType], command: str) -> Result[list[Command]]:
+    stages: list[Command] = []
+    rest = command.strip()
+    while rest:
+        if ' ' in rest:
+            name = rest[:rest.find(' ')]
+        else:
+            name = rest
+        if name not in commands:
+            return Result(False, logs=f'Unkown command "{name}"')
+
+        r = commands[name].from_string(rest)
+        if not r.success:
+            return Result(False, logs=r.logs)
+        assert r.value
+        cmd, rest = r.value
+        stages.append(cmd)
+        rest = rest.strip()
+
+    if not stages:
+        return Result(False, logs='No command given')
+    return Result(True, stages)
+
+
+# representations that are never pruned
+ALWAYS_LIVE: frozenset[Repr] = frozenset({Repr.DEFAULT, Repr.HTML, Repr.SENTENCE_ORIG})
+
+
+def live_representations(stages: list[Command], keep_output: bool = True) -> list[Optional[frozenset[Repr]]]:
+    """ returns for every command the representations that are still needed afterwards
+        (None if everything has to be kept, which is the case for the last command if `keep_output` is set).
+    """
+    output_live = ALWAYS_LIVE.union(*(cmd.keep for cmd in stages))
+    live: Optional[frozenset[Repr]] = output_live
+    result: list[Optional[frozenset[Repr]]] = [None if keep_output or len(output_live) == len(Repr) else output_live]
+    for cmd in reversed(stages[1:]):
+        required = cmd.command_type.required_reprs
+        live = None if live is None or required is None else live | required
+        result.append(None if live is None or len(live) == len(Repr) else live)
+    result.reverse()
+    return result
+
+
+def fuse_gf_stages(stages: list[Command], executed: bool = True) -> list[Command]:
+    """ replaces runs of consecutive GF commands by a single command that uses GF's pipes,
+        if the intermediate representations are not needed by later commands and
+        have not been requested with `-keep=...` (this also applies to the output of the pipeline,
+        so e.g. `parse "..." | linearize` is a single GF command and its output contains no ASTs).
+        `executed` means that the first command is executed without input items.
+    """
+    lives = live_representations(stages, keep_output=False)
+    result: list[Command] = []
+    i = 0
+    while i < len(stages):
+        j = i  # try to fuse stages[i:j+1]
+        # sentences generated without input (e.g. by `ps -lextext`) are the original sentences,
+        # which a fused command couldn't provide
+        original = i == 0 and executed and getattr(stages[0].command_type, 'outrepr', None) == Repr.SENTENCE and \
+            not (stages[0].basic_command and stages[0].basic_command.mainargs)
+        while not original and j + 1 < len(stages) and can_fuse(stages[j], stages[j + 1]):
+            live = lives[j + 1]
+            outreprs = [getattr(cmd.command_type, 'outrepr') for cmd in stages[i:j + 2]]
+            if live is None or any(r in live and r not in outreprs[k + 1:] for k, r in enumerate(outreprs[:-1])):
+                break  # an intermediate representation is needed later on
+            j += 1
+        result.append(stages[i] if i == j else fuse_gf_commands(stages[i:j + 1]))
+        i = j + 1
+    return result
+
+
+def _pruner(live: frozenset[Repr]) -> Callable[[Items], Items]:
+    return lambda items: items.prune(live)
+
+
+def run_pipeline(glif: Glif, stages: list[Command], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 stream: Optional[ItemStream] = None, queue_size: int = 0, prune: bool = True,
+                 fuse: bool = True) -> ItemStream:
+    """ If `stream` is provided, the first command is applied to it, otherwise the first command is executed.
+        Nothing happens until the resulting stream is consumed.
+        If `queue_size > 0`, every command runs in its own thread and passes at most `queue_size` chunks ahead
+        to the next command. This way, different backends (e.g. GF and MMT) can work at the same time.
+        If `prune` is set, representations that are not needed by later commands are dropped.
+        If `fuse` is set, consecutive GF commands are sent to GF as a single command where possible.
+    """
+    if fuse:
+        stages = fuse_gf_stages(stages, stream is None)
+    lives = live_representations(stages) if prune else [None] * len(stages)
+    for cmd, live in zip(stages, lives):
+        if stream is None:
+            stream = cmd.execute_stream(glif, chunk_size)
+        else:
+            stream = cmd.apply_stream(glif, stream)
+        if live is not None:
+            stream = stream.map(_pruner(live))
+        if queue_size > 0 and len(stages) > 1:
+            stream = stream.prefetch(queue_size)
+    assert stream is not None
+    return stream
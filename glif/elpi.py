@@ -1,11 +1,123 @@
+import hashlib
 import os
+import re
 import subprocess
+import threading
 from distutils.spawn import find_executable
 from typing import Optional, Literal
 
 from glif.commands.items import Repr, Items
+from . import cache, metrics, tracing
 from .utils import Result
 
+GLIF_ELPI_DIR = os.path.realpath(os.path.dirname(__file__))
+GLIF_ELPI_FILE = os.path.join(GLIF_ELPI_DIR, 'glif.elpi')
+
+# maximal number of ELPI processes that run at the same time
+ELPI_MAX_PROCESSES = os.cpu_count() or 1
+_elpi_slots = threading.BoundedSemaphore(ELPI_MAX_PROCESSES)
+
+_ACCUMULATE_REGEX = re.compile(r'\baccumulate\s+((?:"[^"]*"|[\w/\-]+)(?:\s*,\s*(?:"[^"]*"|[\w/\-]+))*)\s*\.')
+
+
+class TypecheckCache(object):
+    """ Remembers which versions of ELPI programs have been type checked successfully.
+        A version is identified by the content of the file, the files it accumulates (transitively)
+        and the bundled glif.elpi, so any change to the program requires a new type check.
+        Successful type checks are also recorded in the disk cache (see `glif.cache`), so other processes can use them.
+    """
+
+    def __init__(self):
+        self._checked: set[str] = set()
+        # path -> (mtime, size, content hash, accumulated names), to avoid re-reading unchanged files
+        self._files: dict[str, tuple[int, int, str, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _scan_file(self, path: str) -> tuple[str, list[str]]:
+        st = os.stat(path)
+        cached = self._files.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2], cached[3]
+        with open(path, 'rb') as fp:
+            content = fp.read()
+        names: list[str] = []
+        for match in _ACCUMULATE_REGEX.finditer(content.decode('utf8', errors='replace')):
+            names += [name.strip().strip('"') for name in match.group(1).split(',')]
+        digest = hashlib.sha256(content).hexdigest()
+        self._files[path] = (st.st_mtime_ns, st.st_size, digest, names)
+        return digest, names
+
+    def fingerprint(self, cwd: str, filename: str) -> Optional[str]:
+        """ returns None if the program (or a part of it) could not be read """
+        with self._lock:
+            return self._fingerprint(cwd, filename)
+
+    def _fingerprint(self, cwd: str, filename: str) -> Optional[str]:
+        h = hashlib.sha256()
+        todo = [os.path.join(cwd, filename)]
+        visited: set[str] = set()
+        try:
+            glif_digest, _ = self._scan_file(GLIF_ELPI_FILE)
+            h.update(glif_digest.encode())
+            while todo:
+                path = os.path.realpath(todo.pop())
+                if path in visited:
+                    continue
+                visited.add(path)
+                digest, names = self._scan_file(path)
+                h.update(f'{path}:{digest}\n'.encode())
+                for name in names:
+                    if not name.endswith('.elpi'):
+                        name += '.elpi'
+                    for directory in [os.path.dirname(path), cwd, GLIF_ELPI_DIR]:
+                        candidate = os.path.join(directory, name)
+                        if os.path.isfile(candidate):
+                            todo.append(candidate)
+                            break
+                    else:
+                        h.update(f'unresolved:{name}\n'.encode())
+        except OSError:
+            return None
+        return h.hexdigest()
+
+    def is_checked(self, fingerprint: Optional[str]) -> bool:
+        if fingerprint is None:
+            return False
+        with self._lock:
+            if fingerprint in self._checked:
+                return True
+        disk_cache = cache.get_cache()
+        if disk_cache and disk_cache.get('elpi-typecheck', fingerprint) is not None:
+            with self._lock:
+                self._checked.add(fingerprint)
+            return True
+        return False
+
+    def mark_checked(self, fingerprint: Optional[str]):
+        if fingerprint is not None:
+            with self._lock:
+                self._checked.add(fingerprint)
+            disk_cache = cache.get_cache()
+            if disk_cache:
+                disk_cache.put('elpi-typecheck', fingerprint, b'')
+
+    def forget(self, fingerprint: Optional[str]):
+        if fingerprint is not None:
+            with self._lock:
+                self._checked.discard(fingerprint)
+            disk_cache = cache.get_cache()
+            if disk_cache:
+                disk_cache.delete('elpi-typecheck', fingerprint)
+
+    def clear(self):
+        """ clears the in-memory state (the disk cache is shared with other processes, see `cache -purge`) """
+        with self._lock:
+            self._checked.clear()
+            self._files.clear()
+
+
+TYPECHECK_CACHE = TypecheckCache()
+
 
 def runelpi(cwd: str, filename: str, command: str, type_check: bool = True, stdin: str = '',
             args: Optional[list[str]] = None, isjusttypecheck: bool = False,
@@ -14,30 +126,34 @@ def runelpi(cwd: str, filename: str, command: str, type_check: bool = True, stdi
     if not elpipath:
         return Result(False, None, 'Failed to locate executable "elpi"')
 
-    call = [elpipath, filename, '-exec', command, '-I', os.path.realpath(os.path.dirname(__file__))]
+    fingerprint: Optional[str] = None
+    if type_check:
+        # programs that have been type checked before don't have to be checked again
+        fingerprint = TYPECHECK_CACHE.fingerprint(cwd, filename)
+        type_check = not TYPECHECK_CACHE.is_checked(fingerprint)
+        metrics.CACHE_REQUESTS.inc(cache='elpi-typecheck', result='miss' if type_check else 'hit')
+
+    call = [elpipath, filename, '-exec', command, '-I', GLIF_ELPI_DIR]
     if not type_check:
         call.append('-no-tc')
     if args:
         call.append('--')
         call += args
 
-    proc = subprocess.Popen(call, text=True,
-                            stdin=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            stdout=subprocess.PIPE,
-                            cwd=cwd)
-    assert proc.stdin
-    assert proc.stdout
-    assert proc.stderr
-    proc.stdin.write(stdin)
-    proc.stdin.close()
-    out = proc.stdout.read()
-    err = proc.stderr.read()
-    proc.stderr.close()
-    proc.stdout.close()
-    proc.wait()
+    with _elpi_slots, tracing.span('runelpi', 'elpi', command=command, type_check=type_check,
+                                   bytes_in=len(stdin)) as span, \
+            metrics.BACKEND_CALLS.time(backend='elpi', operation='runelpi'):
+        metrics.SUBPROCESS_SPAWNS.inc(program='elpi')
+        proc = subprocess.Popen(call, text=True,
+                                stdin=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                cwd=cwd)
+        out, err = proc.communicate(stdin)
+        span.set(bytes_out=len(out) + len(err))
     # if proc.returncode not in [0,1]:   # Why should 1 be acceptable?
     if proc.returncode:
+        metrics.BACKEND_FAILURES.inc(backend='elpi', operation='runelpi')
         if isjusttypecheck:
             # TODO: better extract type checking errors (they are sometimes in stderr and sometimes in stdout)
             err = err.strip()
@@ -47,6 +163,9 @@ def runelpi(cwd: str, filename: str, command: str, type_check: bool = True, stdi
                       'ELPI ERROR: ' + str(
                           proc.returncode) + '\nOUTPUT:\n' + out + '\nERROR:\n' + err + '\nCALL:\n' + str(call))
 
+    if type_check:
+        TYPECHECK_CACHE.mark_checked(fingerprint)
+
     if filterstderr != 'none':
         lines: list[str] = []
         for line in err.splitlines():
@@ -67,12 +186,12 @@ def items_to_stdin(items: Items, with_ast: bool) -> str:
     expressions = []
     for itemid, item in enumerate(items.items):
         expr = f'glif.mkItem {itemid} {item.original_id} '
-        s = item.content.get(Repr.SENTENCE)
+        s = item.get(Repr.SENTENCE)
         if s is None:
             expr += 'glif.none '
         else:
             expr += f'(glif.some "{s}") '
-        for e in [item.content.get(Repr.AST) if with_ast else None, item.content.get(Repr.LOGIC_ELPI)]:
+        for e in [item.get(Repr.AST) if with_ast else None, item.get(Repr.LOGIC_ELPI)]:
             if e is None:
                 expr += 'glif.none '
             else:
@@ -1,8 +1,11 @@
 import os
 import subprocess
+import threading
 
 from typing import Optional
 
+from . import metrics, tracing
+
 # Basically a unique string that will never show up in the output (hopefully)
 COMMAND_SEPARATOR = "COMMAND_SEPARATOR===??!<>239'_"
 
@@ -12,6 +15,8 @@ class GFShellRaw(object):
         if args is None:
             args = []
         pipe = os.pipe()
+        metrics.SUBPROCESS_SPAWNS.inc(program='gf')
+        metrics.BACKEND_STARTS.inc(backend='gf')
         self.gf_shell = subprocess.Popen([gf_path, '--run'] + args,
                                          stdin=subprocess.PIPE,
                                          stderr=pipe[1],
@@ -19,6 +24,7 @@ class GFShellRaw(object):
                                          text=True,
                                          cwd=cwd)
         self.commandcounter = 0
+        self._lock = threading.Lock()  # commands from different threads must not be interleaved
         self.infile = os.fdopen(pipe[0])
         self.gfoutfd = pipe[1]
         assert self.gf_shell.stdin is not None
@@ -51,19 +57,24 @@ class GFShellRaw(object):
 
     def handle_command(self, cmd: str) -> str:
         """Forwards a command to the GF Shell and returns the output"""
-        self.__write_cmd(cmd)
-        sep = self.__write_separator()
-        self.outfile.flush()
-        res = self.__get_output(sep).strip()
+        # the lock is acquired first, so that waiting for other threads does not count as time spent in GF
+        with self._lock, tracing.span('handle_command', 'gf', command=cmd, bytes_in=len(cmd)) as span, \
+                metrics.BACKEND_CALLS.time(backend='gf', operation='handle_command'):
+            self.__write_cmd(cmd)
+            sep = self.__write_separator()
+            self.outfile.flush()
+            res = self.__get_output(sep).strip()
+            span.set(bytes_out=len(res))
         return res
 
     def do_shutdown(self):
-        """Terminates the GF shell"""
-        self.gf_shell.communicate('q\n', timeout=1)
-        self.outfile.close()
-        self.infile.close()
-        self.gf_shell.kill()
-        os.fdopen(self.gfoutfd).close()  # TODO: Why do I need this?
+        """Terminates the GF shell (after the current command)"""
+        with self._lock:
+            self.gf_shell.communicate('q\n', timeout=1)
+            self.outfile.close()
+            self.infile.close()
+            self.gf_shell.kill()
+            os.fdopen(self.gfoutfd).close()  # TODO: Why do I need this?
 
 
 if __name__ == "__main__":
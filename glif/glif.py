@@ -1,13 +1,15 @@
+import threading
 from typing import Optional
-from distutils.spawn import find_executable
 
-from glif import gf, mmt, parsing, utils, glif_abc, stub_gen, elpi
-from .commands import items
+from glif import gf, mmt, parsing, glif_abc, stub_gen, elpi, metrics, tracing
+from .backends import Backends
+from .commands import items, pipeline
 import glif.commands.command as cmd
 from glif.commands.gf_commands import GF_COMMAND_TYPES
 from glif.commands.glif_command_types import GLIF_COMMAND_TYPES
 import os
-from .lex import LexiconParser
+from .lex import LexiconError, LexiconParser
+from .store import ResultStore, chain_fingerprint, files_fingerprint
 
 from .utils import Result
 
@@ -15,43 +17,84 @@ DEFAULT_ARCHIVE = 'tmpGLIF/default'
 
 
 class Glif(glif_abc.GlifABC):
-    def __init__(self):
+    """ A GLIF session. It can be used by multiple threads at the same time:
+        the session state (archive, working directory, default view/ELPI file, GF shell, ...)
+        is protected by a lock, the GF shell handles one command at a time and MMT can handle requests in parallel.
+        Threads that need different archives etc. should use separate sessions (see `new_session`).
+    """
+    def __init__(self, backends: Optional[Backends] = None):
+        """ If `backends` are provided, they are shared with other sessions and not shut down by `do_shutdown`. """
+        self.backends: Backends = backends if backends else Backends()
+        self._ownsbackends: bool = backends is None
+        self._lock = threading.RLock()  # protects the session state
+        self._local = threading.local()  # state of the current thread (e.g. whether ELPI files are type checked)
+        self._elpisiglock = threading.Lock()  # only one thread generates ELPI signatures at a time
+
         # GF
         self._gfshell: Optional[gf.GFShellRaw] = None
         self._gfshellFailedLogs: Optional[str] = None
 
         # MMT and MathHub
-        self.mmtjar: Optional[str] = None
-        self.mh: Optional[mmt.MathHub] = None
-        self._mmt: Optional[mmt.MMTInterface] = None
-        self._findMMTlogs: list[str] = []
-        self._mmtFailedStartupLogs: list[str] = []
-        self._mmtFailedStartupMessage: Optional[str] = None
-        self._init_mmt_location()
+        self.mmtjar: Optional[str] = self.backends.mmtjar
+        self.mh: Optional[mmt.MathHub] = self.backends.mh
 
         self._defaultview: Optional[str] = None
 
         # ELPI
         self._defaultelpi: Optional[str] = None
-        self._typecheckelpi: bool = False
+        # ELPI signatures of GF grammars that have to be (re-)generated before the next use of ELPI
+        # (path of the .elpi file -> (archive, subdir, theory, fingerprint of the files))
+        self._staleelpisigs: dict[str, tuple[str, Optional[str], str, str]] = {}
+        # ELPI signatures that couldn't be generated (path of the .elpi file -> error message),
+        # they are generated again when the grammar is re-imported
+        self._failedelpisigs: dict[str, str] = {}
+
+        # results of backend calls that are stored persistently (see `glif.store`)
+        self._store: Optional[ResultStore] = None
+        # backend ('gf' or 'mmt') -> fingerprint of the imported files
+        self._fingerprints: dict[str, Optional[str]] = {'gf': None, 'mmt': None}
 
         self._archive: Optional[str] = None
         self._subdir: Optional[str] = None
         self._cwd: str
         if self.mh:
             if DEFAULT_ARCHIVE not in self.mh.archives:
-                assert self.mh.make_archive(DEFAULT_ARCHIVE).success
+                self.mh.make_archive(DEFAULT_ARCHIVE)  # fails if another session created it in the meantime
+            assert DEFAULT_ARCHIVE in self.mh.archives
             self._cwd = os.path.join(self.mh.archives[DEFAULT_ARCHIVE], 'source')
             self._archive = DEFAULT_ARCHIVE
         else:
             self._cwd = os.getcwd()
         self._commands: dict[str, cmd.CommandType] = {}  # command name -> command type
+        self.chunk_size: int = items.DEFAULT_CHUNK_SIZE  # number of items passed between commands at a time
+        # if > 0, piped commands run concurrently with up to `pipeline_queue_size` chunks between them
+        self.pipeline_queue_size: int = 0
+        # drop representations that are not needed by later commands (unless requested with `-keep=...`)
+        self.prune_representations: bool = True
+        # send consecutive GF commands as one command (e.g. `p "..." | l`) to GF if possible
+        self.fuse_gf_commands: bool = True
         self._load_initial_commands()
 
+    def new_session(self) -> 'Glif':
+        """ returns a new session that shares the backends (MMT, GF shell pool) with this one """
+        return Glif(self.backends)
+
+    @property
+    def _typecheckelpi(self) -> bool:
+        return getattr(self._local, 'typecheckelpi', False)
+
+    @_typecheckelpi.setter
+    def _typecheckelpi(self, value: bool):
+        self._local.typecheckelpi = value
+
     def set_archive(self, archive: str, subdir: Optional[str], create: bool = False) -> Result[str]:
+        with self._lock:
+            return self._set_archive(archive, subdir, create)
+
+    def _set_archive(self, archive: str, subdir: Optional[str], create: bool = False) -> Result[str]:
         if not self.mh:
-            return Result(False, None,
-                          'Error: MathHub folder not found\nLogs:' + parsing.indent('\n'.join(self._findMMTlogs)))
+            return Result(False, None, 'Error: MathHub folder not found\nLogs:' +
+                          parsing.indent('\n'.join(self.backends.findMMTlogs)))
         logs = []
         new_archive_created = False
         if archive not in self.mh.archives:
@@ -72,28 +115,27 @@ class Glif(glif_abc.GlifABC):
 
         self._archive = archive
         self._subdir = subdir
+        self._fingerprints = {'gf': None, 'mmt': None}
         if self._subdir:
             self._cwd = os.path.join(self.mh.archives[self._archive], 'source', self._subdir)
         else:
             self._cwd = os.path.join(self.mh.archives[self._archive], 'source')
-        if new_archive_created and self._mmt:
-            self._mmt.do_shutdown()
-            self._mmt = None
-            self._mmtFailedStartupLogs = []
-            self._mmtFailedStartupMessage = None
+        if new_archive_created and self.backends.reload_mmt():
             logs.append('MMT will be reloaded')
         if self._gfshell:
-            self._gfshell.do_shutdown()
+            metrics.BACKEND_RESTARTS.inc(backend='gf')
+            self.backends.gf_pool.release(self._gfshell)
             self._gfshell = None
             logs.append('GF shell will be reloaded')
         return Result(True, '\n'.join(logs))
 
     def get_archive_subdir(self) -> Result[tuple[str, Optional[str]]]:
-        if self._archive:
-            return Result(True, (self._archive, self._subdir))
+        with self._lock:
+            if self._archive:
+                return Result(True, (self._archive, self._subdir))
         return Result(False, None,
                       'No MMT archive selected. This is probably due to problems during the initialization of MMT. '
-                      'Here are the logs:\n' + parsing.indent("\n".join(self._findMMTlogs)))
+                      'Here are the logs:\n' + parsing.indent("\n".join(self.backends.findMMTlogs)))
 
     def get_defaultview(self) -> Optional[str]:
         return self._defaultview
@@ -107,39 +149,30 @@ class Glif(glif_abc.GlifABC):
     def get_cwd(self) -> str:
         return self._cwd
 
-    def _init_mmt_location(self):
-        # JAR
-        mmtjar = utils.find_mmt_jar()
-        self._findMMTlogs.append('Finding mmt.jar: "' + mmtjar.logs + '"')
-        if not mmtjar.success:
-            return
-        assert mmtjar.value
-        self._findMMTlogs.append('Location: ' + mmtjar.value)
-        self.mmtjar = mmtjar.value
-
-        # MH
-        mhdir = utils.find_mathhub_dir(self.mmtjar)
-        self._findMMTlogs.append('Finding MathHub: "' + mhdir.logs + '"')
-        if not mhdir.success:
-            return
-        assert mhdir.value
-        self._findMMTlogs.append('Location: ' + mhdir.value)
-        self.mh = mmt.MathHub(mhdir.value)
-
     def get_mmt(self) -> Result[mmt.MMTInterface]:
-        if self._mmt:
-            return Result(True, self._mmt)
-        if not (self.mmtjar and self.mh):
-            return Result(False, logs='\n'.join(self._findMMTlogs))
-        assert self.mmtjar
-        assert self.mh
-        try:
-            self._mmt = mmt.MMTInterface(self.mmtjar, self.mh)
-        except mmt.MMTStartupException as ex:
-            self._mmtFailedStartupLogs = ex.logs
-            self._mmtFailedStartupMessage = ex.message
-            return Result(False, logs=ex.message)
-        return Result(True, self._mmt)
+        return self.backends.get_mmt()
+
+    def get_store(self) -> Optional[ResultStore]:
+        return self._store
+
+    def set_store(self, store: Optional[ResultStore]):
+        """ the previous store is closed """
+        with self._lock:
+            previous = self._store
+            self._store = store
+        if previous and previous is not store:
+            previous.close()
+
+    def get_fingerprint(self, backend: str) -> Optional[str]:
+        with self._lock:
+            return self._fingerprints.get(backend)
+
+    def _update_fingerprint(self, backend: str, cwd: str, filename: str, extensions: tuple[str, ...]) -> str:
+        """ called when a file is imported into the backend, returns the fingerprint of the file """
+        files = files_fingerprint(cwd, filename, extensions)
+        with self._lock:
+            self._fingerprints[backend] = chain_fingerprint(self._fingerprints[backend], cwd, filename, files)
+        return files
 
     def _load_initial_commands(self):
         for ct in GLIF_COMMAND_TYPES + GF_COMMAND_TYPES:
@@ -153,10 +186,12 @@ class Glif(glif_abc.GlifABC):
             type_ = file_r.value[0]
             name = file_r.value[1]
             ending = type_.split('-')[0]  # should be one in 'mmt', 'gf', 'elpi', 'lex'
-            archiveresult = self.get_archive_subdir()
+            with self._lock:
+                archiveresult = self.get_archive_subdir()
+                cwd = self._cwd
             if ending == 'mmt' and not archiveresult.success:
                 return [Result(False, None, archiveresult.logs)]
-            with open(os.path.join(self._cwd, f'{name}.{ending}'), 'w', encoding='utf8') as fp:
+            with open(os.path.join(cwd, f'{name}.{ending}'), 'w', encoding='utf8') as fp:
                 if type_ in ['mmt-view', 'mmt-theory']:
                     assert archiveresult.value
                     archive, subdir = archiveresult.value
@@ -173,11 +208,12 @@ class Glif(glif_abc.GlifABC):
                 result = self.execute_command(f'import "{name}.{ending}"')
             finally:
                 self._typecheckelpi = False
-            if result.success and type_ == 'mmt-view' and self._defaultview != name:
-                if result.logs:
-                    result.logs += '\n'
-                result.logs += f'"{name}" is the new default view'
-                self._defaultview = name
+            with self._lock:
+                if result.success and type_ == 'mmt-view' and self._defaultview != name:
+                    if result.logs:
+                        result.logs += '\n'
+                    result.logs += f'"{name}" is the new default view'
+                    self._defaultview = name
 
             return [result]
 
@@ -205,34 +241,31 @@ class Glif(glif_abc.GlifABC):
         return results
 
     def execute_command(self, command: str) -> Result[items.Items]:
-        items = None
-        rest = command.strip()
-        while rest:
-            if ' ' in rest:
-                name = rest[:rest.find(' ')]
-            else:
-                name = rest
-            if name not in self._commands:
-                return Result(False, logs=f'Unkown command "{name}"')
-
-            r = self._commands[name].from_string(rest)
+        with tracing.span('execute_command', 'glif', command=command) as span:
+            r = self.execute_command_stream(command)
             if not r.success:
                 return Result(False, logs=r.logs)
             assert r.value
-            cmd, rest = r.value
-            if items:
-                items = cmd.apply(self, items)
-            else:
-                items = cmd.execute(self)
-            if items.errors:
-                return Result(False, value=items, logs='\n'.join(items.errors))
-            rest = rest.strip()
-
-        if not items:
-            return Result(False, logs='No command given')
-
+            items = r.value.materialize()
+            span.set(items_out=len(items.items))
+        if items.errors:
+            return Result(False, value=items, logs='\n'.join(items.errors))
         return Result(True, value=items)
 
+    def execute_command_stream(self, command: str) -> Result[items.ItemStream]:
+        """ Like `execute_command`, but the items are computed lazily (in chunks of `self.chunk_size` items)
+            while the resulting stream is consumed.
+            Errors in a chunk end the stream (see `ItemStream`).
+        """
+        r = pipeline.parse_pipeline(self._commands, command)
+        if not r.success:
+            return Result(False, logs=r.logs)
+        assert r.value
+        return Result(True, pipeline.run_pipeline(self, r.value, self.chunk_size,
+                                                  queue_size=self.pipeline_queue_size,
+                                                  prune=self.prune_representations,
+                                                  fuse=self.fuse_gf_commands))
+
     def import_gf_file(self, filename: str) -> Result[None]:
         success = True
         logs = []
@@ -240,7 +273,9 @@ class Glif(glif_abc.GlifABC):
         if gfresult.success:
             gf = gfresult.value
             assert gf
-            r = gf.handle_command(f'import {filename}').strip()
+            # the path is absolute because the GF shell doesn't run in the working directory (see GFShellPool)
+            r = gf.handle_command(f'import {os.path.join(self.get_cwd(), filename)}').strip()
+            self._update_fingerprint('gf', self.get_cwd(), filename, ('.gf',))
             if r and not r.startswith('Abstract changed'):  # Failure
                 success = False
                 logs.append(f'GF import failed:\n{parsing.indent(r)}')
@@ -252,23 +287,22 @@ class Glif(glif_abc.GlifABC):
         if mmtresult.success:
             mmt = mmtresult.value
             assert mmt
-            assert self._archive
-            rr = mmt.build_file(self._archive, self._subdir, filename)
+            with self._lock:
+                archive, subdir, cwd = self._archive, self._subdir, self._cwd
+            assert archive
+            rr = mmt.build_file(archive, subdir, filename)
+            files = self._update_fingerprint('mmt', cwd, filename, ('.gf', '.mmt'))
             if not rr.success and rr.logs:  # We get failures (without logs) for concrete syntaxes
                 # TODO: Find a better solution!
                 logs.append(f'MMT import failed:\n{parsing.indent(rr.logs)}')
                 success = False
             if rr.success:
-                rrr = mmt.elpigen('types', self._archive, self._subdir,
-                                  filename + '/' + os.path.splitext(os.path.basename(filename))[0])
-                if not rrr.success:
-                    logs.append(f'ELPI export failed:\n{parsing.indent(rrr.logs)}')
-                    success = False
-                else:
-                    assert rrr.value is not None
-                    with open(os.path.join(self._cwd, os.path.splitext(filename)[0] + '.elpi'), 'w',
-                              encoding='utf8') as fp:
-                        fp.write(rrr.value)
+                # the ELPI signature is only generated when ELPI is actually used (see `update_elpi_signatures`)
+                with self._lock:
+                    path = os.path.join(cwd, os.path.splitext(filename)[0] + '.elpi')
+                    self._staleelpisigs[path] = \
+                        (archive, subdir, filename + '/' + os.path.splitext(os.path.basename(filename))[0], files)
+                    self._failedelpisigs.pop(path, None)
         else:
             success = False
             logs.append(f'MMT import failed:\n{parsing.indent(mmtresult.logs)}')
@@ -280,33 +314,74 @@ class Glif(glif_abc.GlifABC):
         if mmtresult.success:
             mmt = mmtresult.value
             assert mmt
-            assert self._archive
-            rr = mmt.build_file(self._archive, self._subdir, filename)
+            archiveresult = self.get_archive_subdir()
+            assert archiveresult.value
+            rr = mmt.build_file(archiveresult.value[0], archiveresult.value[1], filename)
+            self._update_fingerprint('mmt', self.get_cwd(), filename, ('.gf', '.mmt'))
             if not rr.success:
                 return Result(False, logs=rr.logs)
         else:
             return Result(False, logs=f'MMT import failed:\n{parsing.indent(mmtresult.logs)}')
         return Result(True)
 
+    def update_elpi_signatures(self) -> Result[None]:
+        """ generates the stale ELPI signatures.
+            A signature that can't be generated is not generated again until its grammar is re-imported
+            and ELPI can still be used with the other signatures. The errors are only returned once (as logs),
+            afterwards, they are listed by the "status" command.
+        """
+        if not self._staleelpisigs:
+            return Result(True)
+        mmtresult = self.get_mmt()
+        logs = []
+        with self._elpisiglock:
+            with self._lock:
+                stale = list(self._staleelpisigs.items())
+            for path, signature in stale:
+                archive, subdir, theory, files = signature
+                if mmtresult.success:
+                    assert mmtresult.value
+                    r = mmtresult.value.elpigen('types', archive, subdir, theory, cache_key=files)
+                else:
+                    r = Result(False, logs=mmtresult.logs)
+                if r.success:
+                    assert r.value is not None
+                    with open(path, 'w', encoding='utf8') as fp:
+                        fp.write(r.value)
+                with self._lock:
+                    if self._staleelpisigs.get(path) != signature:
+                        continue  # the grammar has been re-imported in the meantime
+                    del self._staleelpisigs[path]
+                    if not r.success:
+                        error = f'ELPI export of {theory} ({os.path.basename(path)}) failed:\n{parsing.indent(r.logs)}'
+                        self._failedelpisigs[path] = error
+                        logs.append(error)
+        return Result(True, logs='\n'.join(logs))
+
     def import_elpi_file(self, filename: str) -> Result[None]:
-        fullpath = os.path.join(self._cwd, filename)
+        cwd = self.get_cwd()
+        fullpath = os.path.join(cwd, filename)
+
+        sigresult = self.update_elpi_signatures()
 
         # using f'elpi -I {__file__}' instead
         # shutil.copyfile(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'glif.elpi'),
         #         os.path.join(os.path.dirname(fullpath), 'glif.elpi'))
 
         if self._typecheckelpi:
-            er = elpi.runelpi(self._cwd, fullpath, 'glifutil.success')
+            er = elpi.runelpi(cwd, fullpath, 'glifutil.success')
             if not er.success:
-                return Result(False, logs=er.logs)
+                return Result(False, logs='\n'.join(filter(None, [sigresult.logs, er.logs])))
             assert er.value
             warning = er.value[0].strip()  # stdout should be empty
             if warning:
-                return Result(False, logs=warning)
+                elpi.TYPECHECK_CACHE.forget(elpi.TYPECHECK_CACHE.fingerprint(cwd, fullpath))
+                return Result(False, logs='\n'.join(filter(None, [sigresult.logs, warning])))
 
-        self._defaultelpi = fullpath
+        with self._lock:
+            self._defaultelpi = fullpath
         r: Result[None] = Result(True)
-        r.logs = f'{filename} is the new default file for ELPI commands'
+        r.logs = '\n'.join(filter(None, [sigresult.logs, f'{filename} is the new default file for ELPI commands']))
         return r
 
     def import_lex_file(self, filename: str) -> Result[None]:
@@ -317,10 +392,14 @@ class Glif(glif_abc.GlifABC):
         assert archive_result.value
         archive, subdir = archive_result.value
 
-        lexicon_path = os.path.join(self._cwd, filename)
+        cwd = self.get_cwd()
+        lexicon_path = os.path.join(cwd, filename)
 
         # creating GF and MMT files out of the lex file
-        lex_parser = LexiconParser(lexicon_path, archive=archive, subdir=subdir, cwd=self._cwd)  # type: ignore
+        try:
+            lex_parser = LexiconParser(lexicon_path, archive=archive, subdir=subdir, cwd=cwd)  # type: ignore
+        except (LexiconError, OSError) as ex:
+            return Result(False, logs=str(ex))
         result_create = lex_parser.create_all()
         if not result_create.success:
             print("Some files are not been created")
@@ -347,17 +426,18 @@ class Glif(glif_abc.GlifABC):
         return Result(True, logs='\n'.join(logs))
 
     def get_gf_shell(self) -> Result[gf.GFShellRaw]:
-        if not self._gfshell and self._gfshellFailedLogs is None:
-            place = find_executable('gf')
-            if place:
-                self._gfshell = gf.GFShellRaw(place, cwd=self._cwd)
+        with self._lock:
+            if not self._gfshell and self._gfshellFailedLogs is None:
+                r = self.backends.gf_pool.acquire()
+                if r.success:
+                    self._gfshell = r.value
+                else:
+                    self._gfshellFailedLogs = r.logs
+            if self._gfshell:
+                return Result(True, self._gfshell)
             else:
-                self._gfshellFailedLogs = 'Failed to locate executable "gf"'
-        if self._gfshell:
-            return Result(True, self._gfshell)
-        else:
-            assert self._gfshellFailedLogs
-            return Result(False, logs=self._gfshellFailedLogs)
+                assert self._gfshellFailedLogs
+                return Result(False, logs=self._gfshellFailedLogs)
 
     def stub_gen(self, target: str) -> Result[str]:
         archiveresult = self.get_archive_subdir()
@@ -372,8 +452,12 @@ class Glif(glif_abc.GlifABC):
             return Result(False, None, archiveresult.logs)
 
     def do_shutdown(self):
-        if self._gfshell:
-            self._gfshell.do_shutdown()
-
-        if self._mmt:
-            self._mmt.do_shutdown()
+        with self._lock:
+            if self._gfshell:
+                self.backends.gf_pool.release(self._gfshell)
+                self._gfshell = None
+                self._fingerprints['gf'] = None
+        self.set_store(None)
+
+        if self._ownsbackends:
+            self.backends.do_shutdown()
@@ -11,6 +11,7 @@ from typing import Optional, Any
 
 from .utils import Result
 from . import mmt, gf
+from .store import ResultStore
 from glif.commands import items
 
 
@@ -70,6 +71,23 @@ class GlifABC(ABC):
     def import_elpi_file(self, filename: str) -> Result[None]:
         raise NotImplementedError()
 
+    def get_store(self) -> Optional[ResultStore]:
+        """ the store for results of backend calls (if enabled) """
+        return None
+
+    def set_store(self, store: Optional[ResultStore]):
+        raise NotImplementedError()
+
+    def get_fingerprint(self, backend: str) -> Optional[str]:
+        """ identifies the state of the backend ('gf' or 'mmt') for the result store
+            (None if nothing has been imported yet)
+        """
+        return None
+
+    def update_elpi_signatures(self) -> Result[None]:
+        """ generates outdated ELPI signatures of imported grammars """
+        return Result(True)
+
     @abstractmethod
     def import_lex_file(self, filename: str) -> Result[None]:
         raise NotImplementedError
@@ -1,14 +1,17 @@
 """
    parsing Lex Dateien
 """
+import concurrent.futures
 import dataclasses
-import os.path
+import multiprocessing
+import os
 import shlex
 
 from . import parsing
 from .utils import Result
 
 from enum import auto, Enum
+from typing import Optional
 # from pydantic import BaseModel
 
 # from lexicon.data_classes import Format
@@ -20,6 +23,10 @@ DEFAULT_PATH = "."
 # TODO Path in die Eingabe vohin die erstellten Dateien kommen sollen.
 POSSIBLE_FLAGS_WORD = ["-l", "-add", "-drop"]
 POSSIBLE_FLAGS_TYPE = ["-l", "-constr"]
+# maximale Anzahl an Prozessen für die Erstellung der GF concrete Dateien
+LEX_MAX_PROCESSES = os.cpu_count() or 1
+# erst ab dieser Anzahl an Definitionen lohnt sich das Starten von Prozessen
+LEX_PARALLEL_MIN_ENTRIES = 10000
 
 
 @dataclasses.dataclass
@@ -87,6 +94,16 @@ class Importer:
     lang: str = "Eng"
 
 
+class LexiconError(RuntimeError):
+    """
+    Alle Fehler in einer Lexicondatei (mit Zeilennummern)
+    """
+
+    def __init__(self, lexicon_path: str, errors: list[str]):
+        RuntimeError.__init__(self, f"Errors in {lexicon_path}:\n" + "\n".join(errors))
+        self.errors = errors
+
+
 class LexiconParser(object):
     # definition_list: Paare von (name, typ), name: str und typ: list(str)
     # Hier befinden sich die eigentlichen Definitionen der Objekte.
@@ -100,6 +117,12 @@ class LexiconParser(object):
     # Beispiel: VP : \iota ⟶ o
     # (Liste statt Dict, weil Type nicht gehasht werden kann)
     type_def_list: list[Type_Definition] = []
+    # Index für type_def_list: Typname -> Typ-Definition
+    type_def_index: dict[str, Type_Definition] = {}
+
+    # Index für die other_names der Definitionen: Sprache -> (Name der Definition -> Name in der Sprache)
+    # (bei mehreren Namen in einer Sprache zählt der erste)
+    other_names_index: dict[str, dict[str, str]] = {}
 
     # Dateien, die in gf oder mmt importiert werden müssen.
     import_files: list[Importer] = []
@@ -127,6 +150,8 @@ class LexiconParser(object):
         # TODO Eingabe überprüfen
         self.definition_list = {}
         self.type_def_list = []
+        self.type_def_index = {}
+        self.other_names_index = {}
         self.import_files = []
         self.archive = archive
         self.archive_subdir = subdir
@@ -136,164 +161,158 @@ class LexiconParser(object):
         self.languages = ["Eng"]
         self.create_cat = True
 
-        code: str = ""
+        errors: list[str] = []
+        header_found = False
+        typdef = True
+        # Die Datei wird zeilenweise verarbeitet, damit auch große Lexika nicht
+        # komplett im Speicher gehalten werden müssen.
         with open(lexicon_path, "r", encoding="UTF-8") as flex:
-            code = flex.read()
-
-        # Löschen der Kommentare
-        codelines: list[str] = []
-        for line in code.split("\n"):
-            if line.split(KOMMENTAR_ZEICHEN)[0].strip():
-                codelines.append(line.split("#")[0].strip())
-        if not codelines:
-            raise RuntimeError("Found no codelines")
-        self.lexicon_name = codelines[0].split()[1]
-
-        if codelines[0].split()[0] != "Lexicon":
+            for line_number, line in enumerate(flex, start=1):
+                # Löschen der Kommentare
+                line = line.split(KOMMENTAR_ZEICHEN)[0].strip()
+                if not line:
+                    continue
+                try:
+                    if not header_found:
+                        header_found = True
+                        self.header_handle(line)
+                    elif typdef:
+                        if line == "def":
+                            typdef = False
+                        elif line.startswith("include"):  # Veraussetzung zum Import ist Endung
+                            result = self.include_handle(line)
+                            if not result.success:
+                                raise RuntimeError(result.logs)
+                        else:
+                            self.type_handle(line)
+                    else:
+                        self.definition_handle(line)
+                except (RuntimeError, OSError) as ex:
+                    # alle Fehler sammeln, statt beim ersten abzubrechen
+                    errors.append(f"line {line_number}: {str(ex).strip()}")
+                except (ValueError, IndexError) as ex:  # unerwartet geformte Zeilen
+                    errors.append(f"line {line_number}: {type(ex).__name__}: {ex} in {line}")
+        if not header_found:
+            errors.append("Found no codelines")
+        if errors:
+            raise LexiconError(lexicon_path, errors)
+
+    def header_handle(self, line: str) -> None:
+        """
+        Verarbeitet die erste Zeile: "Lexicon <name>"
+        """
+        line_split = line.split()
+        self.lexicon_name = line_split[1] if len(line_split) > 1 else ""
+        if line_split[0] != "Lexicon":
             raise RuntimeError("A lexicon file have to start with 'Lexicon'")
         if not self.lexicon_name.isidentifier():
             raise RuntimeError("Lexicon name have to be a identifier")
 
-        typdef = True
-        for line in codelines[1:]:
-            if typdef:
-                if line.strip() == "def":
-                    typdef = False
-                    continue
-                if line.startswith("include"):  # Veraussetzung zum Import ist Endung
-                    result = self.include_handle(line)
-                    if not result.success:
-                        raise RuntimeError(result.logs)
-                else:  # TODO das hier auslagern
-                    line_split = line.split(":", 2)
-                    if len(line_split) < 2:
-                        raise RuntimeError(f"no seperator ':' in {line}\n")
-                    name_type = line_split[0].strip()
-                    type_name = line_split[1].replace(" ", "")
-                    rest = ""
-                    if len(line_split) == 3:
-                        rest = line_split[2]
-                    # options
-                    current_option = ""
+    def type_handle(self, line: str) -> None:
+        """
+        Verarbeitet eine Typ-Definition (vor "def")
+        """
+        line_split = line.split(":", 2)
+        if len(line_split) < 2:
+            raise RuntimeError(f"no seperator ':' in {line}\n")
+        name_type = line_split[0].strip()
+        type_name = line_split[1].replace(" ", "")
+        rest = ""
+        if len(line_split) == 3:
+            rest = line_split[2]
+        # options
+        current_option = ""
+        lang = ""
+        long_option = ""
+        gf_forms = []
+        constructor = []
+        for option in rest.split():
+            if current_option == "":
+                current_option = option
+            elif current_option == "-l":
+                if lang == "":
+                    lang = option
+                elif option in POSSIBLE_FLAGS_TYPE:
+                    # TODO schon in der Sprache vorhanden überprüfen
+                    gf_forms.append((long_option.strip(), lang))
                     lang = ""
+                    current_option = option
                     long_option = ""
-                    gf_forms = []
-                    constructor = []
-                    for option in rest.split():
-                        if current_option == "":
-                            current_option = option
-                        elif current_option == "-l":
-                            if lang == "":
-                                lang = option
-                            elif option in POSSIBLE_FLAGS_TYPE:
-                                # TODO schon in der Sprache vorhanden überprüfen
-                                gf_forms.append((long_option.strip(), lang))
-                                lang = ""
-                                current_option = option
-                                long_option = ""
-                            else:
-                                long_option += " " + option
-                        elif current_option == "-constr":
-                            if lang == "":
-                                lang = option
-                            else:
-                                # TODO schon in der Sprache vorhanden überprüfen
-                                constructor.append((option, lang))
-                                current_option = ""
-                                lang = ""
-                        else:
-                            raise RuntimeError("unknown flag or false flag usage\n")
-
-                    if long_option != "":
-                        if current_option == "-l" and lang != "":
-                            gf_forms.append((long_option.strip(), lang))
-                            current_option = ""
-                            lang = ""
-                            long_option = ""
-                        else:  # Das sollte nie erreicht werden.
-                            raise RuntimeError("Something went wrong\n")
-
-                    if current_option != "":
-                        raise RuntimeError("unknown flag or false flag usage\n")
-
-                    for type_definition in self.type_def_list:
-                        if name_type == type_definition.name.single_type:
-                            raise RuntimeError(f"{name_type} already defined\n")
-                    type_ = Type(single_type=name_type)
-                    type_definition = Type_Definition(
-                        name=type_,
-                        mmt_form=type_name,
-                        gf_forms=gf_forms,
-                        constructor=constructor,
-                    )
-                    self.type_def_list.append(type_definition)
+                else:
+                    long_option += " " + option
+            elif current_option == "-constr":
+                if lang == "":
+                    lang = option
+                else:
+                    # TODO schon in der Sprache vorhanden überprüfen
+                    constructor.append((option, lang))
+                    current_option = ""
+                    lang = ""
             else:
-                name, full_types = line.split(":")
-                name = name.strip()
-                line_type = full_types.split("->")
-                line_type_list: list[Type] = []
-                for type_str in line_type[:-1]:
-                    line_type_list.append(Type(single_type=type_str.strip()))
-
-                # der letzte Typ + mögliche optionen
-                type_and_ending = line_type[-1].split()
-                line_type_list.append(Type(single_type=type_and_ending[0].strip()))
-
-                options = type_and_ending[1:]
-                other_names: list[tuple[str, str]] = []
-                lang = ""
-                to_add = ""
+                raise RuntimeError("unknown flag or false flag usage\n")
+
+        if long_option != "":
+            if current_option == "-l" and lang != "":
+                gf_forms.append((long_option.strip(), lang))
                 current_option = ""
+                lang = ""
                 long_option = ""
-                drop = False
-                for option in options:
-                    if current_option == "":
-                        current_option = option
-                    elif current_option == "-l":
-                        if lang == "":
-                            lang = option
-                            result = self.lang_handle(lang, name)
-                            if not result.success:
-                                raise RuntimeError(result.logs)
-                        else:
-                            if option in POSSIBLE_FLAGS_WORD:
-                                if lang != "Eng":
-                                    other_names.append((long_option.strip(), lang))
-                                else:
-                                    if to_add != "":
-                                        raise RuntimeError(
-                                            "special case of" + f" {name} already set\n"
-                                        )
-                                    to_add = long_option
-                                lang = ""
-                                long_option = ""
-                                current_option = option
-                            else:
-                                long_option += " " + option
-                    elif current_option == "-add":
-                        if to_add != "":
-                            raise RuntimeError(f"special case of {name} already set\n")
-                        if option in POSSIBLE_FLAGS_WORD:
-                            to_add = long_option
-                            current_option = option
-                            long_option = ""
-                        else:
-                            long_option += " " + option
-                    elif current_option == "-drop":
-                        drop = True
-                        if to_add != "":
-                            raise RuntimeError(f"special case of {name} already set\n")
-                        if option in POSSIBLE_FLAGS_WORD:
-                            to_add = long_option
-                            current_option = option
-                            long_option = ""
-                        else:
-                            long_option += " " + option
-                    else:
-                        raise RuntimeError("unknown flag or false flag usage\n")
-
-                if long_option != "":
-                    if current_option == "-l":
+            else:  # Das sollte nie erreicht werden.
+                raise RuntimeError("Something went wrong\n")
+
+        if current_option != "":
+            raise RuntimeError("unknown flag or false flag usage\n")
+
+        if name_type in self.type_def_index:
+            raise RuntimeError(f"{name_type} already defined\n")
+        type_ = Type(single_type=name_type)
+        type_definition = Type_Definition(
+            name=type_,
+            mmt_form=type_name,
+            gf_forms=gf_forms,
+            constructor=constructor,
+        )
+        self.type_def_list.append(type_definition)
+        self.type_def_index[name_type] = type_definition
+
+    def definition_handle(self, line: str) -> None:
+        """
+        Verarbeitet eine Definition (nach "def")
+        """
+        line_split = line.split(":")
+        if len(line_split) != 2:
+            raise RuntimeError(f"expected exactly one seperator ':' in {line}\n")
+        name, full_types = line_split
+        name = name.strip()
+        line_type = full_types.split("->")
+        line_type_list: list[Type] = []
+        for type_str in line_type[:-1]:
+            line_type_list.append(Type(single_type=type_str.strip()))
+
+        # der letzte Typ + mögliche optionen
+        type_and_ending = line_type[-1].split()
+        if not type_and_ending:
+            raise RuntimeError(f"no type for {name}\n")
+        line_type_list.append(Type(single_type=type_and_ending[0].strip()))
+
+        options = type_and_ending[1:]
+        other_names: list[tuple[str, str]] = []
+        lang = ""
+        to_add = ""
+        current_option = ""
+        long_option = ""
+        drop = False
+        for option in options:
+            if current_option == "":
+                current_option = option
+            elif current_option == "-l":
+                if lang == "":
+                    lang = option
+                    result = self.lang_handle(lang, name)
+                    if not result.success:
+                        raise RuntimeError(result.logs)
+                else:
+                    if option in POSSIBLE_FLAGS_WORD:
                         if lang != "Eng":
                             other_names.append((long_option.strip(), lang))
                         else:
@@ -304,51 +323,95 @@ class LexiconParser(object):
                             to_add = long_option
                         lang = ""
                         long_option = ""
-                        current_option = ""
-                    elif current_option == "-add":
-                        if to_add != "":
-                            raise RuntimeError(f"special case of {name} already set\n")
-                        to_add = long_option
-                        long_option = ""
-                        current_option = ""
-                    elif current_option == "-drop":
-                        drop = True
-                        if to_add != "":
-                            raise RuntimeError(f"special case of {name} already set\n")
-                        to_add = long_option
-                        long_option = ""
-                        current_option = ""
-
-                if current_option != "":
-                    raise RuntimeError(f"{current_option} flag set but not used\n")
+                        current_option = option
+                    else:
+                        long_option += " " + option
+            elif current_option == "-add":
+                if to_add != "":
+                    raise RuntimeError(f"special case of {name} already set\n")
+                if option in POSSIBLE_FLAGS_WORD:
+                    to_add = long_option
+                    current_option = option
+                    long_option = ""
+                else:
+                    long_option += " " + option
+            elif current_option == "-drop":
+                drop = True
+                if to_add != "":
+                    raise RuntimeError(f"special case of {name} already set\n")
+                if option in POSSIBLE_FLAGS_WORD:
+                    to_add = long_option
+                    current_option = option
+                    long_option = ""
+                else:
+                    long_option += " " + option
+            else:
+                raise RuntimeError("unknown flag or false flag usage\n")
 
-                already_in_list = False
-                if name in self.definition_list:
-                    already_in_list = True
-                    if self.definition_list[name].type_ != line_type_list:
+        if long_option != "":
+            if current_option == "-l":
+                if lang != "Eng":
+                    other_names.append((long_option.strip(), lang))
+                else:
+                    if to_add != "":
                         raise RuntimeError(
-                            f"{name} already defined" + " with a different type\n"
+                            "special case of" + f" {name} already set\n"
                         )
-                    self.definition_list[name].other_names += other_names
-                if not already_in_list:
-                    self.definition_list.update(
-                        {
-                            name: Definition(
-                                name=name,
-                                drop=drop,
-                                type_=line_type_list,
-                                other_names=other_names,
-                                to_add=to_add,
-                            )
-                        }
+                    to_add = long_option
+                lang = ""
+                long_option = ""
+                current_option = ""
+            elif current_option == "-add":
+                if to_add != "":
+                    raise RuntimeError(f"special case of {name} already set\n")
+                to_add = long_option
+                long_option = ""
+                current_option = ""
+            elif current_option == "-drop":
+                drop = True
+                if to_add != "":
+                    raise RuntimeError(f"special case of {name} already set\n")
+                to_add = long_option
+                long_option = ""
+                current_option = ""
+
+        if current_option != "":
+            raise RuntimeError(f"{current_option} flag set but not used\n")
+
+        already_in_list = False
+        if name in self.definition_list:
+            already_in_list = True
+            if self.definition_list[name].type_ != line_type_list:
+                raise RuntimeError(
+                    f"{name} already defined" + " with a different type\n"
+                )
+            self.definition_list[name].other_names += other_names
+        for other_name, lang in other_names:
+            self.other_names_index.setdefault(lang, {}).setdefault(name, other_name)
+        if not already_in_list:
+            self.definition_list.update(
+                {
+                    name: Definition(
+                        name=name,
+                        drop=drop,
+                        type_=line_type_list,
+                        other_names=other_names,
+                        to_add=to_add,
                     )
+                }
+            )
 
     def include_handle(self, line: str) -> Result[str]:
         """
         Überprüft die include Datei um das passende Format zu erkennen
         Der Pfad ist immer in Abhängigkeit von der lex Datei anzugeben.
         """
-        line_array = shlex.split(line)
+        try:
+            line_array = shlex.split(line)
+        except ValueError as ex:  # z.B. fehlendes Anführungszeichen
+            return Result(False, None, f"{ex} in {line}\n")
+        if len(line_array) < 2:
+            return Result(False, None, f"no file given in {line}\n")
         import_file_name = line_array[1]
         ending = import_file_name.split(".")[-1]
         if ending == import_file_name:  # In this case it is a MMT file with no ending
@@ -428,13 +491,11 @@ class LexiconParser(object):
         return Result(True, "\n")
 
     def lang_handle(self, lang: str, name: str) -> Result[None]:
-        if name in self.definition_list:
-            for _, language in self.definition_list[name].other_names:
-                if lang == language:
-                    return Result(
-                        False,
-                        logs=f"{name} already definied" + f" in the language {lang}",
-                    )
+        if name in self.other_names_index.get(lang, {}):
+            return Result(
+                False,
+                logs=f"{name} already definied" + f" in the language {lang}",
+            )
         if lang not in self.languages:
             self.languages.append(lang)
         return Result(True)
@@ -514,103 +575,82 @@ class LexiconParser(object):
         auto_comm_eng = "-- This is auto-generated. Pls do not modify.\n"
         write_name: str = os.path.join(self.cwd, self.lexicon_name + file_ending)
         if self.file_check(write_name, auto_comm_eng):
+            code = auto_comm_eng + self.gf_concrete_code(language)
             with open(write_name, "w", encoding="UTF-8") as gfcon:
-                gfcon.write(auto_comm_eng)
-
-                open_needed: bool = False
-                extend_needed: bool = False
-                for importer in self.import_files:
-                    if importer.format_ == Format.GF_RESOURCE:
-                        if importer.lang == language:
-                            open_needed = True
-
-                    elif importer.format_ == Format.GF_CONCRETE:
-                        if importer.lang == language:
-                            extend_needed = True
-
-                open_string = ""
-                if open_needed:
-                    opened_resources = ""
-                    for importer in self.import_files:
-                        if importer.format_ == Format.GF_RESOURCE:
-                            if importer.lang == language:
-                                import_name = os.path.basename(importer.link[:-3])
-                                opened_resources += import_name + ", "
-                    opened_resources = opened_resources[:-2]
-                    open_string = f"open {opened_resources} in "
-
-                extend_string = ""
-                if extend_needed:
-                    extends = ""
-                    for importer in self.import_files:
-                        if importer.format_ == Format.GF_CONCRETE:
-                            if importer.lang == language:
-                                import_name = os.path.basename(importer.link[:-3])
-                                extends += import_name + ", "
-                    extends = extends[:-2]
-                    extend_string = f"{extends} ** "
-
-                gfcon.write(
-                    f"concrete {self.lexicon_name}{language}"
-                    + f" of {self.lexicon_name} = "
-                    + extend_string
-                    + open_string
-                    + "{\n"
-                )
-
-                gfcon.write("flags\n\t coding=utf8 ;\n")
-
-                # default Fall: Str
-                # Falls concrete importiert wird, wird der lincat Teil übersprungen
-                if not extend_needed:
-                    gfcon.write("\tlincat\n")
-                    for type_definition in self.type_def_list:
-                        written: bool = False
-                        for form, lang in type_definition.gf_forms:
-                            if lang == language:
-                                gfcon.write(
-                                    f"\t\t{type_definition.name.single_type} ="
-                                    + f" {form};\n"
-                                )
-                                written = True
-                                break
-                        if not written:  # default
-                            gfcon.write(
-                                f"\t\t{type_definition.name.single_type} = Str;\n"
-                            )
-
-                gfcon.write("\tlin\n")
-                for definition in self.definition_list.values():
-                    if len(definition.type_) == 1:
-                        mk_string = f"mk{definition.type_[0].single_type}"
-                        for type_definition in self.type_def_list:
-                            if type_definition.name == definition.type_[0]:
-                                for constr, lang in type_definition.constructor:
-                                    if lang == language:
-                                        mk_string = constr
-                                        break
-                                break
-                        # Sprachen und Zusätze
-                        input_name = f'"{definition.name}"'
-                        if definition.drop:
-                            input_name = ""
-                        if language == "Eng" and definition.to_add != "":
-                            input_name += " " + definition.to_add
-                        else:
-                            for other_name, lang in definition.other_names:
-                                if lang == language:
-                                    input_name = other_name
-                                    break
-                        # nur Wörter der Form "Peter : Name"
-                        input_name = input_name.strip()
-                        gfcon.write(
-                            f"\t\t{definition.name} = " + f"{mk_string} {input_name};\n"
-                        )
-
-                gfcon.write("}")
+                gfcon.write(code)  # ein einziger write-Aufruf
             return Result(True, file_ending)
         return Result(False, None, f"{write_name} already exists\n")
 
+    def gf_concrete_code(self, language: str) -> str:
+        """
+        Der Inhalt der GF concrete Datei (ohne den auto-gen Kommentar)
+        """
+        parts: list[str] = []
+
+        # Importe der Sprache
+        opened_resources: list[str] = []
+        extends: list[str] = []
+        for importer in self.import_files:
+            if importer.lang != language:
+                continue
+            if importer.format_ == Format.GF_RESOURCE:
+                opened_resources.append(os.path.basename(importer.link[:-3]))
+            elif importer.format_ == Format.GF_CONCRETE:
+                extends.append(os.path.basename(importer.link[:-3]))
+        open_string = f"open {', '.join(opened_resources)} in " if opened_resources else ""
+        extend_string = f"{', '.join(extends)} ** " if extends else ""
+
+        parts.append(
+            f"concrete {self.lexicon_name}{language}"
+            + f" of {self.lexicon_name} = "
+            + extend_string
+            + open_string
+            + "{\n"
+        )
+
+        parts.append("flags\n\t coding=utf8 ;\n")
+
+        # default Fall: Str
+        # Falls concrete importiert wird, wird der lincat Teil übersprungen
+        if not extends:
+            parts.append("\tlincat\n")
+            for type_definition in self.type_def_list:
+                lincat = "Str"
+                for form, lang in type_definition.gf_forms:
+                    if lang == language:
+                        lincat = form
+                        break
+                parts.append(f"\t\t{type_definition.name.single_type} = {lincat};\n")
+
+        # Konstruktoren der Sprache: Typname -> Konstruktor
+        constructors: dict[str, str] = {}
+        for type_definition in self.type_def_list:
+            for constr, lang in type_definition.constructor:
+                if lang == language:
+                    constructors[type_definition.name.single_type] = constr
+                    break
+
+        parts.append("\tlin\n")
+        other_names = self.other_names_index.get(language, {})
+        for definition in self.definition_list.values():
+            if len(definition.type_) == 1:
+                type_name = definition.type_[0].single_type
+                mk_string = constructors.get(type_name, f"mk{type_name}")
+                # Sprachen und Zusätze
+                input_name = f'"{definition.name}"'
+                if definition.drop:
+                    input_name = ""
+                if language == "Eng" and definition.to_add != "":
+                    input_name += " " + definition.to_add
+                elif definition.name in other_names:
+                    input_name = other_names[definition.name]
+                # nur Wörter der Form "Peter : Name"
+                input_name = input_name.strip()
+                parts.append(f"\t\t{definition.name} = {mk_string} {input_name};\n")
+
+        parts.append("}")
+        return "".join(parts)
+
     def create_mmt_semantics(self) -> Result[str]:
         """
         Erstellt die MMT Datei mit den Semantics, die später im view verwendet wird.
@@ -632,12 +672,10 @@ class LexiconParser(object):
                         mmtsem.write(f"\tinclude {importer.link} ❙\n")
 
                 for definition in self.definition_list.values():
-                    mmt_definition_type: str = ""
-                    for type_definition in self.type_def_list:
-                        if type_definition.name == definition.type_[0]:
-                            mmt_definition_type = type_definition.mmt_form
-                    if mmt_definition_type == "":
-                        return (False, None, f"{definition.type_[0]} is not definied in the lexicon")
+                    type_definition = self.type_def_index.get(definition.type_[0].single_type)
+                    if type_definition is None or type_definition.mmt_form == "":
+                        return Result(False, None, f"{definition.type_[0]} is not definied in the lexicon")
+                    mmt_definition_type: str = type_definition.mmt_form
                     mmtsem.write(f"\t{definition.name} : {mmt_definition_type} ❙\n")
                 mmtsem.write("❚")
             return Result(True, file_ending)
@@ -724,8 +762,7 @@ class LexiconParser(object):
             logs.append(result.logs)
             success = False
 
-        for lang in self.languages:
-            result = self.create_gf_concrete(lang)
+        for result in self.create_gf_concretes():
             if result.success:
                 file_names.append(result.value)
             else:
@@ -736,6 +773,32 @@ class LexiconParser(object):
             return Result(True, file_names, "\n".join(logs))
         return Result(False, file_names, "\n".join(logs))
 
+    def create_gf_concretes(self) -> list[Result[str]]:
+        """
+        Erstellt die GF concrete Dateien aller Sprachen. Bei großen Lexika mit mehreren
+        Sprachen geschieht das parallel in bis zu LEX_MAX_PROCESSES Prozessen.
+        """
+        processes = min(LEX_MAX_PROCESSES, len(self.languages))
+        results: dict[str, Result[str]] = {}
+        if processes > 1 and len(self.definition_list) >= LEX_PARALLEL_MIN_ENTRIES:
+            try:
+                # 'spawn' statt 'fork', weil fork in Prozessen mit mehreren Threads (z.B. glif serve)
+                # zu Deadlocks führen kann. Der Parser wird nur einmal pro Prozess übertragen.
+                with concurrent.futures.ProcessPoolExecutor(
+                    processes, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self,)
+                ) as executor:
+                    futures = {lang: executor.submit(_create_gf_concrete, lang) for lang in self.languages}
+                    for lang, future in futures.items():
+                        try:
+                            results[lang] = future.result()
+                        except (OSError, concurrent.futures.process.BrokenProcessPool):
+                            pass
+            except (OSError, concurrent.futures.process.BrokenProcessPool):
+                pass  # z.B. wenn keine Prozesse gestartet werden können
+        # nur die Sprachen, die nicht parallel erstellt werden konnten, werden hier erstellt
+        return [results[lang] if lang in results else self.create_gf_concrete(lang) for lang in self.languages]
+
     def create_mmt(self) -> Result[list[str]]:
         logs: list[str] = []
         success: bool = True
@@ -779,3 +842,16 @@ class LexiconParser(object):
         if success:
             return Result(True, file_names, "\n".join(logs))
         return Result(False, file_names, "\n".join(logs))
+
+
+_worker_parser: Optional[LexiconParser] = None
+
+
+def _init_worker(parser: LexiconParser) -> None:
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _create_gf_concrete(language: str) -> Result[str]:
+    assert _worker_parser is not None
+    return _worker_parser.create_gf_concrete(language)
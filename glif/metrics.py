@@ -0,0 +1,260 @@
+"""
+    Aggregated metrics (counters and latency histograms) for monitoring long-running GLIF processes.
+
+    The metrics are kept in a registry and can be exported in the Prometheus text format
+    (`prometheus_text`), optionally through a small HTTP endpoint (`start_http_server`).
+    Unlike `glif.tracing`, metrics are always collected, but they only aggregate numbers.
+"""
+
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, Optional
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    labels = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(object):
+    type_: str = 'untyped'
+
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'Metric {self.name} expects the labels {", ".join(self.labelnames)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type_}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type_ = 'counter'
+
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        Metric.__init__(self, name, help_, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    type_ = 'histogram'
+
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        Metric.__init__(self, name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (counts per bucket (not cumulative), sum)
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        # observations of each thread: label values -> [count, sum]
+        self._thread_values = threading.local()
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * len(self.buckets), [0.0])
+            counts, sum_ = self._values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            sum_[0] += value
+        if not hasattr(self._thread_values, 'values'):
+            self._thread_values.values = {}
+        thread_value = self._thread_values.values.setdefault(key, [0, 0.0])
+        thread_value[0] += 1
+        thread_value[1] += value
+
+    def time(self, **labels: str) -> '_Timer':
+        """ context manager that observes the time spent in it """
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            value = self._values.get(self._key(labels))
+            return sum(value[0]) if value else 0
+
+    def totals(self) -> dict[tuple[str, ...], tuple[int, float]]:
+        """ label values -> (number of observations, sum) """
+        with self._lock:
+            return {key: (sum(counts), sum_[0]) for key, (counts, sum_) in self._values.items()}
+
+    def thread_totals(self) -> dict[tuple[str, ...], tuple[int, float]]:
+        """ like `totals`, but only for the observations made by the current thread """
+        values = getattr(self._thread_values, 'values', {})
+        return {key: (count, sum_) for key, (count, sum_) in values.items()}
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (counts[:], sum_[0])) for key, (counts, sum_) in self._values.items())
+        for key, (counts, sum_) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(sum_)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}'
+
+
+class _Timer(object):
+    def __init__(self, histogram: Histogram, labels: dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class CallbackMetric(Metric):
+    """ a metric whose values are determined when the metrics are exported """
+
+    def __init__(self, name: str, help_: str, type_: str,
+                 callback: Callable[[], dict[tuple[str, ...], float]], labelnames: tuple[str, ...] = ()):
+        Metric.__init__(self, name, help_, labelnames)
+        self.type_ = type_
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.callback().items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Registry(object):
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        counter = Counter(name, help_, labelnames)
+        self.register(counter)
+        return counter
+
+    def histogram(self, name: str, help_: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, help_, labelnames, buckets)
+        self.register(histogram)
+        return histogram
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+def prometheus_text() -> str:
+    """ all metrics of the global registry in the Prometheus text format """
+    return REGISTRY.prometheus_text()
+
+
+# metrics that are updated by GLIF
+COMMANDS = REGISTRY.counter('glif_commands_total', 'Commands executed (as part of a pipeline)', ('command',))
+COMMAND_ITEMS = REGISTRY.counter('glif_command_items_total', 'Items produced by commands', ('command',))
+COMMAND_DURATION = REGISTRY.histogram('glif_command_chunk_duration_seconds',
+                                      'Time spent by commands on a chunk of items', ('command',))
+BACKEND_CALLS = REGISTRY.histogram('glif_backend_call_duration_seconds',
+                                   'Calls of GF, MMT, ELPI and dot', ('backend', 'operation'))
+BACKEND_FAILURES = REGISTRY.counter('glif_backend_call_failures_total',
+                                    'Failed calls of GF, MMT, ELPI and dot', ('backend', 'operation'))
+BACKEND_STARTS = REGISTRY.counter('glif_backend_starts_total', 'Backend processes started', ('backend',))
+BACKEND_RESTARTS = REGISTRY.counter('glif_backend_restarts_total',
+                                    'Backend processes that were shut down to be restarted', ('backend',))
+SUBPROCESS_SPAWNS = REGISTRY.counter('glif_subprocess_spawns_total', 'Subprocesses spawned', ('program',))
+CACHE_REQUESTS = REGISTRY.counter('glif_cache_requests_total', 'Cache lookups', ('cache', 'result'))
+RPC_REQUESTS = REGISTRY.counter('glif_rpc_requests_total', 'JSON-RPC requests (glif serve)', ('method',))
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    server: 'MetricsHTTPServer'
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.prometheus_text().encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], registry: Registry):
+        ThreadingHTTPServer.__init__(self, address, _MetricsRequestHandler)
+        self.registry = registry
+
+
+def start_http_server(port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> MetricsHTTPServer:
+    """ serves the metrics at http://host:port/metrics (in a background thread) """
+    server = MetricsHTTPServer((host, port), registry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -6,7 +6,7 @@ import xml.etree.ElementTree as ET  # need XML processing for uncaught MMT excep
 import threading
 from typing import Optional, Any
 
-from . import utils
+from . import cache, metrics, tracing, utils
 from .utils import Result
 
 GLIF_BUILD_EXTENSION = 'info.kwarc.mmt.glf.GlfBuildServer'
@@ -20,6 +20,7 @@ class MathHub(object):
     def __init__(self, mathhubdir: str):
         self.mhdir: str = mathhubdir
         self.archives: dict[str, str] = self.__find_archives(self.mhdir)
+        self._lock = threading.Lock()  # archives can be created by different sessions at the same time
 
     def __find_archives(self, root: str):
         archives = {}
@@ -42,6 +43,10 @@ class MathHub(object):
         return archives
 
     def make_archive(self, archive: str) -> Result[str]:
+        with self._lock:
+            return self._make_archive(archive)
+
+    def _make_archive(self, archive: str) -> Result[str]:
         if archive in self.archives:
             return Result(False, self.archives[archive], 'archive existed already')
         path = self.mhdir
@@ -72,8 +77,7 @@ class MathHub(object):
         path = os.path.join(self.archives[archive], 'source')
         for a in subdir.split('/'):
             path = os.path.join(path, a)
-            if not os.path.isdir(path):
-                os.mkdir(path)
+            os.makedirs(path, exist_ok=True)  # might have been created by another session in the meantime
 
         return Result(True, path, '')
 
@@ -101,6 +105,8 @@ class MMTServer(object):
         ]
         cmds = ['show version'] + ['extension ' + e for e in extensions] + ['server on ' + str(self.port)]
         args = ['java', '-jar', mmt_jar, '--keepalive', '--shell', ' ; '.join(cmds)]
+        metrics.SUBPROCESS_SPAWNS.inc(program='java')
+        metrics.BACKEND_STARTS.inc(backend='mmt')
         pipe = os.pipe()
         self.mmt = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=pipe[1], stderr=pipe[1], text=True, shell=False)
         self.infile = os.fdopen(pipe[0])
@@ -158,18 +164,24 @@ class MMTServer(object):
 
     def post_request(self, extension: str, json: Any) -> Result[Any]:
         url = f'http://127.0.0.1:{self.port}/:{extension}'
-        try:
-            response = requests.post(url, json=json)
-        except requests.exceptions.ConnectionError:
-            return Result(False, None, 'Connection error when trying to reach ' + url)
+        with tracing.span(extension, 'mmt') as span, metrics.BACKEND_CALLS.time(backend='mmt', operation=extension):
+            try:
+                response = requests.post(url, json=json)
+            except requests.exceptions.ConnectionError:
+                metrics.BACKEND_FAILURES.inc(backend='mmt', operation=extension)
+                return Result(False, None, 'Connection error when trying to reach ' + url)
+            span.set(bytes_in=len(response.request.body or b''), bytes_out=len(response.content))
 
         # TODO: Check headers for content-type to see if it's xml/json?
         try:
             # Ideally we would check for the status code.
             # Unfortunately, MMT also returns 200 for uncaught exceptions :/
             # https://github.com/UniFormal/MMT/issues/329
-            return Result(True, response.json(), '')
+            with tracing.span('json decode', 'mmt'):
+                value = response.json()
+            return Result(True, value, '')
         except simplejson.errors.JSONDecodeError:
+            metrics.BACKEND_FAILURES.inc(backend='mmt', operation=extension)
             # probably an uncaught MMT exception, which is XML
             try:
                 return Result(False, None, '\n'.join(ET.fromstring(response.text).itertext()))
@@ -238,7 +250,25 @@ class MMTInterface(object):
         return Result(False, None, result.logs)
 
     def elpigen(self, mode: str, archive: str, subdir: Optional[str], theory: str,
-                meta: bool = False, includes: bool = True) -> Result[str]:
+                meta: bool = False, includes: bool = True, cache_key: Optional[str] = None) -> Result[str]:
+        """ If `cache_key` is provided (it has to identify the content of the theory and everything it depends on),
+            the generated code is kept in the disk cache (see `glif.cache`).
+        """
+        disk_cache = cache.get_cache() if cache_key else None
+        if disk_cache:
+            assert cache_key
+            cache_key = cache.key(cache_key, mode, archive, subdir or '', theory, str(meta), str(includes))
+            code = disk_cache.get('elpigen', cache_key)
+            if code is not None:
+                return Result(True, code.decode('utf8'), '')
+        r = self._elpigen(mode, archive, subdir, theory, meta, includes)
+        if disk_cache and r.success and not r.logs:
+            assert cache_key and r.value is not None
+            disk_cache.put('elpigen', cache_key, r.value.encode('utf8'))
+        return r
+
+    def _elpigen(self, mode: str, archive: str, subdir: Optional[str], theory: str,
+                 meta: bool, includes: bool) -> Result[str]:
         result = self.server.post_request(
             'glif-elpigen',
             json={
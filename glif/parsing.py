@@ -10,11 +10,11 @@
         returns
         ('parse', '-lang=Eng "hello world"')
 
-    Remark:
-        These tools are not optimized for efficiency and
-        tend to be rather hacky.
+    Internally, the parsers work with indices into the input string
+    to avoid copying (potentially long) arguments repeatedly.
 """
 
+import re
 from typing import Optional
 
 from .utils import Result
@@ -48,87 +48,112 @@ class CommandArgument(object):
 
 def parse_command_arg(s0: str) -> Result[tuple[CommandArgument, str]]:
     s = s0.strip()
+    r = _parse_command_arg(s, 0)
+    if not r.success:
+        return Result(False, logs=r.logs)
+    assert r.value
+    return Result(True, (r.value[0], s[r.value[1]:]))
+
+
+def _parse_command_arg(s: str, i: int) -> Result[tuple[CommandArgument, int]]:
+    """ parses the argument starting at s[i] and returns it with the index of the remaining string """
     # Deal with leading "-" or "--"
-    if not s or not s[0] == '-' or len(s) == 1:
-        return Result(success=False, logs=f'Expected argument starting with "-", found "{s}"')
-    if s[1] == '-':
-        s = s[2:]
-    else:
-        s = s[1:]
-
-    argname, s = parse_identifier(s, allow_minus=True)
-    if not s:
-        return Result(True, (CommandArgument(argname), ''))
-    if s[0] == ' ':
-        return Result(True, (CommandArgument(argname), s[1:]))
-    if s[0] != '=':
-        return Result(success=False, logs=f'Unexpected character "{s[0]}" when parsing "{s0}"')
-    s = s[1:]
-    if not s:
-        return Result(success=False, logs=f'Missing argument value in "{s0}"')
-    if s[0] == '"':
-        res = parse_string(s)
+    if i >= len(s) or s[i] != '-' or i + 1 == len(s):
+        return Result(success=False, logs=f'Expected argument starting with "-", found "{s[i:]}"')
+    start = i
+    i += 2 if s[i + 1] == '-' else 1
+
+    if i >= len(s) or not _is_identifier_start(s[i], False):
+        return Result(success=False, logs=f'Expected argument name in "{s[start:]}"')
+    end = _identifier_end(s, i, allow_minus=True)
+    argname = s[i:end]
+    i = end
+    if i == len(s):
+        return Result(True, (CommandArgument(argname), i))
+    if s[i] == ' ':
+        return Result(True, (CommandArgument(argname), i + 1))
+    if s[i] != '=':
+        return Result(success=False, logs=f'Unexpected character "{s[i]}" when parsing "{s[start:]}"')
+    i += 1
+    if i == len(s):
+        return Result(success=False, logs=f'Missing argument value in "{s[start:]}"')
+    if s[i] == '"':
+        res = _parse_string(s, i)
         if res.success:
             assert res.value
-            argval, s = res.value
-            return Result(success=True, value=(CommandArgument(argname, argval), s))
+            argval, i = res.value
+            return Result(success=True, value=(CommandArgument(argname, argval), i))
         else:
             return Result(success=False, logs=res.logs)
-        # r = parseString(s)
-    elif s[0].isidentifier() or s[0].isalnum() or s[0] in {'.', '/'}:
-        argval, s = parse_until_space(s)
-        return Result(success=True, value=(CommandArgument(argname, argval), s))
+    elif s[i].isidentifier() or s[i].isalnum() or s[i] in {'.', '/'}:
+        end = _until_space(s, i)
+        return Result(success=True, value=(CommandArgument(argname, s[i:end]), end))
     else:
-        return Result(success=False, logs=f'Unexpected argument value in "{s0}"')
+        return Result(success=False, logs=f'Unexpected argument value in "{s[start:]}"')
+
+
+_STRING_SPECIAL_CHARS = re.compile(r'["\\]')
 
 
 def parse_string(s: str) -> Result[tuple[str, str]]:
-    assert s[0] == '"'
-    i = 1
-    last_was_backslash = False
-    res = ''
-    while i < len(s):
-        if last_was_backslash:
-            if s[i] in ['"', '\\']:
-                res += s[i]
-            else:  # assume backslash wasn't use for escaping
-                res += '\\' + s[i]
-            last_was_backslash = False
-        elif s[i] == '\\':
-            last_was_backslash = True
-        elif s[i] == '"':  # end of string
-            return Result(True, (res, s[i + 1:]))
-        else:
-            res += s[i]
-        i += 1
-    return Result(False, logs=f'String not closed: "{s}"')
+    r = _parse_string(s, 0)
+    if not r.success:
+        return Result(False, logs=r.logs)
+    assert r.value
+    return Result(True, (r.value[0], s[r.value[1]:]))
+
+
+def _parse_string(s: str, i: int) -> Result[tuple[str, int]]:
+    """ parses the string literal starting at s[i] and returns its value with the index after it """
+    assert s[i] == '"'
+    start = i
+    i += 1
+    parts: list[str] = []
+    while True:
+        match = _STRING_SPECIAL_CHARS.search(s, i)
+        if not match or (s[match.start()] == '\\' and match.start() + 1 == len(s)):
+            return Result(False, logs=f'String not closed: "{s[start:]}"')
+        j = match.start()
+        parts.append(s[i:j])
+        if s[j] == '"':  # end of string
+            return Result(True, (''.join(parts), j + 1))
+        if s[j + 1] in ['"', '\\']:
+            parts.append(s[j + 1])
+        else:  # assume backslash wasn't use for escaping
+            parts.append('\\' + s[j + 1])
+        i = j + 2
+
+
+_SPACE = re.compile(r'\s')
+
+
+def _until_space(s: str, i: int) -> int:
+    match = _SPACE.search(s, i + 1)
+    return match.start() if match else len(s)
 
 
 def parse_until_space(s: str) -> tuple[str, str]:
     assert s
-    result = s[0]
-    i = 1
-    while i < len(s):
-        if s[i].isspace():
-            return result, s[i:]
-        else:
-            result += s[i]
-            i += 1
-    return result, ''
+    end = _until_space(s, 0)
+    return s[:end], s[end:]
+
+
+def _is_identifier_start(c: str, canbenum: bool) -> bool:
+    return c.isidentifier() or (canbenum and c.isalnum()) or c == '?'  # ? for user-defined macros
+
+
+def _identifier_end(s: str, i: int, allow_minus: bool = False) -> int:
+    i += 1
+    while i < len(s) and (s[i].isalnum() or s[i].isidentifier() or (allow_minus and s[i] == '-')):
+        i += 1  # not '7'.isidentifier()
+    return i
 
 
 def parse_identifier(s: str, canbenum: bool = False, allow_minus: bool = False) -> tuple[str, str]:
     assert s
-    assert s[0].isidentifier() or (canbenum and s[0].isalnum()) or s[0] == '?'  # ? for user-defined macros
-    identifier = s[0]
-    i = 1
-    while i < len(s):
-        if s[i].isalnum() or s[i].isidentifier() or (allow_minus and s[i] == '-'):  # not '7'.isidentifier()
-            identifier += s[i]
-            i += 1
-        else:
-            return identifier, s[i:]
-    return identifier, ''
+    assert _is_identifier_start(s[0], canbenum)
+    end = _identifier_end(s, 0, allow_minus)
+    return s[:end], s[end:]
 
 
 class BasicCommand(object):
@@ -161,123 +186,147 @@ def strformat(s: str) -> str:
     return '"' + s.replace('\\', '\\\\').replace('"', '\\"') + '"'
 
 
-def parse_basic_command(string: str, split_mainarg_at_space=False) -> Result[tuple[BasicCommand, str]]:
-    string = string.strip()
-    commandname, rest = parse_command_name(string.strip())
+_MAINARG_SPECIAL_CHARS = re.compile(r'[|"]')
+_MAINARG_SPECIAL_CHARS_OR_SPACE = re.compile(r'[|"\s]')
+
+
+def parse_command_head(string: str) -> Result[tuple[BasicCommand, str]]:
+    """ parses the command name and the arguments (but not the main arguments), returns the unparsed rest """
+    s = string.strip()
+    r = _parse_command_head(s)
+    if not r.success:
+        return Result(False, logs=r.logs)
+    assert r.value
+    command, i = r.value
+    return Result(True, (command, s[i:]))
+
+
+def _parse_command_head(s: str) -> Result[tuple[BasicCommand, int]]:
+    commandname, _ = parse_command_name(s)
     command = BasicCommand(commandname, [], [])
+    i = len(commandname)
 
     # Args
     while True:
-        rest = rest.strip()
-        if not rest:
-            break
-        if rest[0] == '-':
-            r = parse_command_arg(rest)
+        while i < len(s) and s[i].isspace():
+            i += 1
+        if i < len(s) and s[i] == '-':
+            r = _parse_command_arg(s, i)
             if not r.success:
                 return Result(False, logs=r.logs)
             assert r.value
-            arg, rest = r.value
+            arg, i = r.value
             command.args.append(arg)
         else:
-            break
+            return Result(True, (command, i))
 
-    rest = rest.strip()
 
-    if not rest:
+def parse_basic_command(string: str, split_mainarg_at_space=False) -> Result[tuple[BasicCommand, str]]:
+    s = string.strip()
+    head = _parse_command_head(s)
+    if not head.success:
+        return Result(False, logs=head.logs)
+    assert head.value
+    command, i = head.value
+
+    if i == len(s):
         return Result(True, (command, ''))
 
-    if rest[0] == '|':
-        return Result(True, (command, rest[1:]))
+    if s[i] == '|':
+        return Result(True, (command, s[i + 1:]))
 
     # Find next pipe
-    mainarg = ''  # Record main argument
-    i = 0
-    while i < len(rest):
-        if rest[i] == '|':
+    special = _MAINARG_SPECIAL_CHARS_OR_SPACE if split_mainarg_at_space else _MAINARG_SPECIAL_CHARS
+    mainarg: list[str] = []  # Record main argument
+
+    def finish_mainarg():
+        m = ''.join(mainarg).strip()
+        if m:
+            command.mainargs.append(m)
+        mainarg.clear()
+
+    while True:
+        match = special.search(s, i)
+        if not match:
+            mainarg.append(s[i:])
+            finish_mainarg()
+            return Result(True, (command, ''))
+        j = match.start()
+        mainarg.append(s[i:j])
+        if s[j] == '|':
             # Done :)
-            mainarg = mainarg.strip()
-            if mainarg:
-                command.mainargs.append(mainarg)
-            return Result(True, (command, rest[i + 1:]))
-        elif rest[i] == '"':
-            rr = parse_string(rest[i:])
+            finish_mainarg()
+            return Result(True, (command, s[j + 1:]))
+        elif s[j] == '"':
+            rr = _parse_string(s, j)
             if not rr.success:
                 return Result(False, None, logs=rr.logs)
             assert rr.value
-            rest = rr.value[1]
             command.mainargs.append(rr.value[0])
-            i = 0
-        elif split_mainarg_at_space and rest[i].isspace():
-            mainarg = mainarg.strip()
-            if mainarg:
-                command.mainargs.append(mainarg)
-            mainarg = ''
-            i += 1
-        else:
-            i += 1
-            mainarg += rest[i - 1]
-    mainarg = mainarg.strip()
-    if mainarg:
-        command.mainargs.append(mainarg)
-    return Result(True, (command, ''))
+            i = rr.value[1]
+        else:  # space
+            finish_mainarg()
+            i = j + 1
 
 
 # OTHER USEFUL THINGS
 
-def _nextup(s, i, s2):
-    if len(s) - i < len(s2):
-        return 0  # failure
-    if s[i:i + len(s2)] == s2:
-        return i + len(s2)  # > 0 (assuming s2 != '')
-    return 0  # failure
-
-
-def _skipto(s, i, s2):
-    while i < len(s):
-        n = _nextup(s, i, s2)
-        if n:
-            return n
-        i += 1
-    return -1
+# comments (and other things to be skipped) at the beginning of a file and the strings that end them
+_FILE_SKIP_ENDS: dict[str, str] = {
+    '//': '❚',  # mmt comment
+    '--': '\n',  # gf comment
+    '{-': '-}',  # gf block comment
+    '%': '\n',  # elpi comment
+    '/*': '*/',  # elpi block comment
+    'namespace': '❚',
+    '#': '\n',
+}
+
+# keywords that determine the file type (in order of priority)
+_FILE_KEYWORDS: dict[str, str] = {
+    'theory': 'mmt-theory', 'view': 'mmt-view',
+    'abstract': 'gf-abstract', 'concrete': 'gf-concrete', 'resource': 'gf-resource',
+    'interface': 'gf-interface', 'instance': 'gf-instance',
+    'incomplete concrete': 'gf-incomplete concrete',
+    'mmt:': 'mmt', 'elpi:': 'elpi', 'elpi-notc:': 'elpi-notc', 'gf:': 'gf',
+    'MMT:': 'mmt', 'ELPI:': 'elpi', 'ELPI-NOTC:': 'elpi-notc', 'GF:': 'gf',
+    'kind': 'elpi', 'type': 'elpi', 'Lexicon': 'lex',
+}
+
+_FILE_START = re.compile(
+    r'(?P<space>\s+)'
+    r'|(?P<skip>' + '|'.join(re.escape(k) for k in _FILE_SKIP_ENDS) + ')'
+    r'|(?P<keyword>' + '|'.join(re.escape(k) for k in _FILE_KEYWORDS) + ')'
+)
+
+_NON_SPACE = re.compile(r'\S')
 
 
 def identify_file(s: str) -> Result[tuple[str, str, str]]:  # (type, name, content)
     i = 0
-    while True:
-        if i == -1 or i >= len(s):
+    while i < len(s):
+        match = _FILE_START.match(s, i)
+        if not match:
             return Result(False)
-        elif s[i].isspace():
-            i += 1
-        elif _nextup(s, i, '//'):  # mmt comment
-            i = _skipto(s, i, '❚')
-        elif _nextup(s, i, '--'):  # gf comment
-            i = _skipto(s, i, '\n')
-        elif _nextup(s, i, '{-'):  # gf block comment
-            i = _skipto(s, i, '-}')
-        elif _nextup(s, i, '%'):  # elpi comment
-            i = _skipto(s, i, '\n')
-        elif _nextup(s, i, '/*'):  # elpi block comment
-            i = _skipto(s, i, '*/')
-        elif _nextup(s, i, 'namespace'):
-            i = _skipto(s, i, '❚')
-        elif _nextup(s, i, '#'):
-            i = _skipto(s, i, '\n')
+        if match.lastgroup == 'space':
+            i = match.end()
+        elif match.lastgroup == 'skip':
+            terminator = _FILE_SKIP_ENDS[match.group()]
+            i = s.find(terminator, match.start())
+            if i == -1:
+                return Result(False)
+            i += len(terminator)
         else:
-            for (k, t) in [('theory', 'mmt-theory'), ('view', 'mmt-view'),
-                           ('abstract', 'gf-abstract'), ('concrete', 'gf-concrete'), ('resource', 'gf-resource'),
-                           ('interface', 'gf-interface'), ('instance', 'gf-instance'),
-                           ('incomplete concrete', 'gf-incomplete concrete'),
-                           ('mmt:', 'mmt'), ('elpi:', 'elpi'), ('elpi-notc:', 'elpi-notc'), ('gf:', 'gf'),
-                           ('MMT:', 'mmt'), ('ELPI:', 'elpi'), ('ELPI-NOTC:', 'elpi-notc'), ('GF:', 'gf'),
-                           ('kind', 'elpi'), ('type', 'elpi'), ('Lexicon', 'lex')]:
-                n = _nextup(s, i, k)
-                if n:
-                    s2 = s[n:].strip()
-                    if not s2[0].isidentifier():
-                        return Result(False, None, f'Expected identifier after "{k}"')
-                    pi = parse_identifier(s2)
-                    return Result(True, (t, pi[0], pi[1] if k.endswith(':') else s))
-            return Result(False)
+            k = match.group()
+            nonspace = _NON_SPACE.search(s, match.end())
+            if not nonspace or not s[nonspace.start()].isidentifier():
+                return Result(False, None, f'Expected identifier after "{k}"')
+            start = nonspace.start()
+            end = _identifier_end(s, start)
+            # the content of e.g. "elpi: name" starts after the name
+            content = s[end:].rstrip() if k.endswith(':') else s
+            return Result(True, (_FILE_KEYWORDS[k], s[start:end], content))
+    return Result(False)
 
 
 def indent(s: str, level: int = 4) -> str:
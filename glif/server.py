@@ -0,0 +1,259 @@
+"""
+    A JSON-RPC 2.0 server (`glif serve`) that offers GLIF to other programs over a local HTTP or Unix socket.
+
+    Clients open sessions, which are `Glif` objects with their own archive, working directory,
+    default view/ELPI file and GF shell. Sessions that are opened without an archive work in their own
+    directory (`sessions/<id>` in the default archive), which is removed when the session is closed.
+    All sessions share the backends (MMT and a pool of pre-started GF shells),
+    so requests don't have to wait for the backends to start up.
+    Requests for different sessions are handled concurrently, requests for the same session one after the other.
+
+    Methods:
+        open_session(archive?, subdir?, create?) -> {"session": id}
+        close_session(session)
+        sessions() -> list of session ids
+        execute_command(session, command) -> result
+        execute_cell(session, code) -> list of results
+    where a result is {"success": ..., "logs": ..., "items": [...], "errors": [...]}.
+"""
+
+import contextlib
+import json
+import shutil
+import socketserver
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, Optional
+
+from . import metrics
+from .commands.items import Items
+from .glif_abc import GlifABC
+from .utils import Result
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+UNKNOWN_SESSION = -32000
+
+SESSIONS_ARCHIVE = 'tmpGLIF/default'  # the default archive of `Glif`
+
+
+class RPCException(Exception):
+    def __init__(self, code: int, message: str):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+
+
+def result_as_dict(r: Result[Items]) -> dict[str, Any]:
+    return {
+        'success': r.success,
+        'logs': r.logs,
+        'items': [item.as_dict() for item in r.value.items] if r.value else [],
+        'errors': r.value.errors if r.value else [],
+    }
+
+
+class Session(object):
+    def __init__(self, glif: GlifABC):
+        self.glif = glif
+        self.lock = threading.Lock()  # a session handles one request at a time
+        self.workdir: Optional[str] = None  # created for the session, removed when it is closed
+        self.closed = False
+
+
+class SessionManager(object):
+    def __init__(self, make_session: Callable[[], GlifABC]):
+        self.make_session = make_session
+        self._sessions: dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def open(self) -> tuple[str, Session]:
+        session = Session(self.make_session())
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = session
+        return session_id, session
+
+    def get(self, session_id: Any) -> Session:
+        with self._lock:
+            session = self._sessions.get(session_id) if isinstance(session_id, str) else None
+        if session is None:
+            raise RPCException(UNKNOWN_SESSION, f'Unknown session: {session_id}')
+        return session
+
+    def close(self, session_id: Any):
+        session = self.get(session_id)
+        # waits for a running request of the session
+        with session.lock:
+            with self._lock:
+                if self._sessions.pop(session_id, None) is None:
+                    return  # closed concurrently
+            session.closed = True
+            session.glif.do_shutdown()
+            if session.workdir:
+                shutil.rmtree(session.workdir, ignore_errors=True)
+
+    @contextlib.contextmanager
+    def use(self, session_id: Any) -> Iterator[Session]:
+        """ locks the session for a request """
+        session = self.get(session_id)
+        with session.lock:
+            if session.closed:  # closed while the request was waiting for the lock
+                raise RPCException(UNKNOWN_SESSION, f'Unknown session: {session_id}')
+            yield session
+
+    def ids(self) -> list[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def close_all(self):
+        for session_id in self.ids():
+            self.close(session_id)
+
+
+def _string_param(params: dict, name: str, optional: bool = False) -> Optional[str]:
+    value = params.get(name)
+    if value is None and optional:
+        return None
+    if not isinstance(value, str):
+        raise RPCException(INVALID_PARAMS, f'Expected a string for parameter "{name}"')
+    return value
+
+
+class GlifRPC(object):
+    """ Dispatches JSON-RPC requests to the sessions """
+
+    def __init__(self, sessions: SessionManager):
+        self.sessions = sessions
+        self.methods: dict[str, Callable[[dict], Any]] = {
+            'open_session': self.open_session,
+            'close_session': self.close_session,
+            'sessions': lambda params: self.sessions.ids(),
+            'execute_command': self.execute_command,
+            'execute_cell': self.execute_cell,
+        }
+
+    def open_session(self, params: dict) -> Any:
+        archive = _string_param(params, 'archive', optional=True)
+        subdir = _string_param(params, 'subdir', optional=True)
+        session_id, session = self.sessions.open()
+        if archive:
+            r = session.glif.set_archive(archive, subdir, bool(params.get('create')))
+            if not r.success:
+                self.sessions.close(session_id)
+                raise RPCException(INVALID_PARAMS, r.logs)
+        elif session.glif.set_archive(SESSIONS_ARCHIVE, f'sessions/{session_id}', create=True).success:
+            # otherwise, sessions would overwrite each other's files in the default archive
+            # (this fails if there is no MathHub directory, then the session works in the current directory)
+            session.workdir = session.glif.get_cwd()
+        return {'session': session_id}
+
+    def close_session(self, params: dict) -> Any:
+        self.sessions.close(params.get('session'))
+        return None
+
+    def execute_command(self, params: dict) -> Any:
+        command = _string_param(params, 'command')
+        assert command is not None
+        with self.sessions.use(params.get('session')) as session:
+            return result_as_dict(session.glif.execute_command(command))
+
+    def execute_cell(self, params: dict) -> Any:
+        code = _string_param(params, 'code')
+        assert code is not None
+        with self.sessions.use(params.get('session')) as session:
+            return [result_as_dict(r) for r in session.glif.execute_cell(code)]
+
+    def handle(self, request: Any) -> Optional[dict]:
+        """ handles a single request (returns None for notifications) """
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RPCException(INVALID_REQUEST, 'Invalid request')
+            method = self.methods.get(request['method'])
+            metrics.RPC_REQUESTS.inc(method=request['method'] if method else 'unknown')
+            if method is None:
+                raise RPCException(METHOD_NOT_FOUND, f'Unknown method: {request["method"]}')
+            params = request.get('params', {})
+            if not isinstance(params, dict):
+                raise RPCException(INVALID_PARAMS, 'Parameters have to be passed by name')
+            response: dict[str, Any] = {'jsonrpc': '2.0', 'result': method(params), 'id': request_id}
+        except RPCException as ex:
+            response = {'jsonrpc': '2.0', 'error': {'code': ex.code, 'message': ex.message}, 'id': request_id}
+        except Exception as ex:  # the client should get a response in any case
+            response = {'jsonrpc': '2.0', 'error': {'code': INTERNAL_ERROR,
+                                                    'message': f'Internal error: {type(ex).__name__}: {ex}'},
+                        'id': request_id}
+        if isinstance(request, dict) and 'id' not in request:
+            return None  # notification
+        return response
+
+    def handle_json(self, data: bytes) -> Optional[str]:
+        try:
+            request = json.loads(data)
+        except ValueError:
+            return json.dumps({'jsonrpc': '2.0', 'error': {'code': PARSE_ERROR, 'message': 'Parse error'},
+                               'id': None})
+        if isinstance(request, list):  # batch
+            if not request:
+                return json.dumps(self.handle(None))
+            responses = [r for r in map(self.handle, request) if r is not None]
+            return json.dumps(responses) if responses else None
+        response = self.handle(request)
+        return json.dumps(response) if response is not None else None
+
+
+class RPCRequestHandler(BaseHTTPRequestHandler):
+    server: Any  # has an `rpc` attribute
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        response = self.server.rpc.handle_json(self.rfile.read(length))
+        if response is None:
+            self.send_response(204)
+            self.end_headers()
+            return
+        body = response.encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # the client address is not a (host, port) pair for Unix sockets
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix-socket'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class RPCHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], rpc: GlifRPC, verbose: bool = False):
+        ThreadingHTTPServer.__init__(self, address, RPCRequestHandler)
+        self.rpc = rpc
+        self.verbose = verbose
+
+
+class RPCUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, rpc: GlifRPC, verbose: bool = False):
+        socketserver.UnixStreamServer.__init__(self, path, RPCRequestHandler)
+        self.rpc = rpc
+        self.verbose = verbose
+
+
+def make_server(rpc: GlifRPC, host: str = '127.0.0.1', port: int = 0, unix_socket: Optional[str] = None,
+                verbose: bool = False) -> socketserver.BaseServer:
+    if unix_socket:
+        return RPCUnixServer(unix_socket, rpc, verbose)
+    return RPCHTTPServer((host, port), rpc, verbose)
@@ -0,0 +1,169 @@
+"""
+    A persistent store (an SQLite database) for the results of `parse`, `linearize` and `construct`.
+    When the same corpus is run through the same grammars again (even in a new process),
+    known inputs are answered from the store without any backend calls.
+
+    Results are stored together with a fingerprint of the backend state they depend on:
+    for GF commands, the grammars that have been imported into the GF shell (incl. the content of the
+    grammar files at the time of the import), for `construct` the files that have been built by MMT.
+    Files outside of the working directory (e.g. the RGL or other archives) are not part of the fingerprints.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional, TextIO
+
+from . import metrics, tracing
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    kind TEXT NOT NULL,         -- the command, e.g. "parse" or "construct"
+    fingerprint TEXT NOT NULL,  -- the state of the backend
+    options TEXT NOT NULL,      -- e.g. "parse -cat=S" or the semantics construction view
+    input TEXT NOT NULL,        -- e.g. a sentence or an AST
+    output TEXT NOT NULL,       -- JSON
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (kind, fingerprint, options, input)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+'''
+
+_WORD = re.compile(r'\w+')
+_MAX_VARIABLES = 500  # per statement (SQLite has a limit on the number of parameters)
+
+
+def files_fingerprint(directory: str, filename: str, extensions: tuple[str, ...]) -> str:
+    """ a hash of the file and the files in `directory` it refers to (transitively).
+        A file refers to the files with the given extensions whose name (without extension) occurs as a word in it,
+        e.g. "concrete GrammarEng of Grammar = ..." refers to "Grammar.gf" (if it exists).
+    """
+    try:
+        candidates = {os.path.splitext(name)[0]: name for name in os.listdir(directory) if name.endswith(extensions)}
+    except OSError:
+        candidates = {}
+    h = hashlib.sha256()
+    todo = [filename]
+    visited: set[str] = set()
+    while todo:
+        name = todo.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        try:
+            with open(os.path.join(directory, name), 'rb') as fp:
+                content = fp.read()
+        except OSError:
+            h.update(f'missing:{name}\n'.encode())
+            continue
+        h.update(f'{name}:{hashlib.sha256(content).hexdigest()}\n'.encode())
+        for word in set(_WORD.findall(content.decode('utf8', errors='replace'))):
+            if word in candidates:
+                todo.append(candidates[word])
+    return h.hexdigest()
+
+
+def chain_fingerprint(previous: Optional[str], *parts: str) -> str:
+    """ the fingerprint of a state that results from the previous one (e.g. by importing another file) """
+    h = hashlib.sha256((previous or '').encode())
+    for part in parts:
+        h.update(b'\0' + part.encode())
+    return h.hexdigest()
+
+
+class ResultStore(object):
+    """ Can be used by multiple threads and processes at the same time """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(_SCHEMA)
+
+    def get_many(self, kind: str, fingerprint: str, options: str, inputs: Iterable[str]) -> dict[str, Any]:
+        """ the known outputs for the inputs (input -> output) """
+        inputs = list(set(inputs))
+        found: dict[str, Any] = {}
+        with tracing.span('lookup', 'store', kind=kind, inputs=len(inputs)) as span, self._lock:
+            for i in range(0, len(inputs), _MAX_VARIABLES):
+                chunk = inputs[i:i + _MAX_VARIABLES]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._connection.execute(
+                    f'SELECT input, output FROM results WHERE kind = ? AND fingerprint = ? AND options = ? '
+                    f'AND input IN ({placeholders})', [kind, fingerprint, options] + chunk).fetchall()
+                found.update((input_, json.loads(output)) for input_, output in rows)
+            if found:
+                self._touch(kind, fingerprint, options, list(found))
+            span.set(found=len(found))
+        metrics.CACHE_REQUESTS.inc(len(found), cache='store', result='hit')
+        metrics.CACHE_REQUESTS.inc(len(inputs) - len(found), cache='store', result='miss')
+        return found
+
+    def get(self, kind: str, fingerprint: str, options: str, input_: str) -> Optional[Any]:
+        return self.get_many(kind, fingerprint, options, [input_]).get(input_)
+
+    def _touch(self, kind: str, fingerprint: str, options: str, inputs: list[str]):
+        now = time.time()
+        for i in range(0, len(inputs), _MAX_VARIABLES):
+            chunk = inputs[i:i + _MAX_VARIABLES]
+            self._connection.execute(
+                f'UPDATE results SET last_used = ? WHERE kind = ? AND fingerprint = ? AND options = ? '
+                f'AND input IN ({",".join("?" * len(chunk))})', [now, kind, fingerprint, options] + chunk)
+
+    def put_many(self, kind: str, fingerprint: str, options: str, outputs: dict[str, Any]):
+        if not outputs:
+            return
+        now = time.time()
+        with tracing.span('insert', 'store', kind=kind, inputs=len(outputs)), self._lock:
+            with self._connection:  # a single transaction
+                self._connection.execute('BEGIN')
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(kind, fingerprint, options, input_, json.dumps(output, ensure_ascii=False), now, now)
+                     for input_, output in outputs.items()])
+
+    def put(self, kind: str, fingerprint: str, options: str, input_: str, output: Any):
+        self.put_many(kind, fingerprint, options, {input_: output})
+
+    def stats(self) -> list[tuple[str, int, int]]:
+        """ (kind, number of results, number of fingerprints) for every kind """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT kind, COUNT(*), COUNT(DISTINCT fingerprint) FROM results GROUP BY kind ORDER BY kind'
+            ).fetchall()
+
+    def prune(self, unused_for: float = 0.0, kind: Optional[str] = None) -> int:
+        """ removes the results that haven't been used for `unused_for` seconds, returns their number """
+        query = 'DELETE FROM results WHERE last_used <= ?'
+        params: list[Any] = [time.time() - unused_for]
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        with self._lock:
+            count = self._connection.execute(query, params).rowcount
+            self._connection.execute('VACUUM')
+        return count
+
+    def export(self, fp: TextIO) -> int:
+        """ writes all results as JSON lines, returns their number """
+        count = 0
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT kind, fingerprint, options, input, output FROM results ORDER BY kind, fingerprint, options'
+            ).fetchall()
+        for kind, fingerprint, options, input_, output in rows:
+            fp.write(json.dumps({'kind': kind, 'fingerprint': fingerprint, 'options': options, 'input': input_,
+                                 'output': json.loads(output)}, ensure_ascii=False) + '\n')
+            count += 1
+        return count
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
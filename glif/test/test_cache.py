@@ -0,0 +1,138 @@
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+from .. import cache, elpi, metrics
+from ..backends import Backends
+from ..cache import DiskCache
+from ..glif import Glif
+
+
+# A stand-in for graphviz that "renders" a graph by wrapping it in an svg element
+FAKE_DOT = f'''#!{sys.executable}
+import sys
+dot = sys.stdin.read()
+if not dot.startswith('digraph'):
+    sys.stderr.write('Error: syntax error in line 1')
+    sys.exit(1)
+sys.stdout.write('<svg>' + dot + '</svg>')
+'''
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(os.path.join(self.tmpdir.name, 'cache'), max_size=1000)
+        cache.set_cache(self.cache)
+
+    def tearDown(self):
+        cache.set_cache(None)
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        key = cache.key('digraph { a -> b }')
+        self.assertIsNone(self.cache.get('svg', key))
+        self.cache.put('svg', key, b'<svg/>')
+        self.assertEqual(self.cache.get('svg', key), b'<svg/>')
+        self.assertIsNone(self.cache.get('elpigen', key))  # other namespace
+        self.assertNotEqual(cache.key('ab', 'c'), cache.key('a', 'bc'))
+        self.assertEqual(cache.get_or_compute('svg', key, lambda: b'other'), b'<svg/>')
+        self.assertEqual(cache.get_or_compute('svg', cache.key('x'), lambda: None), None)  # failures aren't cached
+        self.assertEqual(self.cache.stats(), {'svg': (1, 6)})
+
+    def test_eviction(self):
+        self.cache.max_size = 10000
+        keys = [cache.key(str(i)) for i in range(5)]
+        for i, key in enumerate(keys):
+            self.cache.put('svg', key, b'x' * 300)
+            os.utime(self.cache._path('svg', key), (time.time() - 100 + i, time.time() - 100 + i))
+        self.cache.get('svg', keys[0])  # recently used, so it is kept
+        self.cache.max_size = 1000
+        self.assertEqual(self.cache.evict(), 2)  # down to 90% of the limit
+        self.assertEqual(self.cache.stats(), {'svg': (3, 900)})
+        self.assertIsNotNone(self.cache.get('svg', keys[0]))
+        self.assertIsNone(self.cache.get('svg', keys[1]))
+
+    def test_purge(self):
+        self.cache.put('svg', cache.key('a'), b'a')
+        self.cache.put('elpigen', cache.key('b'), b'b')
+        self.assertEqual(self.cache.purge('svg'), 1)
+        self.assertEqual(list(self.cache.stats()), ['elpigen'])
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(self.cache.stats(), {})
+
+    def test_purge_outside(self):
+        outside = os.path.join(self.tmpdir.name, 'precious.txt')
+        with open(outside, 'w') as fp:
+            fp.write('data')
+        self.cache.put('svg', cache.key('a'), b'a')
+        for namespace in ['..', '../cache', '/', self.tmpdir.name, 'svg/..']:
+            with self.assertRaises(ValueError):
+                self.cache.purge(namespace)
+        self.assertEqual(self.cache.purge('unknown'), 0)
+        self.assertTrue(os.path.isfile(outside))
+        glif = Glif(Backends())
+        r = glif.execute_command('cache -purge ..')
+        self.assertFalse(r.success)
+        glif.do_shutdown()
+        self.assertTrue(os.path.isfile(outside))
+        self.assertEqual(self.cache.stats(), {'svg': (1, 1)})
+
+    def test_typecheck_cache(self):
+        typecheck_cache = elpi.TypecheckCache()
+        typecheck_cache.mark_checked('fingerprint')
+        self.assertTrue(elpi.TypecheckCache().is_checked('fingerprint'))  # e.g. in another process
+        typecheck_cache.clear()  # only the in-memory state
+        self.assertEqual(typecheck_cache._checked, set())
+        self.assertTrue(elpi.TypecheckCache().is_checked('fingerprint'))
+        self.assertEqual(self.cache.purge('elpi-typecheck'), 1)
+        self.assertFalse(elpi.TypecheckCache().is_checked('fingerprint'))
+
+    def test_command(self):
+        self.cache.put('svg', cache.key('a'), b'a')
+        glif = Glif(Backends())
+        r = glif.execute_command('cache')
+        self.assertTrue(r.success, r.logs)
+        assert r.value
+        self.assertIn('svg: 1 entries', str(r.value.items[0]))
+        r = glif.execute_command('cache -purge svg')
+        self.assertTrue(r.success, r.logs)
+        self.assertEqual(self.cache.stats(), {})
+        glif.do_shutdown()
+
+    def test_svg(self):
+        dot_path = os.path.join(self.tmpdir.name, 'dot')
+        with open(dot_path, 'w') as fp:
+            fp.write(FAKE_DOT)
+        os.chmod(dot_path, os.stat(dot_path).st_mode | stat.S_IEXEC)
+        path = os.environ['PATH']
+        os.environ['PATH'] = self.tmpdir.name + os.pathsep + path
+        try:
+            glif = Glif(Backends())
+            spawns = metrics.SUBPROCESS_SPAWNS.get(program='dot')
+            r = glif.execute_command('svg "digraph { a }" "digraph { b }" "digraph { a }"')
+            self.assertTrue(r.success, r.logs)
+            assert r.value
+            self.assertEqual([item.html() for item in r.value.items],
+                             ['<svg>digraph { a }</svg>', '<svg>digraph { b }</svg>', '<svg>digraph { a }</svg>'])
+            self.assertEqual(str(r.value.items[0]), 'digraph { a }')
+            self.assertEqual(metrics.SUBPROCESS_SPAWNS.get(program='dot') - spawns, 2)  # identical graphs
+            self.assertTrue(glif.execute_command('svg "digraph { b }"').success)
+            self.assertEqual(metrics.SUBPROCESS_SPAWNS.get(program='dot') - spawns, 2)  # cached
+
+            r = glif.execute_command('svg "digraph { a }" "not a graph"')
+            self.assertFalse(r.success)
+            assert r.value
+            self.assertEqual([item.html() for item in r.value.items], ['<svg>digraph { a }</svg>'])
+            self.assertIn('syntax error in line 1', r.value.errors[0])
+            self.assertEqual(self.cache.stats(), {'svg': (2, 48)})  # failures aren't cached
+            glif.do_shutdown()
+        finally:
+            os.environ['PATH'] = path
+
+
+if __name__ == '__main__':
+    unittest.main()
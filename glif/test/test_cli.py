@@ -0,0 +1,101 @@
+import io
+import json
+import unittest
+
+from .. import cli
+from ..commands.gf_commands import GF_COMMAND_TYPES
+from ..commands.glif_command import GlifCommandType
+from ..commands.items import Repr
+from ..utils import Result
+
+IDENTITY_COMMAND_TYPE = GlifCommandType(['identity'], [], apply_fn=lambda glif, keyval, keys, mainargs, items: items,
+                                        required_reprs={Repr.AST})
+
+
+class FakeGFShell(object):
+    def handle_command(self, command: str) -> str:
+        if 'fail' in command:
+            return 'The parser failed at token 1: "fail"'
+        return '(f x)'
+
+
+class FakeGlif(object):
+    def __init__(self):
+        self.gfshell = FakeGFShell()
+        self.cells: list[str] = []
+
+    def get_commands(self):
+        return {name: ct for ct in GF_COMMAND_TYPES + [IDENTITY_COMMAND_TYPE] for name in ct.names}
+
+    def get_gf_shell(self):
+        return Result(True, self.gfshell)
+
+    def get_store(self):
+        return None
+
+    def execute_cell(self, code: str):
+        self.cells.append(code)
+        return [Result(code != 'fail')]
+
+    def do_shutdown(self):
+        pass
+
+
+class TestCli(unittest.TestCase):
+    def run_batch(self, lines: list[str], workers: int = 1, pipeline_command: str = 'parse -cat=S',
+                  **kwargs) -> tuple[Result[int], list[dict]]:
+        out = io.StringIO()
+        r = cli.run_batch(lines, out, pipeline_command, input_repr='sentence', chunk_size=2, workers=workers,
+                          make_glif=FakeGlif, **kwargs)  # type: ignore
+        return r, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_run_batch(self):
+        for workers in [1, 2]:
+            r, results = self.run_batch(['a b', '', 'c d', 'e f\n'], workers)
+            self.assertTrue(r.success)
+            self.assertEqual(r.value, 3)
+            self.assertEqual([d['id'] for d in results], [0, 1, 2])
+            self.assertEqual(results[1]['reprs']['original-sentence'], 'c d')
+            self.assertEqual(results[1]['reprs']['ast'], '(f x)')
+            self.assertEqual(results[1]['reprs']['sentence'], 'c d')  # intermediate representations are kept
+
+        for prune in [False, True]:
+            r, results = self.run_batch(['a b'], pipeline_command='parse -cat=S | identity', prune=prune)
+            self.assertTrue(r.success)
+            self.assertEqual('sentence' in results[0]['reprs'], not prune)
+
+    def test_errors(self):
+        r, results = self.run_batch(['a b', 'fail', 'c d'])
+        self.assertFalse(r.success)
+        self.assertEqual(r.value, 3)
+        self.assertEqual([d['id'] for d in results], [0, 1, 2])
+        self.assertEqual(results[1]['reprs'], {'default': 'fail', 'sentence': 'fail', 'original-sentence': 'fail'})
+        self.assertIn('The parser failed', results[1]['errors'][0])
+        # the other items (of the same chunk and of the next chunk) are processed nonetheless
+        self.assertEqual(results[0]['reprs']['ast'], '(f x)')
+        self.assertNotIn('errors', results[0])
+        self.assertEqual(results[2]['reprs']['ast'], '(f x)')
+
+        # later commands are applied to the other items of the chunk
+        r, results = self.run_batch(['a b', 'fail'], pipeline_command='parse -cat=S | identity')
+        self.assertFalse(r.success)
+        self.assertEqual(results[0]['reprs']['ast'], '(f x)')
+        self.assertIn('errors', results[1])
+
+        for workers in [1, 2]:
+            r, _ = self.run_batch(['a b'], workers, commands=['fail'])
+            self.assertFalse(r.success)
+            self.assertIn('Setup failed', r.logs)
+
+    def test_read_chunks(self):
+        self.assertEqual(list(cli.read_chunks(['a', ' ', 'b ', 'c'], 2)), [(0, ['a', 'b']), (2, ['c'])])
+
+    def test_argument_parser(self):
+        args = cli.make_argument_parser().parse_args(['run', '-j', '4', '-s', 'import a.gf', 'parse | l'])
+        self.assertEqual(args.workers, 4)
+        self.assertEqual(args.setup, ['import a.gf'])
+        self.assertEqual(args.pipeline, 'parse | l')
+
+
+if __name__ == '__main__':
+    unittest.main()
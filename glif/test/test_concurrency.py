@@ -0,0 +1,141 @@
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from .. import elpi, gf
+from ..backends import Backends, GFShellPool
+from ..glif import Glif
+
+# A minimal stand-in for the GF shell: `ps "..."` prints its argument, other commands are echoed
+FAKE_GF = f'''#!{sys.executable}
+import sys
+for line in sys.stdin:
+    line = line.strip()
+    if line == 'q':
+        break
+    if line.startswith('ps "'):
+        print(line[4:-1])
+    else:
+        print('echo:', line)
+    sys.stdout.flush()
+'''
+
+
+def run_threads(target, n: int = 8):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestConcurrency(unittest.TestCase):
+    tmpdir: tempfile.TemporaryDirectory
+    gf_path: str
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.gf_path = os.path.join(cls.tmpdir.name, 'gf')
+        with open(cls.gf_path, 'w') as fp:
+            fp.write(FAKE_GF)
+        os.chmod(cls.gf_path, os.stat(cls.gf_path).st_mode | stat.S_IEXEC)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_gf_shell(self):
+        shell = gf.GFShellRaw(self.gf_path)
+        errors: list[str] = []
+
+        def worker(i: int):
+            for j in range(50):
+                output = shell.handle_command(f'l {i} {j}')
+                if output != f'echo: l {i} {j}':
+                    errors.append(output)
+
+        run_threads(worker)
+        shell.do_shutdown()
+        self.assertEqual(errors, [])
+
+    def test_shared_glif(self):
+        backends = Backends()
+        backends.gf_pool = GFShellPool(gf_path=self.gf_path)
+        glif = Glif(backends)
+        shells = set()
+
+        def worker(i: int):
+            r = glif.get_gf_shell()
+            assert r.value
+            shells.add(r.value)
+            for j in range(20):
+                self.assertEqual(r.value.handle_command(f'p "{i} {j}"'), f'echo: p "{i} {j}"')
+
+        run_threads(worker)
+        self.assertEqual(len(shells), 1)  # the shell is only started once
+
+        session = glif.new_session()
+        self.assertIs(session.backends, glif.backends)
+        self.assertIsNot(session.get_gf_shell().value, glif.get_gf_shell().value)
+        session.do_shutdown()
+        glif.do_shutdown()
+
+    def test_gf_pool(self):
+        # pre-started shells are handed out to sessions with different working directories
+        backends = Backends()
+        backends.gf_pool = pool = GFShellPool(prestart=1, gf_path=self.gf_path)
+        pool.warm_up()
+        sessions = [Glif(backends), Glif(backends)]
+        for i, session in enumerate(sessions):
+            session._cwd = os.path.join(self.tmpdir.name, f'session{i}')
+            self.assertTrue(wait_for(lambda: pool.idle_count() == 1))
+            idle = pool._idle[0]
+            self.assertIs(session.get_gf_shell().value, idle)
+        self.assertTrue(wait_for(lambda: pool.idle_count() == 1))
+        self.assertEqual(pool._starting, 0)  # no shells are started for the working directories of the sessions
+        for session in sessions:
+            session.do_shutdown()
+        pool.do_shutdown()
+        self.assertEqual(pool.idle_count(), 0)
+
+    def test_thread_local_state(self):
+        glif = Glif()
+        glif._typecheckelpi = True
+        flags = []
+        thread = threading.Thread(target=lambda: flags.append(glif._typecheckelpi))
+        thread.start()
+        thread.join()
+        self.assertEqual(flags, [False])
+        self.assertTrue(glif._typecheckelpi)
+        glif.do_shutdown()
+
+    def test_typecheck_cache(self):
+        cache = elpi.TypecheckCache()
+        path = os.path.join(self.tmpdir.name, 'test.elpi')
+        with open(path, 'w') as fp:
+            fp.write('type t prop.')
+
+        def worker(i: int):
+            for _ in range(50):
+                cache.mark_checked(cache.fingerprint(self.tmpdir.name, 'test.elpi'))
+
+        run_threads(worker)
+        self.assertTrue(cache.is_checked(cache.fingerprint(self.tmpdir.name, 'test.elpi')))
+
+
+if __name__ == '__main__':
+    unittest.main()
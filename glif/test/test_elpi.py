@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from .. import elpi
+from ..glif import Glif
+from ..utils import Result
+
+
+class TestTypecheckCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        self.cache = elpi.TypecheckCache()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.dir, name), 'w') as fp:
+            fp.write(content)
+
+    def test_fingerprint_changes(self):
+        self.write('sig.elpi', 'kind ind type.')
+        self.write('main.elpi', 'accumulate glif. accumulate sig.\ntype h prop.')
+        fp = self.cache.fingerprint(self.dir, 'main.elpi')
+        self.assertIsNotNone(fp)
+        self.assertEqual(fp, self.cache.fingerprint(self.dir, 'main.elpi'))
+
+        self.cache.mark_checked(fp)
+        self.assertTrue(self.cache.is_checked(fp))
+
+        # changing an accumulated file invalidates the check
+        self.write('sig.elpi', 'kind ind type.\ntype a ind.')
+        fp2 = self.cache.fingerprint(self.dir, 'main.elpi')
+        self.assertNotEqual(fp, fp2)
+        self.assertFalse(self.cache.is_checked(fp2))
+
+    def test_multiple_and_cyclic_accumulates(self):
+        self.write('a.elpi', 'accumulate b, "c".')
+        self.write('b.elpi', 'accumulate a.')
+        self.write('c.elpi', 'type c prop.')
+        fp = self.cache.fingerprint(self.dir, 'a.elpi')
+        self.write('c.elpi', 'type c, d prop.')
+        self.assertNotEqual(fp, self.cache.fingerprint(self.dir, 'a.elpi'))
+
+    def test_missing_file(self):
+        fp = self.cache.fingerprint(self.dir, 'nonexistent.elpi')
+        self.assertIsNone(fp)
+        self.cache.mark_checked(fp)
+        self.assertFalse(self.cache.is_checked(fp))
+
+
+class FakeMMT(object):
+    def elpigen(self, mode, archive, subdir, theory, cache_key=None):
+        if theory.startswith('Broken'):
+            return Result(False, logs='no such theory')
+        return Result(True, f'% signature of {theory}')
+
+
+class TestElpiSignatures(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.glif = Glif()
+        self.glif.get_mmt = lambda: Result(True, FakeMMT())  # type: ignore
+
+    def tearDown(self):
+        self.glif.do_shutdown()
+        self.tmpdir.cleanup()
+
+    def test_failed_export(self):
+        for name in ['Broken', 'Grammar']:
+            path = os.path.join(self.tmpdir.name, f'{name}.elpi')
+            self.glif._staleelpisigs[path] = ('archive', None, f'{name}.gf/{name}', 'fingerprint')
+        r = self.glif.update_elpi_signatures()
+        self.assertTrue(r.success)  # ELPI can be used with the other signatures
+        self.assertIn('ELPI export of Broken.gf/Broken (Broken.elpi) failed', r.logs)
+        self.assertNotIn('Grammar', r.logs)
+        self.assertTrue(os.path.isfile(os.path.join(self.tmpdir.name, 'Grammar.elpi')))
+
+        # the error is only reported once, the "status" command lists it
+        self.assertEqual(self.glif.update_elpi_signatures().logs, '')
+        self.assertIn('no such theory', str(self.glif.execute_command('status').value))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from ..commands.items import Item, Items, Repr
+
+
+class TestItem(unittest.TestCase):
+    def test_clone_copy_on_write(self):
+        item = Item(0).with_repr(Repr.SENTENCE, 'hello')
+        clone = item.get_clone().with_repr(Repr.AST, 'greet')
+        self.assertEqual(str(item), 'hello')
+        self.assertEqual(str(clone), 'greet')
+        self.assertFalse(item.has_repr(Repr.AST))
+        self.assertEqual(clone.get(Repr.SENTENCE), 'hello')
+        self.assertEqual(list(clone.lineage()), [clone, item])
+
+        clone.errors.append('error')
+        self.assertEqual(item.errors, [])
+        clone2 = clone.get_clone()
+        clone2.errors.append('another error')
+        self.assertEqual(clone.errors, ['error'])
+
+        del item
+        self.assertEqual(list(clone.lineage()), [clone])  # clones don't keep their parents alive
+
+    def test_html_repr(self):
+        item = Item(0).with_repr(Repr.GRAPH_DOT, 'digraph {}', html_version='<svg/>')
+        self.assertEqual(item.html(), '<svg/>')
+        item.with_repr(Repr.SENTENCE, 'a < b')
+        self.assertFalse(item.has_repr(Repr.HTML))
+        self.assertIn('a &lt; b', item.html())
+
+    def test_content(self):
+        items = Items.from_vals(Repr.SENTENCE, ['hello'])
+        content = items.items[0].content
+        self.assertEqual(content[Repr.SENTENCE_ORIG], 'hello')
+        self.assertEqual(set(content), {Repr.DEFAULT, Repr.SENTENCE, Repr.SENTENCE_ORIG})
+        with self.assertRaises(TypeError):
+            content[Repr.AST] = 'greet'  # type: ignore
+
+        r = items.items[0].try_get_repr(Repr.AST)
+        self.assertFalse(r.success)
+        self.assertEqual(r.value, 'hello')
+
+    def test_html_pages(self):
+        items = Items.from_vals(Repr.SENTENCE, [f'sentence {i}' for i in range(25)]).with_errors(['error'])
+        items.items[3].errors.append('item error')
+        self.assertEqual(''.join(items.iter_html(10)), items.html())
+        self.assertEqual(len(list(items.iter_html(10))), 4)  # 3 pages and the errors
+        self.assertIn('25 items (1 with errors), 1 error', items.html_summary())
+
+        page = items.html_page(2, 10)
+        self.assertIn('Items 21-25 of 25', page)
+        self.assertIn('sentence 24', page)
+        self.assertNotIn('sentence 19', page)
+        self.assertIn('No items on page 4', items.html_page(3, 10))
+        self.assertNotIn('glif-page', Items.from_vals(Repr.SENTENCE, ['a']).html_page(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
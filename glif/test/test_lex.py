@@ -0,0 +1,106 @@
+import concurrent.futures
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from .. import lex
+from ..lex import LexiconError, LexiconParser
+
+LEXICON = '''Lexicon Test
+# types
+PN : ι : -l Ger PN -constr Ger mkPNGer
+N : ι ⟶ o : -constr Eng mkNoun
+def
+john : PN -l Ger Johann -l Fre Jean
+john : PN -l Spa Juan
+dog : N -l Ger Hund
+cat : N -drop "cat" -l Ger Katze
+'''
+
+
+class FlakyExecutor(concurrent.futures.ThreadPoolExecutor):
+    """ runs the tasks in threads, but the worker for Ger "dies" """
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        concurrent.futures.ThreadPoolExecutor.__init__(self, max_workers, initializer=initializer, initargs=initargs)
+
+    def submit(self, fn, /, *args, **kwargs):
+        if args == ('Ger',):
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            future.set_exception(concurrent.futures.process.BrokenProcessPool('worker died'))
+            return future
+        return concurrent.futures.ThreadPoolExecutor.submit(self, fn, *args, **kwargs)
+
+
+class TestLexiconParser(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def parser(self, code: str) -> LexiconParser:
+        path = os.path.join(self.tmpdir.name, 'test.lex')
+        with open(path, 'w', encoding='UTF-8') as fp:
+            fp.write(code)
+        return LexiconParser(path, cwd=self.tmpdir.name)
+
+    def read(self, name: str) -> str:
+        with open(os.path.join(self.tmpdir.name, name), encoding='UTF-8') as fp:
+            return fp.read()
+
+    def test_create_all(self):
+        parser = self.parser(LEXICON)
+        self.assertEqual(parser.languages, ['Eng', 'Ger', 'Fre', 'Spa'])
+        r = parser.create_all()
+        self.assertTrue(r.success, r.logs)
+        ger = self.read('TestGer.gf')
+        self.assertIn('\t\tPN = PN;\n\t\tN = Str;\n', ger)
+        self.assertIn('\t\tjohn = mkPNGer Johann;\n\t\tdog = mkN Hund;\n\t\tcat = mkN Katze;\n', ger)
+        self.assertIn('\t\tjohn = mkPN Juan;\n', self.read('TestSpa.gf'))
+        self.assertIn('\t\tdog = mkNoun "dog";\n\t\tcat = mkNoun "cat";\n', self.read('TestEng.gf'))
+        self.assertIn('\tdog : ι⟶o ❙\n', self.read('TestSemantics.mmt'))
+
+    def test_parallel_concretes(self):
+        parser = self.parser(LEXICON)
+        sequential = [r.value for r in parser.create_gf_concretes()]
+        files = {name: self.read(f'Test{name}') for name in sequential}
+        with mock.patch.object(lex, 'LEX_MAX_PROCESSES', 2), mock.patch.object(lex, 'LEX_PARALLEL_MIN_ENTRIES', 0):
+            self.assertEqual([r.value for r in parser.create_gf_concretes()], sequential)
+        self.assertEqual({name: self.read(f'Test{name}') for name in sequential}, files)
+
+    def test_parallel_fallback(self):
+        parser = self.parser(LEXICON)
+        sequential = [r.value for r in parser.create_gf_concretes()]
+        with mock.patch.object(lex, 'LEX_MAX_PROCESSES', 2), mock.patch.object(lex, 'LEX_PARALLEL_MIN_ENTRIES', 0), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor', FlakyExecutor), \
+                mock.patch.object(parser, 'create_gf_concrete', wraps=parser.create_gf_concrete) as create:
+            self.assertEqual([r.value for r in parser.create_gf_concretes()], sequential)
+        # the workers created Eng, Fre and Spa, only Ger was created again
+        self.assertEqual(sorted(call.args[0] for call in create.call_args_list), ['Eng', 'Fre', 'Ger', 'Spa'])
+
+    def test_duplicates(self):
+        with self.assertRaisesRegex(RuntimeError, 'PN already defined'):
+            self.parser(LEXICON.replace('def\n', 'PN : ι\ndef\n'))
+        with self.assertRaisesRegex(RuntimeError, 'john already definied in the language Ger'):
+            self.parser(LEXICON + 'john : PN -l Ger Hans\n')
+
+    def test_errors(self):
+        with self.assertRaises(LexiconError) as cm:
+            self.parser(LEXICON.replace('def\n', 'Adj ι\ndef\n') + 'dog : N -l\nbird : N -l Ger Vogel\nbad\n')
+        self.assertEqual([error.split(':')[0] for error in cm.exception.errors], ['line 5', 'line 11', 'line 13'])
+        self.assertIn("no seperator ':'", cm.exception.errors[0])
+        with self.assertRaises(LexiconError) as cm:
+            self.parser(LEXICON.replace('def\n', 'include\ninclude "Grammar.gf\ndef\n'))
+        self.assertEqual([error.split(':')[0] for error in cm.exception.errors], ['line 5', 'line 6'])
+        self.assertIn('no file given', cm.exception.errors[0])
+        self.assertIn('No closing quotation', cm.exception.errors[1])
+        with self.assertRaisesRegex(LexiconError, "line 1: A lexicon file have to start with 'Lexicon'"):
+            self.parser('Lexikon Test\ndef\n')
+        with self.assertRaisesRegex(LexiconError, 'Found no codelines'):
+            self.parser('# nothing\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
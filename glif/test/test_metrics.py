@@ -0,0 +1,90 @@
+import threading
+import unittest
+import urllib.request
+
+from .. import metrics
+from ..commands import pipeline
+from ..commands.glif_command import GlifCommandType
+from ..commands.items import Items, Repr
+
+
+def identity_helper(glif, keyval, keys, mainargs, items: Items) -> Items:
+    return items
+
+
+COMMANDS = {
+    'identity': GlifCommandType(['identity'], [], apply_fn=identity_helper, inrepr=Repr.SENTENCE,
+                                main_args_as_items=True),
+}
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter(self):
+        registry = metrics.Registry()
+        counter = registry.counter('test_total', 'A test counter', ('kind',))
+        counter.inc(kind='a')
+        counter.inc(2, kind='a')
+        counter.inc(kind='"b"\n')
+        self.assertEqual(counter.get(kind='a'), 3)
+        self.assertEqual(registry.prometheus_text(),
+                         '# HELP test_total A test counter\n'
+                         '# TYPE test_total counter\n'
+                         'test_total{kind="\\"b\\"\\n"} 1\n'
+                         'test_total{kind="a"} 3\n')
+        with self.assertRaises(ValueError):
+            counter.inc()  # missing label
+        with self.assertRaises(ValueError):
+            registry.counter('test_total', 'Registered twice')
+
+    def test_histogram(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram('test_seconds', 'A test histogram', buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 0.5, 5.0]:
+            histogram.observe(value)
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.count(), 5)
+        lines = registry.prometheus_text().splitlines()
+        self.assertEqual(lines[2:5], ['test_seconds_bucket{le="0.1"} 2',
+                                      'test_seconds_bucket{le="1"} 4',
+                                      'test_seconds_bucket{le="+Inf"} 5'])
+        self.assertTrue(lines[5].startswith('test_seconds_sum 6.05'))
+        self.assertEqual(lines[6], 'test_seconds_count 5')
+
+    def test_thread_totals(self):
+        histogram = metrics.Histogram('test_seconds', 'A test histogram', ('kind',))
+        histogram.observe(1.0, kind='a')
+        thread = threading.Thread(target=lambda: histogram.observe(2.0, kind='a'))
+        thread.start()
+        thread.join()
+        self.assertEqual(histogram.totals(), {('a',): (2, 3.0)})
+        self.assertEqual(histogram.thread_totals(), {('a',): (1, 1.0)})
+
+    def test_command_metrics(self):
+        before = metrics.COMMANDS.get(command='identity')
+        items_before = metrics.COMMAND_ITEMS.get(command='identity')
+        chunks_before = metrics.COMMAND_DURATION.count(command='identity')
+        stages = pipeline.parse_pipeline(COMMANDS, 'identity a b c | identity')  # type: ignore
+        assert stages.value
+        pipeline.run_pipeline(None, stages.value, chunk_size=2).materialize()  # type: ignore
+        self.assertEqual(metrics.COMMANDS.get(command='identity'), before + 2)
+        self.assertEqual(metrics.COMMAND_ITEMS.get(command='identity'), items_before + 6)
+        self.assertEqual(metrics.COMMAND_DURATION.count(command='identity'), chunks_before + 4)
+        self.assertIn('glif_command_cache_lookups_total{result="hit"}', metrics.prometheus_text())
+
+        # commands are only counted when they process items
+        stages = pipeline.parse_pipeline(COMMANDS, 'identity a b c | identity')  # type: ignore
+        assert stages.value
+        pipeline.run_pipeline(None, stages.value, chunk_size=2)  # type: ignore
+        self.assertEqual(metrics.COMMANDS.get(command='identity'), before + 2)
+
+    def test_http_server(self):
+        server = metrics.start_http_server(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            self.assertIn('# TYPE glif_commands_total counter', response.read().decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -88,6 +88,12 @@ class TestCommandParsing(unittest.TestCase):
     def test_mainargs(self):
         self.parseBCtest('parse "hello" "world"', 'parse', [], ['hello', 'world'])
 
+    def test_long_mainargs(self):
+        sentence = 'someone loves \\"someone\\" ' * 100000
+        self.parseBCtest(f'parse "{sentence}" | l', 'parse', [], [sentence.replace('\\', '')], remainder='l')
+        ast = '(and (s someone (love someone)) ' * 10000 + ')' * 10000
+        self.parseBCtest(f'l -lang=Eng {ast}', 'l', [('lang', 'Eng')], [ast])
+
 
 class TestFileIdentification(unittest.TestCase):
     def idTest(self, content: str, expected: utils.Result[tuple[str, str]]):
@@ -0,0 +1,256 @@
+import re
+import unittest
+from typing import Optional
+
+from .. import metrics
+from ..commands.cmd_construct import CONSTRUCT_COMMAND_TYPE, construct_helper
+from ..commands.command import CommandType, COMMAND_CACHE_MAX_LENGTH
+from ..commands.glif_command import GlifCommandType, GlifArg
+from ..commands.items import Items, ItemStream, Repr
+from ..commands import pipeline
+from ..commands.gf_commands import GF_COMMAND_TYPES
+from ..utils import Result
+
+
+def upper_helper(glif, keyval, keys, mainargs, items: Items) -> Items:
+    new_items = Items([]).with_errors(items.errors)
+    for item in items.items:
+        if item.content[Repr.DEFAULT] == 'fail':
+            new_items.errors.append('failed')
+        new_items.items.append(item.get_clone().with_repr(Repr.SENTENCE, item.content[Repr.DEFAULT].upper()))
+    return new_items
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.chunk_sizes: list[int] = []
+
+        def count_helper(glif, keyval, keys, mainargs, items: Items) -> Items:
+            self.chunk_sizes.append(len(items.items))
+            return items
+
+        self.commands: dict[str, CommandType] = {
+            'upper': GlifCommandType(['upper'], [], apply_fn=upper_helper, inrepr=Repr.SENTENCE,
+                                     main_args_as_items=True, required_reprs={Repr.DEFAULT}),
+            'count': GlifCommandType(['count'], [GlifArg(['all'], 'Process all items at once')],
+                                     apply_fn=count_helper, needs_all_items=lambda keyval, keys: 'all' in keys,
+                                     required_reprs=set()),
+            'unknown': GlifCommandType(['unknown'], [], apply_fn=count_helper),
+        }
+
+    def run_pipeline(self, command: str, chunk_size: int, queue_size: int = 0) -> Items:
+        stages = pipeline.parse_pipeline(self.commands, command)
+        self.assertTrue(stages.success)
+        assert stages.value
+        return pipeline.run_pipeline(None, stages.value, chunk_size,  # type: ignore
+                                     queue_size=queue_size).materialize()
+
+    def test_chunks(self):
+        items = self.run_pipeline('upper a b c d e | count', 2)
+        self.assertEqual(str(items), 'A\nB\nC\nD\nE')
+        self.assertEqual(self.chunk_sizes, [2, 2, 1])
+
+    def test_all_items(self):
+        items = self.run_pipeline('upper a b c d e | count -all | count', 2)
+        self.assertEqual(str(items), 'A\nB\nC\nD\nE')
+        self.assertEqual(self.chunk_sizes, [5, 2, 2, 1])
+
+    def test_errors_end_stream(self):
+        executed = metrics.COMMANDS.get(command='count')
+        items = self.run_pipeline('upper fail b c d e | count', 2)
+        self.assertEqual(metrics.COMMANDS.get(command='count'), executed)  # never processed any items
+        self.assertEqual(items.errors, ['failed'])
+        self.assertEqual(items.failed_command, 'upper')
+        self.assertEqual(self.chunk_sizes, [])
+
+    def test_error_in_second_chunk(self):
+        # the first chunk has already been processed by `count`, its results are discarded
+        items = self.run_pipeline('upper a b fail d e | count', 2)
+        self.assertEqual(str(items.items[0]), 'FAIL')
+        self.assertEqual(len(items.items), 2)
+        self.assertEqual(items.errors[0], 'failed')
+        self.assertIn('"upper" failed on a later chunk', items.errors[1])
+        self.assertEqual(items.failed_command, 'upper')
+        self.assertEqual(self.chunk_sizes, [2])
+
+    def test_concurrent(self):
+        items = self.run_pipeline('upper a b c d e | count | upper | count -all', 2, queue_size=1)
+        self.assertEqual(str(items), 'A\nB\nC\nD\nE')
+        self.assertEqual(sorted(self.chunk_sizes), [1, 2, 2, 5])
+
+        self.chunk_sizes = []
+        items = self.run_pipeline('upper a b fail d e | count', 2, queue_size=1)
+        self.assertEqual(items.errors[0], 'failed')
+        self.assertEqual(items.failed_command, 'upper')
+
+    def test_pruning(self):
+        item = self.run_pipeline('upper a | count', 10).items[0]
+        self.assertEqual(set(item.content), {Repr.DEFAULT, Repr.SENTENCE_ORIG})
+
+        item = self.run_pipeline('upper a | count -keep=sentence', 10).items[0]
+        self.assertEqual(set(item.content), {Repr.DEFAULT, Repr.SENTENCE_ORIG, Repr.SENTENCE})
+
+        # the output of the last command and the input of commands with unknown requirements is not pruned
+        item = self.run_pipeline('upper a | unknown | count | upper', 10).items[0]
+        self.assertEqual(set(item.content), {Repr.DEFAULT, Repr.SENTENCE_ORIG, Repr.SENTENCE})
+        self.assertIsNone(item.parent)  # the items of earlier commands are not kept alive
+
+        self.assertFalse(pipeline.parse_pipeline(self.commands, 'upper a | count -keep=nothing').success)
+
+    def test_cached_commands(self):
+        first = self.commands['upper'].from_string('upper a fail')
+        self.assertIs(first, self.commands['upper'].from_string('upper a fail '))
+        for _ in range(2):
+            items = self.run_pipeline('upper a fail', 10)
+            self.assertEqual(items.errors, ['failed'])
+            self.assertEqual(str(items.items[0]), 'A')
+
+    def test_command_cache(self):
+        size = CommandType._from_string_cached.cache_info().currsize
+        sentences = ['a'] * COMMAND_CACHE_MAX_LENGTH
+        items = self.run_pipeline('upper ' + ' '.join(sentences), 10)
+        self.assertEqual(len(items.items), COMMAND_CACHE_MAX_LENGTH)
+        self.assertEqual(CommandType._from_string_cached.cache_info().currsize, size)  # too long to be cached
+
+    def test_unknown_command(self):
+        self.assertFalse(pipeline.parse_pipeline(self.commands, 'upper a | nonexistent').success)
+        self.assertFalse(pipeline.parse_pipeline(self.commands, '').success)
+
+
+class FakeMMT(object):
+    def __init__(self):
+        self.asts: list[list[str]] = []
+
+    def construct(self, asts, archive, subdir, view, delta_expand=False, simplify=True):
+        self.asts.append(asts)
+        return Result(True, {'mmt': [f'[{ast}]' for ast in asts]})
+
+
+class ConstructGlif(object):
+    def __init__(self):
+        self.mmt = FakeMMT()
+
+    def get_defaultview(self):
+        return 'View'
+
+    def get_mmt(self):
+        return Result(True, self.mmt)
+
+    def get_archive_subdir(self):
+        return Result(True, ('archive', None))
+
+    def get_store(self):
+        return None
+
+
+class TestConstruct(unittest.TestCase):
+    def test_duplicates_in_chunks(self):
+        # the output (and the MMT calls) do not depend on the chunk size
+        for chunk_size in [1, 2, 10]:
+            glif = ConstructGlif()
+            stages = pipeline.parse_pipeline({'construct': CONSTRUCT_COMMAND_TYPE}, 'construct')
+            assert stages.value
+            stream = ItemStream.from_items(Items.from_vals(Repr.AST, ['a', 'b', 'a', 'c', 'b']), chunk_size)
+            items = pipeline.run_pipeline(glif, stages.value, chunk_size, stream=stream).materialize()  # type: ignore
+            self.assertEqual([item.content[Repr.LOGIC_STANDARD] for item in items.items],
+                             ['[a]', '[b]', '[a]', '[c]', '[b]'])
+            self.assertEqual(len(glif.mmt.asts), 1)
+            self.assertEqual(sorted(glif.mmt.asts[0]), ['a', 'b', 'c'])
+
+    def test_errors_not_shared(self):
+        items = Items.from_vals(Repr.AST, ['a']).with_errors(['earlier error'])
+        result = construct_helper(ConstructGlif(), {'view': '$DEFAULT'}, set(), [], items)  # type: ignore
+        result.with_errors(['later error'])
+        self.assertEqual(items.errors, ['earlier error'])
+        self.assertEqual(result.errors, ['earlier error', 'later error'])
+
+
+class FakeGFShell(object):
+    def __init__(self):
+        self.commands: list[str] = []
+
+    def handle_command(self, command: str) -> str:
+        self.commands.append(command)
+        return 'x\ny'
+
+
+class EchoGFShell(FakeGFShell):
+    """ commands with the initial input (or `gr`) produce two results, other commands return their (last) input """
+
+    def handle_command(self, command: str) -> str:
+        self.commands.append(command)
+        if '"a b"' in command.split('|')[0] or command.startswith('gr'):
+            return 'x\ny'
+        inputs = re.findall(r'"([^"]*)"', command)
+        return inputs[-1] if inputs else command.split()[-1]
+
+
+class FakeGlif(object):
+    def __init__(self, gfshell: Optional[FakeGFShell] = None):
+        self.gfshell = gfshell if gfshell else FakeGFShell()
+
+    def get_gf_shell(self):
+        return Result(True, self.gfshell)
+
+    def get_store(self):
+        return None
+
+
+class TestGfFusion(unittest.TestCase):
+    def run_pipeline(self, command: str, prune: bool = True, fuse: bool = True,
+                     gfshell: Optional[FakeGFShell] = None) -> tuple[Items, list[str]]:
+        commands = {name: ct for ct in GF_COMMAND_TYPES for name in ct.names}
+        stages = pipeline.parse_pipeline(commands, command)  # type: ignore
+        assert stages.value
+        glif = FakeGlif(gfshell)
+        items = pipeline.run_pipeline(glif, stages.value, prune=prune, fuse=fuse).materialize()  # type: ignore
+        return items, glif.gfshell.commands
+
+    def test_fusion(self):
+        for prune in [True, False]:
+            items, commands = self.run_pipeline('p "a b" | l', prune=prune)
+            self.assertEqual(len(commands), 1)  # a single GF call
+            self.assertEqual(str(items), 'x\ny')
+            self.assertIsNone(items.items[0].get(Repr.AST))  # not requested with `-keep`
+
+        items, commands = self.run_pipeline('parse -cat=S "a b" | linearize -lang=Ger | ps -bind')
+        self.assertEqual(commands, ['parse -cat=S "a b" | linearize -lang=Ger | ps -bind'])
+        self.assertEqual(items.items[0].get(Repr.SENTENCE_ORIG), 'a b')
+
+        items, commands = self.run_pipeline('gr | l | ps -bind | ps -to_upper')
+        self.assertEqual(commands, ['gr | l | ps -bind | ps -to_upper'])
+
+    def test_fusion_keeps_results(self):
+        # apart from the intermediate representations, which are not kept
+        for command, output in [('parse "a b" | linearize', Repr.SENTENCE), ('gr | l | ps -bind', Repr.SENTENCE),
+                                ('parse "a b" | linearize | ps -bind', Repr.SENTENCE), ('p "a b" | l | p', Repr.AST),
+                                ('ps -lextext | ps -bind | p', Repr.AST)]:
+            reprs = [Repr.DEFAULT, Repr.SENTENCE_ORIG, output]
+            for prune in [True, False]:
+                fused, _ = self.run_pipeline(command, prune=prune, gfshell=EchoGFShell())
+                unfused, _ = self.run_pipeline(command, prune=prune, fuse=False, gfshell=EchoGFShell())
+                self.assertEqual([(item.original_id, [item.get(r) for r in reprs]) for item in fused.items],
+                                 [(item.original_id, [item.get(r) for r in reprs]) for item in unfused.items],
+                                 (command, prune))
+
+        # the original sentences are kept
+        _, commands = self.run_pipeline('ps -lextext | ps -bind | p', gfshell=EchoGFShell())
+        self.assertEqual(commands[0], 'ps -lextext')
+
+    def test_no_fusion(self):
+        # the ASTs should be kept
+        items, commands = self.run_pipeline('p "a b" | l -keep=ast')
+        self.assertEqual(len(commands), 3)
+        self.assertEqual(items.items[0].get(Repr.AST), 'x')
+
+        # representations don't match
+        _, commands = self.run_pipeline('p "a b" | ps -bind')
+        self.assertEqual(len(commands), 3)
+
+        # graphs can only be at the end
+        _, commands = self.run_pipeline('vt "f a" | l')
+        self.assertEqual(len(commands), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
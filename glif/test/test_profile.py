@@ -0,0 +1,84 @@
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+
+from .. import metrics
+from ..commands import pipeline
+from ..commands.cmd_profile import PROFILE_COMMAND_TYPE, profile_helper
+from ..glif import Glif
+
+
+class TestProfile(unittest.TestCase):
+    glif: Glif
+
+    @classmethod
+    def setUpClass(cls):
+        cls.glif = Glif()  # works without GF, MMT and ELPI for the commands used here
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.glif.do_shutdown()
+
+    def test_parsing(self):
+        r = PROFILE_COMMAND_TYPE.from_string('profile -top=5 status | help status')
+        assert r.value
+        command, rest = r.value
+        self.assertEqual(rest, '')
+        assert command.basic_command
+        self.assertEqual(command.basic_command.mainargs, ['status | help status'])
+
+        stages = pipeline.parse_pipeline(self.glif.get_commands(), 'profile status | help status')
+        assert stages.value
+        self.assertEqual(len(stages.value), 1)
+        self.assertFalse(PROFILE_COMMAND_TYPE.from_string('profile -top=5').success)
+
+    def test_profile(self):
+        r = self.glif.execute_command('profile -sort=tottime -top=3 status')
+        self.assertTrue(r.success, r.logs)
+        assert r.value
+        report = str(r.value.items[0])
+        self.assertIn('Wall time', report)
+        self.assertIn('Python CPU time', report)
+        self.assertIn('ncalls', report)
+
+        r = self.glif.execute_command('profile -top=x status')
+        self.assertFalse(r.success)
+
+    def test_other_threads(self):
+        # backend calls of other threads (e.g. other sessions of glif serve) are not attributed to the command
+        glif = self.glif
+
+        class OtherSessionGlif(object):
+            def execute_command(self, command: str):
+                metrics.BACKEND_CALLS.observe(0.5, backend='mmt', operation='test')
+                thread = threading.Thread(target=lambda: metrics.BACKEND_CALLS.observe(5.0, backend='gf',
+                                                                                       operation='test'))
+                thread.start()
+                thread.join()
+                return glif.execute_command(command)
+
+        keyval = {'sort': 'cumtime', 'top': '3'}
+        items = profile_helper(OtherSessionGlif(), keyval, set(keyval), ['status'])  # type: ignore
+        report = str(items.items[0])
+        self.assertIn('Waiting for mmt: 0.500 s (1 calls)', report)
+        self.assertNotIn('Waiting for gf', report)
+
+    def test_failing_command(self):
+        r = self.glif.execute_command('profile nonexistent')
+        self.assertFalse(r.success)
+        self.assertIn('Unkown command', r.logs)
+        assert r.value
+        self.assertIn('Wall time', str(r.value.items[0]))
+
+    def test_dump(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.pstats')
+            r = self.glif.execute_command(f'profile -dump -file={path} status')
+            self.assertTrue(r.success, r.logs)
+            self.assertGreater(pstats.Stats(path).total_calls, 0)  # type: ignore
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from .. import server
+from ..commands.items import Items, Repr
+from ..utils import Result
+
+
+class FakeSession(object):
+    def __init__(self, mathhub: str):
+        self.mathhub = mathhub
+        self.archive = None
+        self.cwd = mathhub
+        self.shut_down = False
+
+    def set_archive(self, archive, subdir, create=False):
+        if archive == 'nonexistent':
+            return Result(False, logs='Archive nonexistent doesn\'t exist')
+        self.archive = archive
+        self.cwd = os.path.join(self.mathhub, archive, 'source', subdir or '')
+        if create:
+            os.makedirs(self.cwd, exist_ok=True)
+        return Result(True)
+
+    def get_cwd(self):
+        return self.cwd
+
+    def execute_command(self, command: str):
+        if command == 'fail':
+            return Result(False, logs='failed')
+        if command == 'crash':
+            raise ValueError('unexpected')
+        return Result(True, Items.from_vals(Repr.SENTENCE, [f'{self.archive}: {command}']))
+
+    def execute_cell(self, code: str):
+        return [self.execute_command(line) for line in code.splitlines()]
+
+    def do_shutdown(self):
+        self.shut_down = True
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        http.client.HTTPConnection.__init__(self, 'localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.created: list[FakeSession] = []
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+        def make_session():
+            self.created.append(FakeSession(self.tmpdir.name))
+            return self.created[-1]
+
+        self.sessions = server.SessionManager(make_session)  # type: ignore
+        self.rpc = server.GlifRPC(self.sessions)
+        self.request_id = 0
+
+    def call(self, method: str, **params):
+        self.request_id += 1
+        response = json.loads(self.rpc.handle_json(json.dumps(  # type: ignore
+            {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': self.request_id}).encode()))
+        self.assertEqual(response['id'], self.request_id)
+        return response
+
+    def test_sessions(self):
+        a = self.call('open_session', archive='a')['result']['session']
+        b = self.call('open_session')['result']['session']
+        self.assertEqual(set(self.call('sessions')['result']), {a, b})
+
+        result = self.call('execute_command', session=a, command='x')['result']
+        self.assertTrue(result['success'])
+        self.assertEqual(result['items'][0]['reprs']['sentence'], 'a: x')
+        results = self.call('execute_cell', session=b, code='x\nfail')['result']
+        self.assertEqual([r['success'] for r in results], [True, False])
+        self.assertEqual(results[1]['logs'], 'failed')
+
+        self.assertIsNone(self.call('close_session', session=a)['result'])
+        self.assertTrue(self.created[0].shut_down)
+        self.assertEqual(self.call('execute_command', session=a, command='x')['error']['code'],
+                         server.UNKNOWN_SESSION)
+
+        response = self.call('open_session', archive='nonexistent')
+        self.assertEqual(response['error']['code'], server.INVALID_PARAMS)
+        self.assertEqual(self.call('sessions')['result'], [b])
+
+    def test_session_directories(self):
+        a = self.call('open_session')['result']['session']
+        b = self.call('open_session')['result']['session']
+        session_a, session_b = self.created
+        self.assertNotEqual(session_a.get_cwd(), session_b.get_cwd())
+        self.assertTrue(session_a.get_cwd().endswith(os.path.join('sessions', a)))
+        self.assertTrue(os.path.isdir(session_a.get_cwd()))
+        self.call('close_session', session=a)
+        self.assertFalse(os.path.exists(session_a.get_cwd()))
+        self.assertTrue(os.path.isdir(session_b.get_cwd()))
+        self.call('close_session', session=b)
+
+    def test_errors(self):
+        self.assertEqual(self.call('nonexistent')['error']['code'], server.METHOD_NOT_FOUND)
+        session = self.call('open_session')['result']['session']
+        self.assertEqual(self.call('execute_command', session=session)['error']['code'], server.INVALID_PARAMS)
+        self.assertEqual(json.loads(self.rpc.handle_json(b'{'))['error']['code'], server.PARSE_ERROR)  # type: ignore
+        self.assertEqual(json.loads(self.rpc.handle_json(b'[1]'))[0]['error']['code'],  # type: ignore
+                         server.INVALID_REQUEST)
+        response = self.call('execute_command', session=session, command='crash')
+        self.assertEqual(response['error']['code'], server.INTERNAL_ERROR)
+        self.assertIn('unexpected', response['error']['message'])
+        # notifications don't get a response
+        self.assertIsNone(self.rpc.handle_json(b'{"jsonrpc": "2.0", "method": "sessions"}'))
+
+    def post(self, connection: http.client.HTTPConnection, request: dict) -> dict:
+        connection.request('POST', '/', json.dumps(request), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        self.assertEqual(response.status, 200)
+        return json.loads(response.read())
+
+    def serve(self, httpd) -> threading.Thread:
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+        return thread
+
+    def test_http(self):
+        httpd = server.make_server(self.rpc, port=0)
+        self.serve(httpd)
+        response = self.post(http.client.HTTPConnection('127.0.0.1', httpd.server_port),  # type: ignore
+                             {'jsonrpc': '2.0', 'method': 'open_session', 'id': 1})
+        self.assertIn('session', response['result'])
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'glif.sock')
+            httpd = server.make_server(self.rpc, unix_socket=path)
+            self.serve(httpd)
+            response = self.post(UnixHTTPConnection(path), {'jsonrpc': '2.0', 'method': 'sessions', 'id': 1})
+            self.assertEqual(response['result'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+from .. import metrics
+from ..backends import Backends, GFShellPool
+from ..glif import Glif
+from ..store import ResultStore, files_fingerprint
+
+# A minimal stand-in for the GF shell that "parses" every sentence into a single tree
+FAKE_GF = f'''#!{sys.executable}
+import sys
+for line in sys.stdin:
+    line = line.strip()
+    if line == 'q':
+        break
+    if line.startswith('ps "'):
+        print(line[4:-1])
+    elif line.startswith('parse'):
+        print('(tree ' + line.split('"')[1].replace(' ', '_') + ')')
+    sys.stdout.flush()
+'''
+
+
+def gf_calls() -> int:
+    return metrics.BACKEND_CALLS.count(backend='gf', operation='handle_command')
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_store(self):
+        store = ResultStore(self.path('store.sqlite'))
+        store.put_many('parse', 'fp1', 'parse -cat=S', {'a b': '(ab)', 'c': '(c)'})
+        store.put('construct', 'fp2', 'view', '(ab)', ['ab', None])
+        self.assertEqual(store.get_many('parse', 'fp1', 'parse -cat=S', ['a b', 'c', 'd']), {'a b': '(ab)', 'c': '(c)'})
+        self.assertEqual(store.get('parse', 'fp1', 'parse', 'a b'), None)  # different options
+        self.assertEqual(store.get('parse', 'fp2', 'parse -cat=S', 'a b'), None)  # different fingerprint
+        self.assertEqual(store.get('construct', 'fp2', 'view', '(ab)'), ['ab', None])
+        self.assertEqual(store.stats(), [('construct', 1, 1), ('parse', 2, 1)])
+
+        out = io.StringIO()
+        self.assertEqual(store.export(out), 3)
+        self.assertIn({'kind': 'construct', 'fingerprint': 'fp2', 'options': 'view', 'input': '(ab)',
+                       'output': ['ab', None]}, [json.loads(line) for line in out.getvalue().splitlines()])
+
+        self.assertEqual(store.prune(60), 0)  # everything has been used recently
+        self.assertEqual(store.prune(), 3)
+        self.assertEqual(store.stats(), [])
+        store.close()
+
+    def test_persistence(self):
+        store = ResultStore(self.path('store.sqlite'))
+        store.put('parse', 'fp', '', 'sentence', 'tree')
+        store.close()
+        store = ResultStore(self.path('store.sqlite'))
+        self.assertEqual(store.get('parse', 'fp', '', 'sentence'), 'tree')
+        store.close()
+
+    def test_files_fingerprint(self):
+        def write(name: str, content: str):
+            with open(self.path(name), 'w') as fp:
+                fp.write(content)
+
+        write('Grammar.gf', 'abstract Grammar = { cat S ; }')
+        write('GrammarEng.gf', 'concrete GrammarEng of Grammar = { lincat S = Str ; }')
+        fingerprint = files_fingerprint(self.tmpdir.name, 'GrammarEng.gf', ('.gf',))
+        write('Other.gf', 'abstract Other = { cat S ; }')
+        self.assertEqual(files_fingerprint(self.tmpdir.name, 'GrammarEng.gf', ('.gf',)), fingerprint)
+        write('Grammar.gf', 'abstract Grammar = { cat S ; fun s : S ; }')  # referenced by GrammarEng.gf
+        self.assertNotEqual(files_fingerprint(self.tmpdir.name, 'GrammarEng.gf', ('.gf',)), fingerprint)
+
+    def test_parse_with_store(self):
+        gf_path = self.path('gf')
+        with open(gf_path, 'w') as fp:
+            fp.write(FAKE_GF)
+        os.chmod(gf_path, os.stat(gf_path).st_mode | stat.S_IEXEC)
+        with open(self.path('Grammar.gf'), 'w') as fp:
+            fp.write('abstract Grammar = { cat S ; }')
+
+        def session() -> Glif:
+            backends = Backends()
+            backends.gf_pool = GFShellPool(gf_path=gf_path)
+            glif = Glif(backends)
+            glif._update_fingerprint('gf', self.tmpdir.name, 'Grammar.gf', ('.gf',))  # as if the grammar was imported
+            self.assertTrue(glif.execute_command(f'store -open "{self.path("store.sqlite")}"').success)
+            return glif
+
+        def parse(glif: Glif) -> tuple[list[str], int]:
+            calls = gf_calls()
+            r = glif.execute_command('parse "a b" "c" "a b"')
+            self.assertTrue(r.success, r.logs)
+            assert r.value
+            return [str(item) for item in r.value.items], gf_calls() - calls
+
+        glif = session()
+        self.assertEqual(parse(glif), (['(tree a_b)', '(tree c)', '(tree a_b)'], 2))
+        self.assertEqual(parse(glif), (['(tree a_b)', '(tree c)', '(tree a_b)'], 0))
+        glif.do_shutdown()
+
+        glif = session()  # e.g. after a restart
+        self.assertEqual(parse(glif), (['(tree a_b)', '(tree c)', '(tree a_b)'], 0))
+        r = glif.execute_command('store')
+        self.assertTrue(r.success)
+        assert r.value
+        self.assertIn('parse: 2 results for 1 fingerprint(s)', str(r.value.items[0]))
+        glif.do_shutdown()
+
+        with open(self.path('Grammar.gf'), 'w') as fp:
+            fp.write('abstract Grammar = { cat S ; fun s : S ; }')
+        glif = session()  # the grammar has changed
+        self.assertEqual(parse(glif)[1], 2)
+        glif.do_shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from .. import tracing
+from ..commands import pipeline
+from ..commands.glif_command import GlifCommandType
+from ..commands.items import Items, Repr
+
+
+def double_helper(glif, keyval, keys, mainargs, items: Items) -> Items:
+    return items.flatmap(lambda item: Items([item.get_clone(), item.get_clone()]))
+
+
+COMMANDS = {
+    'double': GlifCommandType(['double'], [], apply_fn=double_helper, inrepr=Repr.SENTENCE, main_args_as_items=True),
+}
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        tracing.disable()
+        tracing.TRACER.clear()
+
+    def test_disabled(self):
+        with tracing.span('test', 'test', a=1) as span:
+            span.set(b=2)
+        self.assertIs(span, tracing.NO_SPAN)
+        self.assertEqual(tracing.TRACER.spans(), [])
+
+    def test_spans(self):
+        tracing.enable()
+        with tracing.span('outer', 'test', a=1) as outer:
+            with tracing.span('inner', 'test'):
+                pass
+            outer.set(bytes_out=10)
+        with self.assertRaises(ValueError):
+            with tracing.span('failing', 'test'):
+                raise ValueError()
+        spans = tracing.TRACER.spans()
+        self.assertEqual([s.name for s in spans], ['inner', 'outer', 'failing'])
+        self.assertEqual(spans[1].args, {'a': 1, 'bytes_out': 10})
+        self.assertLessEqual(spans[1].start, spans[0].start)
+        self.assertGreaterEqual(spans[1].end, spans[0].end)
+        self.assertEqual(spans[2].args['exception'], 'ValueError')
+
+        events = tracing.TRACER.chrome_trace()['traceEvents']
+        self.assertEqual(events[1]['ph'], 'X')
+        self.assertEqual(events[1]['args'], {'a': 1, 'bytes_out': 10})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'trace.json')
+            tracing.TRACER.write_chrome_trace(path)
+            with open(path) as fp:
+                self.assertEqual(len(json.load(fp)['traceEvents']), 3)
+
+    def test_pipeline(self):
+        tracing.enable()
+        stages = pipeline.parse_pipeline(COMMANDS, 'double a b c | double')  # type: ignore
+        assert stages.value
+        items = pipeline.run_pipeline(None, stages.value, chunk_size=2).materialize()  # type: ignore
+        self.assertEqual(len(items.items), 12)
+        spans = [s for s in tracing.TRACER.spans() if s.category == 'command']
+        self.assertEqual(sum(s.args['items_in'] for s in spans), 3 + 6)
+        self.assertEqual(sum(s.args['items_out'] for s in spans), 6 + 12)
+        summary = tracing.TRACER.summary()
+        self.assertIn('double', summary)
+        self.assertIn('parse', summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+    Tracing of GLIF commands and backend calls (GF, MMT, ELPI, dot).
+
+    Code that should be traced is wrapped in a span:
+        with tracing.span('handle_command', 'gf', bytes_in=len(cmd)) as s:
+            ...
+            s.set(bytes_out=len(output))
+    When tracing is disabled (the default), `span` returns a shared dummy span that doesn't record anything.
+
+    Recorded spans can be summarized (`Tracer.summary`) or exported in Chrome's trace event format
+    (`Tracer.chrome_trace`), which can be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+from typing import Any, Union
+
+MAX_SPANS = 100000  # older spans are dropped
+MAX_ARG_LENGTH = 200  # longer string arguments (e.g. commands) are truncated in the export
+
+
+def _truncate(s: str) -> str:
+    return s if len(s) <= MAX_ARG_LENGTH else s[:MAX_ARG_LENGTH] + '...'
+
+
+class Span(object):
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start', 'end', 'thread')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start: int = 0  # in ns
+        self.end: int = 0
+        self.thread: int = 0
+
+    def set(self, **args):
+        """ adds information (e.g. item counts or payload sizes) to the span """
+        self.args.update(args)
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    def __enter__(self) -> 'Span':
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['exception'] = exc_type.__name__
+        self.tracer.record(self)
+
+
+class _NoSpan(object):
+    """ used when tracing is disabled """
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Tracer(object):
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self.enabled = False
+        self._spans: collections.deque[Span] = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def span(self, name: str, category: str, **args) -> Union[Span, _NoSpan]:
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, category, args)
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """ the spans in Chrome's trace event format (complete events, timestamps in microseconds) """
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {
+                    'name': s.name,
+                    'cat': s.category,
+                    'ph': 'X',
+                    'ts': s.start / 1000,
+                    'dur': s.duration / 1000,
+                    'pid': pid,
+                    'tid': s.thread,
+                    'args': {k: v if isinstance(v, (int, float, bool)) else _truncate(str(v))
+                             for k, v in s.args.items()},
+                }
+                for s in self.spans()
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w') as fp:
+            json.dump(self.chrome_trace(), fp)
+
+    def summary(self) -> str:
+        """ a table with the number of calls, times, item counts and payload sizes for every kind of span """
+        rows: dict[tuple[str, str], list[int]] = {}  # (category, name) -> [count, total ns, max ns, items, bytes]
+        for s in self.spans():
+            row = rows.setdefault((s.category, s.name), [0, 0, 0, 0, 0])
+            row[0] += 1
+            row[1] += s.duration
+            row[2] = max(row[2], s.duration)
+            row[3] += s.args.get('items_out', 0)
+            row[4] += s.args.get('bytes_in', 0) + s.args.get('bytes_out', 0)
+        if not rows:
+            return 'No spans recorded' + ('' if self.enabled else ' (tracing is disabled)')
+        lines = [f'{"category":<10} {"name":<30} {"calls":>7} {"total ms":>10} {"mean ms":>9} {"max ms":>9} '
+                 f'{"items":>8} {"bytes":>10}']
+        for (category, name), (count, total, max_, items, bytes_) in \
+                sorted(rows.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f'{category:<10} {name[:30]:<30} {count:>7} {total / 1e6:>10.2f} {total / count / 1e6:>9.2f} '
+                         f'{max_ / 1e6:>9.2f} {items:>8} {bytes_:>10}')
+        return '\n'.join(lines)
+
+
+TRACER = Tracer()
+
+
+def span(name: str, category: str, **args) -> Union[Span, _NoSpan]:
+    """ a span of the global tracer """
+    return TRACER.span(name, category, **args)
+
+
+def enabled() -> bool:
+    return TRACER.enabled
+
+
+def enable(clear: bool = True):
+    if clear:
+        TRACER.clear()
+    TRACER.enabled = True
+
+
+def disable():
+    TRACER.enabled = False
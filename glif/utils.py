@@ -1,10 +1,16 @@
+import concurrent.futures
 import os
 from typing import TypeVar, Generic, Union
 from distutils.spawn import find_executable
 import subprocess
 
+from . import cache, metrics, tracing
+
 T = TypeVar('T')
 
+# maximal number of dot processes that `dot2svg_many` runs at the same time
+DOT_MAX_PROCESSES = os.cpu_count() or 1
+
 
 class Result(Generic[T]):
     def __init__(self, success: bool = False, value: Union[None, T] = None, logs: str = ''):
@@ -68,16 +74,47 @@ def find_mathhub_dir(mmtjar: str) -> Result[str]:
 
 
 def dot2svg(dot: bytes) -> Result[bytes]:
+    return dot2svg_many([dot])[0]
+
+
+def dot2svg_many(dots: list[bytes]) -> list[Result[bytes]]:
+    """ renders the graphs with up to `DOT_MAX_PROCESSES` dot processes at the same time.
+        Identical graphs are only rendered once and the SVGs are kept in the disk cache (see `glif.cache`).
+    """
     dotpath = find_executable('dot')
     if not dotpath:
-        return Result(False, None, 'Failed to locate executable "dot"')
-
-    proc = subprocess.Popen([dotpath, '-Tsvg'], stdout=subprocess.PIPE, stdin=subprocess.PIPE)
-    assert proc.stdin
-    assert proc.stdout
-    proc.stdin.write(dot)
-    proc.stdin.close()
-    svg = proc.stdout.read()
-    proc.stdout.close()
-    proc.wait()
+        return [Result(False, None, 'Failed to locate executable "dot"') for _ in dots]
+
+    disk_cache = cache.get_cache()
+    results: dict[bytes, Result[bytes]] = {}
+    todo: list[bytes] = []
+    for dot in dict.fromkeys(dots):  # without duplicates
+        svg = disk_cache.get('svg', cache.key(dot)) if disk_cache else None
+        if svg is not None:
+            results[dot] = Result(True, svg)
+        else:
+            todo.append(dot)
+
+    if todo:
+        with tracing.span('dot2svg_many', 'dot', graphs=len(todo)):
+            with concurrent.futures.ThreadPoolExecutor(min(DOT_MAX_PROCESSES, len(todo))) as executor:
+                for dot, result in zip(todo, executor.map(lambda dot: _run_dot(dotpath, dot), todo)):
+                    if disk_cache and result.success:
+                        assert result.value is not None
+                        disk_cache.put('svg', cache.key(dot), result.value)
+                    results[dot] = result
+    return [results[dot] for dot in dots]
+
+
+def _run_dot(dotpath: str, dot: bytes) -> Result[bytes]:
+    with tracing.span('dot2svg', 'dot', bytes_in=len(dot)) as span, \
+            metrics.BACKEND_CALLS.time(backend='dot', operation='dot2svg'):
+        metrics.SUBPROCESS_SPAWNS.inc(program='dot')
+        proc = subprocess.Popen([dotpath, '-Tsvg'], stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        svg, stderr = proc.communicate(dot)
+        span.set(bytes_out=len(svg))
+    if proc.returncode != 0:
+        message = stderr.decode('utf8', errors='replace').strip()
+        return Result(False, None, f'dot failed (exit code {proc.returncode}): {message}')
     return Result(True, svg)
@@ -18,4 +18,7 @@ setuptools.setup(
         'Programming Language :: Python :: 3',
     ],
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['glif=glif.cli:main'],
+    },
 )